@@ -0,0 +1,224 @@
+"""
+Stale-while-revalidate cache for meets API room-access lookups
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# Outcome of one meets API lookup; decides how long the result may be cached
+ACCESS_OK = 'ok'
+ACCESS_DENIED = 'denied'
+ACCESS_UPCOMING = 'upcoming'
+ACCESS_PAST = 'past'
+ACCESS_UNAVAILABLE = 'unavailable'
+
+ENTRY_KEY = 'meet:access:{room}:{user_guid}'
+REFRESH_LOCK_KEY = 'meet:access:refresh:{room}:{user_guid}'
+
+
+def _parse_timestamp(value):
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class MeetAccessCache:
+    """
+    Cache room-access results keyed by (room_name, user_guid).
+
+    Allowed results are fresh for MEET_ACCESS_CACHE_TTL seconds, "no access"
+    and "upcoming" results for MEET_ACCESS_NEGATIVE_TTL, and "past" results
+    for MEET_ACCESS_PAST_TTL. After an entry goes stale it is still served
+    for up to MEET_ACCESS_STALE_TTL seconds while a single background refresh
+    runs (guarded by a cache.add lock, so one refresh per key across workers).
+    Allowed entries are never served past the meeting's end_time and upcoming
+    ones never past its start_time. Upstream failures are not cached; a stale
+    entry keeps being served until it expires.
+    """
+
+    def __init__(self, loader, cache_alias=None, max_refresh_workers=4):
+        self.loader = loader
+        self.cache_alias = cache_alias
+        self.max_refresh_workers = max_refresh_workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._refresh_tasks = set()
+
+    @property
+    def cache(self):
+        alias = self.cache_alias or getattr(settings, 'MEET_ACCESS_CACHE', 'default')
+        return caches[alias]
+
+    def _keys(self, room_name, user_guid):
+        room = hashlib.sha256(room_name.encode()).hexdigest()[:32]
+        return (
+            ENTRY_KEY.format(room=room, user_guid=user_guid),
+            REFRESH_LOCK_KEY.format(room=room, user_guid=user_guid),
+        )
+
+    def _lifetimes(self, access_data, outcome, now):
+        """
+        Return (fresh_until, stale_until) for a result, or None to skip caching
+        """
+        stale_ttl = getattr(settings, 'MEET_ACCESS_STALE_TTL', 300)
+
+        if outcome == ACCESS_OK:
+            fresh_until = now + getattr(settings, 'MEET_ACCESS_CACHE_TTL', 60)
+            stale_until = fresh_until + stale_ttl
+            end_time = _parse_timestamp((access_data or {}).get('end_time'))
+            if end_time is not None:
+                fresh_until = min(fresh_until, end_time)
+                stale_until = min(stale_until, end_time)
+        elif outcome == ACCESS_DENIED:
+            fresh_until = now + getattr(settings, 'MEET_ACCESS_NEGATIVE_TTL', 30)
+            stale_until = fresh_until + stale_ttl
+        elif outcome == ACCESS_UPCOMING:
+            fresh_until = now + getattr(settings, 'MEET_ACCESS_NEGATIVE_TTL', 30)
+            start_time = _parse_timestamp((access_data or {}).get('start_time'))
+            if start_time is not None:
+                fresh_until = min(fresh_until, start_time)
+            stale_until = fresh_until
+        elif outcome == ACCESS_PAST:
+            fresh_until = stale_until = now + getattr(settings, 'MEET_ACCESS_PAST_TTL', 86400)
+        else:
+            return None
+
+        if stale_until <= now:
+            return None
+        return fresh_until, stale_until
+
+    def _build_entry(self, access_data, error_message, outcome):
+        """
+        Return (entry, cache timeout) for a result, or None to skip caching
+        """
+        now = time.time()
+        lifetimes = self._lifetimes(access_data, outcome, now)
+        if lifetimes is None:
+            return None
+        fresh_until, stale_until = lifetimes
+        entry = {
+            'access_data': access_data,
+            'error': error_message,
+            'fresh_until': fresh_until,
+            'stale_until': stale_until,
+        }
+        return entry, max(1, int(stale_until - now) + 1)
+
+    def _store(self, entry_key, access_data, error_message, outcome):
+        built = self._build_entry(access_data, error_message, outcome)
+        if built is None:
+            return
+        try:
+            self.cache.set(entry_key, *built)
+        except Exception as e:
+            logger.warning(f"Meet access cache unavailable: {str(e)}")
+
+    async def _astore(self, entry_key, access_data, error_message, outcome):
+        built = self._build_entry(access_data, error_message, outcome)
+        if built is None:
+            return
+        try:
+            await self.cache.aset(entry_key, *built)
+        except Exception as e:
+            logger.warning(f"Meet access cache unavailable: {str(e)}")
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_refresh_workers, thread_name_prefix='meet-access-refresh'
+                    )
+        return self._executor
+
+    def _refresh(self, room_name, user, entry_key, lock_key):
+        try:
+            access_data, error_message, outcome = self.loader(room_name, user)
+            self._store(entry_key, access_data, error_message, outcome)
+        except Exception as e:
+            logger.error(f"Background meet access refresh failed for room {room_name}: {str(e)}")
+        finally:
+            self.cache.delete(lock_key)
+
+    def _schedule_refresh(self, room_name, user, entry_key, lock_key):
+        lock_timeout = getattr(settings, 'MEET_ACCESS_REFRESH_LOCK_TIMEOUT', 30)
+        if self.cache.add(lock_key, 1, lock_timeout):
+            self._get_executor().submit(self._refresh, room_name, user, entry_key, lock_key)
+
+    def get(self, room_name, user):
+        """
+        Return (access_data, error_message) for the user and room
+        """
+        entry_key, lock_key = self._keys(room_name, user.guid)
+
+        try:
+            entry = self.cache.get(entry_key)
+        except Exception as e:
+            logger.warning(f"Meet access cache unavailable: {str(e)}")
+            entry = None
+
+        if entry is not None:
+            now = time.time()
+            if now < entry['fresh_until']:
+                return entry['access_data'], entry['error']
+            if now < entry['stale_until']:
+                self._schedule_refresh(room_name, user, entry_key, lock_key)
+                return entry['access_data'], entry['error']
+
+        access_data, error_message, outcome = self.loader(room_name, user)
+        self._store(entry_key, access_data, error_message, outcome)
+        return access_data, error_message
+
+    async def _arefresh(self, room_name, user, aloader, entry_key, lock_key):
+        try:
+            access_data, error_message, outcome = await aloader(room_name, user)
+            await self._astore(entry_key, access_data, error_message, outcome)
+        except Exception as e:
+            logger.error(f"Background meet access refresh failed for room {room_name}: {str(e)}")
+        finally:
+            await self.cache.adelete(lock_key)
+
+    async def aget(self, room_name, user, aloader):
+        """
+        Async get() for ASGI views; aloader is a coroutine function with the
+        loader's signature. Background refreshes run as event loop tasks.
+        """
+        entry_key, lock_key = self._keys(room_name, user.guid)
+
+        try:
+            entry = await self.cache.aget(entry_key)
+        except Exception as e:
+            logger.warning(f"Meet access cache unavailable: {str(e)}")
+            entry = None
+
+        if entry is not None:
+            now = time.time()
+            if now < entry['fresh_until']:
+                return entry['access_data'], entry['error']
+            if now < entry['stale_until']:
+                lock_timeout = getattr(settings, 'MEET_ACCESS_REFRESH_LOCK_TIMEOUT', 30)
+                if await self.cache.aadd(lock_key, 1, lock_timeout):
+                    task = asyncio.create_task(self._arefresh(room_name, user, aloader, entry_key, lock_key))
+                    # Keep a reference so the task is not garbage collected mid-flight
+                    self._refresh_tasks.add(task)
+                    task.add_done_callback(self._refresh_tasks.discard)
+                return entry['access_data'], entry['error']
+
+        access_data, error_message, outcome = await aloader(room_name, user)
+        await self._astore(entry_key, access_data, error_message, outcome)
+        return access_data, error_message
+
+    def invalidate(self, room_name, user):
+        entry_key, _ = self._keys(room_name, user.guid)
+        self.cache.delete(entry_key)
@@ -0,0 +1,356 @@
+"""
+Pooled, keep-alive HTTP client for upstream APIs (the meets access API)
+"""
+
+import asyncio
+import bisect
+import logging
+import random
+import threading
+import time
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Latency histogram bucket upper bounds, in seconds
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+RETRY_STATUS_CODES = frozenset({502, 503, 504})
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """
+    Raised instead of calling an upstream whose circuit breaker is open
+    """
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After failure_threshold failures in a row the circuit opens and calls
+    fail fast for reset_timeout seconds. Then a single trial call is let
+    through (half-open): success closes the circuit, failure reopens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Circuit opened after {self._failures} consecutive failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class LatencyHistogram:
+    """
+    Cumulative latency histogram (Prometheus-style buckets plus sum/count)
+    """
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += seconds
+            self._count += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+
+        cumulative = 0
+        buckets = {}
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            buckets[str(bound)] = cumulative
+        buckets['+Inf'] = count
+        return {'buckets': buckets, 'sum': round(total, 6), 'count': count}
+
+
+class UpstreamClient:
+    """
+    Long-lived requests.Session for one upstream with a bounded connection
+    pool, retries with full-jitter exponential backoff on connection errors
+    and 502/503/504, a circuit breaker, and a latency histogram per outcome
+    (success / error / circuit_open).
+
+    Each call has an overall deadline: every attempt gets at most the time
+    that is left of it, and no retry starts once it has passed. A read
+    timeout is not retried, since the upstream may still be working on the
+    request and another attempt would only add to its load.
+    """
+
+    def __init__(self, name, pool_size=10, timeout=10, max_retries=2, deadline=15,
+                 backoff_base=0.1, backoff_max=2.0, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.histograms = {}
+        self._histograms_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _observe(self, outcome, seconds):
+        histogram = self.histograms.get(outcome)
+        if histogram is None:
+            with self._histograms_lock:
+                histogram = self.histograms.setdefault(outcome, LatencyHistogram())
+        histogram.observe(seconds)
+
+    def _backoff(self, attempt):
+        # Full jitter: uniform in [0, min(max, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _attempt_timeout(self, timeout, remaining):
+        """The per-attempt timeout (a number or a (connect, read) tuple) capped at `remaining`."""
+        if timeout is None:
+            return remaining
+        if isinstance(timeout, tuple):
+            return tuple(remaining if part is None else min(part, remaining) for part in timeout)
+        return min(timeout, remaining)
+
+    def get(self, url, deadline=None, **kwargs):
+        """
+        GET with pooling, retries and the circuit breaker, all within
+        `deadline` seconds (the client's deadline by default). Raises
+        CircuitOpenError (a ConnectionError) when the circuit is open.
+        """
+        timeout = kwargs.pop('timeout', self.timeout)
+        expires = time.monotonic() + (self.deadline if deadline is None else deadline)
+
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                self._observe('circuit_open', 0.0)
+                raise CircuitOpenError(f"Circuit for upstream '{self.name}' is open")
+
+            remaining = expires - time.monotonic()
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, timeout=self._attempt_timeout(timeout, remaining), **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self._observe('error', time.perf_counter() - started)
+                self.breaker.record_failure()
+                # ConnectTimeout is a ConnectionError; ReadTimeout is not
+                if attempt == self.max_retries or not isinstance(e, requests.exceptions.ConnectionError):
+                    raise
+                last_response = None
+                last_error = e
+            else:
+                if response.status_code in RETRY_STATUS_CODES:
+                    self._observe('error', time.perf_counter() - started)
+                    self.breaker.record_failure()
+                    if attempt == self.max_retries:
+                        return response
+                    last_response = response
+                else:
+                    self._observe('success', time.perf_counter() - started)
+                    self.breaker.record_success()
+                    return response
+
+            backoff = self._backoff(attempt)
+            if time.monotonic() + backoff >= expires:
+                # No time left for another attempt
+                if last_response is not None:
+                    return last_response
+                raise last_error
+            time.sleep(backoff)
+
+    def stats(self):
+        return {
+            'circuit': self.breaker.state,
+            'latency': {outcome: histogram.snapshot() for outcome, histogram in self.histograms.items()},
+        }
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncUpstreamClient:
+    """
+    asyncio counterpart of UpstreamClient built on httpx.AsyncClient.
+
+    Shares the circuit breaker, latency histograms and retry settings of the
+    sync client for the same upstream, so both paths see one circuit state.
+    An httpx client is bound to an event loop, so one is kept per loop.
+    """
+
+    def __init__(self, sync_client, pool_size=100):
+        self.sync_client = sync_client
+        self.pool_size = pool_size
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _get_client(self):
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=self.sync_client.timeout,
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            )
+            self._clients[loop] = client
+        return client
+
+    async def get(self, url, deadline=None, **kwargs):
+        """
+        Async GET with retries and the shared circuit breaker, all within
+        `deadline` seconds (the sync client's deadline by default). Raises
+        CircuitOpenError when the circuit is open and httpx.TransportError
+        subclasses when an attempt fails and is not retried.
+        """
+        import httpx
+
+        upstream = self.sync_client
+        client = self._get_client()
+        timeout = kwargs.pop('timeout', upstream.timeout)
+        expires = time.monotonic() + (upstream.deadline if deadline is None else deadline)
+
+        for attempt in range(upstream.max_retries + 1):
+            if not upstream.breaker.allow():
+                upstream._observe('circuit_open', 0.0)
+                raise CircuitOpenError(f"Circuit for upstream '{upstream.name}' is open")
+
+            remaining = expires - time.monotonic()
+            started = time.perf_counter()
+            try:
+                response = await client.get(url, timeout=upstream._attempt_timeout(timeout, remaining), **kwargs)
+            except httpx.TransportError as e:
+                upstream._observe('error', time.perf_counter() - started)
+                upstream.breaker.record_failure()
+                # Only failures to connect are retried, not read or pool timeouts
+                if attempt == upstream.max_retries or not isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout)):
+                    raise
+                last_response = None
+                last_error = e
+            else:
+                if response.status_code in RETRY_STATUS_CODES:
+                    upstream._observe('error', time.perf_counter() - started)
+                    upstream.breaker.record_failure()
+                    if attempt == upstream.max_retries:
+                        return response
+                    last_response = response
+                else:
+                    upstream._observe('success', time.perf_counter() - started)
+                    upstream.breaker.record_success()
+                    return response
+
+            backoff = upstream._backoff(attempt)
+            if time.monotonic() + backoff >= expires:
+                # No time left for another attempt
+                if last_response is not None:
+                    return last_response
+                raise last_error
+            await asyncio.sleep(backoff)
+
+
+_upstreams = {}
+_upstreams_lock = threading.Lock()
+_async_upstreams = {}
+
+
+def get_upstream_client(name):
+    """
+    Return the process-wide client for an upstream, configured from settings
+    """
+    client = _upstreams.get(name)
+    if client is None:
+        with _upstreams_lock:
+            client = _upstreams.get(name)
+            if client is None:
+                client = UpstreamClient(
+                    name,
+                    pool_size=getattr(settings, 'MEET_API_POOL_SIZE', 10),
+                    timeout=getattr(settings, 'MEET_API_TIMEOUT', 10),
+                    max_retries=getattr(settings, 'MEET_API_MAX_RETRIES', 2),
+                    deadline=getattr(settings, 'MEET_API_DEADLINE', 15),
+                    backoff_base=getattr(settings, 'MEET_API_BACKOFF_BASE', 0.1),
+                    backoff_max=getattr(settings, 'MEET_API_BACKOFF_MAX', 2.0),
+                    failure_threshold=getattr(settings, 'MEET_API_CIRCUIT_FAILURES', 5),
+                    reset_timeout=getattr(settings, 'MEET_API_CIRCUIT_RESET', 30.0),
+                )
+                _upstreams[name] = client
+    return client
+
+
+def get_async_upstream_client(name):
+    """
+    Return the process-wide async client for an upstream
+    """
+    client = _async_upstreams.get(name)
+    if client is None:
+        sync_client = get_upstream_client(name)
+        with _upstreams_lock:
+            client = _async_upstreams.get(name)
+            if client is None:
+                client = AsyncUpstreamClient(
+                    sync_client,
+                    pool_size=getattr(settings, 'MEET_API_ASYNC_POOL_SIZE', 100),
+                )
+                _async_upstreams[name] = client
+    return client
+
+
+def get_upstream_stats():
+    return {name: client.stats() for name, client in list(_upstreams.items())}
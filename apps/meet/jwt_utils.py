@@ -3,12 +3,19 @@ JWT utilities for meet.avinoo.ir integration
 """
 
 import logging
-import jwt
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import requests
 from datetime import datetime, timedelta
 from django.conf import settings
 from django.utils import timezone
 
+from .jwt_template import MeetJWTTemplate
+from .http_client import get_upstream_client, get_async_upstream_client, CircuitOpenError
+from .access_cache import (
+    MeetAccessCache, ACCESS_OK, ACCESS_DENIED, ACCESS_UPCOMING, ACCESS_PAST, ACCESS_UNAVAILABLE
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,72 +28,138 @@ class MeetJWTGenerator:
         self.app_id = "meet_avinoo"
         self.domain = "meet.avinoo.ir"
         self.app_secret = getattr(settings, 'MEET_JWT_SECRET', 'super_secret_key_98765')
+        self.jwt_template = MeetJWTTemplate(self.app_id, self.domain, self.app_secret)
         self.external_api_url = getattr(settings, 'MEET_EXTERNAL_API_URL', 'http://avinoo.ir/api/meets/access/')
+        self.http_client = get_upstream_client('meets_api')
+        self.access_cache = MeetAccessCache(self.fetch_user_access)
+        self._sign_executor = None
+        self._sign_executor_lock = threading.Lock()
     
     def check_user_access(self, room_name, user):
         """
-        Check user access to meet room via external API
+        Check user access to meet room (cached, see MeetAccessCache)
         Returns tuple: (access_data, error_message)
         """
+        access_data, error_message = self.access_cache.get(room_name, user)
+        if error_message:
+            # Upcoming results keep their access_data in the cache for start_time only
+            return None, error_message
+        return access_data, None
+    
+    def _parse_access_response(self, response, user_guid):
+        """
+        Turn a meets API response (requests or httpx) into
+        (access_data, error_message, outcome)
+        """
+        if response.status_code == 200:
+            data = response.json()
+            if data.get('success'):
+                access_data = data['data']
+                
+                # بررسی دسترسی کاربر
+                if not access_data.get('has_access', False):
+                    return None, "شما دسترسی به این جلسه ندارید", ACCESS_DENIED
+                
+                # بررسی وضعیت جلسه
+                status = access_data.get('status', '')
+                if status == 'past':
+                    return None, "این جلسه به پایان رسیده است", ACCESS_PAST
+                elif status == 'upcoming':
+                    start_time = access_data.get('start_time', '')
+                    return access_data, f"جلسه هنوز شروع نشده است. زمان شروع: {start_time}", ACCESS_UPCOMING
+                elif status == 'ongoing':
+                    return access_data, None, ACCESS_OK
+                else:
+                    return access_data, None, ACCESS_OK
+            else:
+                # اگر API کاربر را نشناسد، خطا نمایش بده
+                error_msg = data.get('error', 'کاربر یافت نشد')
+                logger.warning(f"API user not found for GUID: {user_guid}, error: {error_msg}")
+                return None, f"کاربر در سیستم جلسات یافت نشد: {error_msg}", ACCESS_DENIED
+        else:
+            # اگر API در دسترس نباشد، خطا نمایش بده
+            if response.status_code == 404:
+                try:
+                    error_data = response.json()
+                    error_msg = error_data.get('error', 'کاربر یافت نشد')
+                    logger.warning(f"API user not found (404): {error_msg.encode('utf-8', 'ignore').decode('utf-8')}")
+                    return None, f"کاربر در سیستم جلسات یافت نشد: {error_msg}", ACCESS_DENIED
+                except:
+                    logger.warning(f"API user not found (404)")
+                    return None, "کاربر در سیستم جلسات یافت نشد", ACCESS_DENIED
+            else:
+                logger.warning(f"API unavailable (status: {response.status_code})")
+                return None, f"خطا در ارتباط با سرور جلسات (کد: {response.status_code})", ACCESS_UNAVAILABLE
+    
+    def fetch_user_access(self, room_name, user):
+        """
+        Check user access to meet room via external API
+        Returns tuple: (access_data, error_message, outcome)
+        """
+        user_guid = getattr(user, 'guid', None)
         try:
             # استفاده از GUID کاربر از فیلد guid در مدل User
-            user_guid = user.guid
             logger.info(f"Checking access for user {user.username} (GUID: {user_guid}) to room {room_name}")
             
-            response = requests.get(self.external_api_url, params={
+            response = self.http_client.get(self.external_api_url, params={
                 'room_name': room_name,
                 'user_guid': str(user_guid)
-            }, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('success'):
-                    access_data = data['data']
-                    
-                    # بررسی دسترسی کاربر
-                    if not access_data.get('has_access', False):
-                        return None, "شما دسترسی به این جلسه ندارید"
-                    
-                    # بررسی وضعیت جلسه
-                    status = access_data.get('status', '')
-                    if status == 'past':
-                        return None, "این جلسه به پایان رسیده است"
-                    elif status == 'upcoming':
-                        start_time = access_data.get('start_time', '')
-                        return None, f"جلسه هنوز شروع نشده است. زمان شروع: {start_time}"
-                    elif status == 'ongoing':
-                        return access_data, None
-                    else:
-                        return access_data, None
-                else:
-                    # اگر API کاربر را نشناسد، خطا نمایش بده
-                    error_msg = data.get('error', 'کاربر یافت نشد')
-                    logger.warning(f"API user not found for GUID: {user_guid}, error: {error_msg}")
-                    return None, f"کاربر در سیستم جلسات یافت نشد: {error_msg}"
-            else:
-                # اگر API در دسترس نباشد، خطا نمایش بده
-                if response.status_code == 404:
-                    try:
-                        error_data = response.json()
-                        error_msg = error_data.get('error', 'کاربر یافت نشد')
-                        logger.warning(f"API user not found (404): {error_msg.encode('utf-8', 'ignore').decode('utf-8')}")
-                        return None, f"کاربر در سیستم جلسات یافت نشد: {error_msg}"
-                    except:
-                        logger.warning(f"API user not found (404)")
-                        return None, "کاربر در سیستم جلسات یافت نشد"
-                else:
-                    logger.warning(f"API unavailable (status: {response.status_code})")
-                    return None, f"خطا در ارتباط با سرور جلسات (کد: {response.status_code})"
+            })
             
+            return self._parse_access_response(response, user_guid)
+            
+        except CircuitOpenError:
+            logger.warning(f"Meets API circuit open, skipping access check for room: {room_name}")
+            return None, "خطا در ارتباط با سرور", ACCESS_UNAVAILABLE
         except requests.exceptions.Timeout:
             logger.error(f"Timeout checking user access for room: {room_name}, user: {user_guid}")
-            return None, "خطا در ارتباط با سرور - زمان انتظار به پایان رسید"
+            return None, "خطا در ارتباط با سرور - زمان انتظار به پایان رسید", ACCESS_UNAVAILABLE
         except requests.exceptions.ConnectionError:
             logger.error(f"Connection error checking user access for room: {room_name}, user: {user_guid}")
-            return None, "خطا در ارتباط با سرور"
+            return None, "خطا در ارتباط با سرور", ACCESS_UNAVAILABLE
+        except Exception as e:
+            logger.error(f"Error checking user access: {str(e)}")
+            return None, "خطای غیرمنتظره در بررسی دسترسی", ACCESS_UNAVAILABLE
+    
+    async def acheck_user_access(self, room_name, user):
+        """
+        Async check_user_access for ASGI views
+        Returns tuple: (access_data, error_message)
+        """
+        access_data, error_message = await self.access_cache.aget(room_name, user, self.afetch_user_access)
+        if error_message:
+            return None, error_message
+        return access_data, None
+    
+    async def afetch_user_access(self, room_name, user):
+        """
+        Async fetch_user_access using the pooled httpx client
+        Returns tuple: (access_data, error_message, outcome)
+        """
+        import httpx
+        
+        user_guid = getattr(user, 'guid', None)
+        try:
+            logger.info(f"Checking access for user {user.username} (GUID: {user_guid}) to room {room_name}")
+            
+            response = await get_async_upstream_client('meets_api').get(self.external_api_url, params={
+                'room_name': room_name,
+                'user_guid': str(user_guid)
+            })
+            return self._parse_access_response(response, user_guid)
+            
+        except CircuitOpenError:
+            logger.warning(f"Meets API circuit open, skipping access check for room: {room_name}")
+            return None, "خطا در ارتباط با سرور", ACCESS_UNAVAILABLE
+        except httpx.TimeoutException:
+            logger.error(f"Timeout checking user access for room: {room_name}, user: {user_guid}")
+            return None, "خطا در ارتباط با سرور - زمان انتظار به پایان رسید", ACCESS_UNAVAILABLE
+        except httpx.TransportError:
+            logger.error(f"Connection error checking user access for room: {room_name}, user: {user_guid}")
+            return None, "خطا در ارتباط با سرور", ACCESS_UNAVAILABLE
         except Exception as e:
             logger.error(f"Error checking user access: {str(e)}")
-            return None, "خطای غیرمنتظره در بررسی دسترسی"
+            return None, "خطای غیرمنتظره در بررسی دسترسی", ACCESS_UNAVAILABLE
     
     def _get_default_access_data(self, room_name):
         """
@@ -119,33 +192,37 @@ class MeetJWTGenerator:
             'is_past': False
         }
     
+    def _token_window(self, access_data=None):
+        """
+        Return (exp, nbf) for a meet token
+        """
+        # Get current time
+        now = timezone.now()
+        
+        # Calculate token expiration based on meeting time
+        if access_data and access_data.get('start_time') and access_data.get('end_time'):
+            start_time = datetime.fromisoformat(access_data['start_time'].replace('Z', '+00:00'))
+            end_time = datetime.fromisoformat(access_data['end_time'].replace('Z', '+00:00'))
+            
+            # Token valid from 10 minutes before start to 10 minutes after end
+            token_start = start_time - timedelta(minutes=10)
+            token_end = end_time + timedelta(minutes=10)
+            
+            # Ensure token doesn't start in the future
+            if token_start > now:
+                token_start = now
+            
+            return int(token_end.timestamp()), int(token_start.timestamp())
+        
+        # Default: 1 hour from now
+        return int((now + timedelta(hours=1)).timestamp()), int(now.timestamp())
+    
     def generate_meet_jwt(self, user, room_name, access_data=None):
         """
         Generate JWT token for meet.avinoo.ir
         """
         try:
-            # Get current time
-            now = timezone.now()
-            
-            # Calculate token expiration based on meeting time
-            if access_data and access_data.get('start_time') and access_data.get('end_time'):
-                start_time = datetime.fromisoformat(access_data['start_time'].replace('Z', '+00:00'))
-                end_time = datetime.fromisoformat(access_data['end_time'].replace('Z', '+00:00'))
-                
-                # Token valid from 10 minutes before start to 10 minutes after end
-                token_start = start_time - timedelta(minutes=10)
-                token_end = end_time + timedelta(minutes=10)
-                
-                # Ensure token doesn't start in the future
-                if token_start > now:
-                    token_start = now
-                
-                exp = int(token_end.timestamp())
-                nbf = int(token_start.timestamp())
-            else:
-                # Default: 1 hour from now
-                exp = int((now + timedelta(hours=1)).timestamp())
-                nbf = int(now.timestamp())
+            exp, nbf = self._token_window(access_data)
             
             # Get user data
             user_data = user.get_meet_user_data()
@@ -157,48 +234,9 @@ class MeetJWTGenerator:
             else:
                 is_moderator = user.is_superuser or user.is_staff
             
-            # Build JWT payload - exact format as requested
-            payload = {
-                "aud": self.app_id,
-                "iss": self.app_id,
-                "sub": self.domain,
-                "room": room_name,
-                "exp": exp,
-                "nbf": nbf,
-                "moderator": is_moderator,
-            "context": {
-                "user": {
-                    "id": str(user.id),
-                    "name": user_data.get('name', ''),
-                    "email": user_data.get('email', ''),
-                    "avatar": user_data.get('avatar', ''),
-                    "affiliation": user_data.get('affiliation', 'member'),
-                    "moderator": user_data.get('moderator', False),
-                    "region": user_data.get('region', 'us-east'),
-                    "displayName": user_data.get('displayName', '')
-                },
-                "group": "dev-team",
-                "features": {
-                    "livestreaming": True,
-                    "recording": True,
-                    "screen-sharing": True,
-                    "transcription": True
-                }
-            },
-                "identity": {
-                    "type": "user",
-                    "guest": False,
-                    "externalId": f"ext-{user.id}"
-                },
-                "custom": {
-                    "theme": "green",
-                    "allowKnocking": True,
-                    "enablePolls": True
-                }
-            }
-            
-            # Generate JWT token
-            token = jwt.encode(payload, self.app_secret, algorithm="HS256")
+            # Static parts of the payload are pre-serialized in the template;
+            # output is byte-identical to jwt.encode() of the full payload dict
+            token = self.jwt_template.encode(room_name, exp, nbf, is_moderator, user.id, user_data)
             
             logger.info(f"Meet JWT generated for user {user.username} in room {room_name}")
             return token
@@ -207,6 +245,42 @@ class MeetJWTGenerator:
             logger.error(f"Error generating meet JWT: {str(e)}")
             return None
     
+    def _get_sign_executor(self):
+        if self._sign_executor is None:
+            with self._sign_executor_lock:
+                if self._sign_executor is None:
+                    self._sign_executor = ThreadPoolExecutor(
+                        max_workers=getattr(settings, 'MEET_BATCH_WORKERS', 4), thread_name_prefix='meet-jwt-sign'
+                    )
+        return self._sign_executor
+    
+    def issue_room_tokens(self, room_name, users, access_data, moderator_guids=()):
+        """
+        Sign meet tokens for many users of one room.
+        
+        access_data is the room's single access lookup, shared by all users:
+        its start/end time give one exp/nbf for the batch, and moderator
+        status comes from moderator_guids only. Users are signed in chunks of
+        MEET_BATCH_CHUNK_SIZE on a thread pool; yields (user, token) in input
+        order as chunks complete.
+        """
+        exp, nbf = self._token_window(access_data)
+        template = self.jwt_template
+        moderator_guids = set(moderator_guids)
+        
+        def sign(chunk):
+            return [
+                (user, template.encode(
+                    room_name, exp, nbf, user.guid in moderator_guids, user.id, user.get_meet_user_data()
+                ))
+                for user in chunk
+            ]
+        
+        chunk_size = max(1, getattr(settings, 'MEET_BATCH_CHUNK_SIZE', 50))
+        chunks = [users[i:i + chunk_size] for i in range(0, len(users), chunk_size)]
+        for signed in self._get_sign_executor().map(sign, chunks):
+            yield from signed
+    
     def generate_meet_redirect_url(self, user, room_name, access_data=None):
         """
         Generate complete redirect URL with JWT token for meet.avinoo.ir
@@ -229,8 +303,17 @@ class MeetJWTGenerator:
             return None
 
 
+_meet_jwt_generator = None
+_meet_jwt_generator_lock = threading.Lock()
+
+
 def get_meet_jwt_generator():
     """
-    Get MeetJWTGenerator instance
+    Get the process-wide MeetJWTGenerator instance
     """
-    return MeetJWTGenerator()
+    global _meet_jwt_generator
+    if _meet_jwt_generator is None:
+        with _meet_jwt_generator_lock:
+            if _meet_jwt_generator is None:
+                _meet_jwt_generator = MeetJWTGenerator()
+    return _meet_jwt_generator
@@ -5,3 +5,7 @@ class PermissionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.permissions'
     verbose_name = 'Permissions Management'
+
+    def ready(self):
+        """Register permission cache invalidation signals"""
+        from . import signals  # noqa: F401
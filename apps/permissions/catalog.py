@@ -0,0 +1,151 @@
+"""
+Versioned permission catalog and compact permission bitmaps for JWT claims.
+
+The catalog is the list of active permission names ordered by id. A user's
+permission set is encoded as a bitmap over that list (bit i set = the user
+holds catalog[i]), base64url-encoded, and tagged with the catalog version so
+client apps can decode it with GET /permissions/catalog/?version=<v>.
+Every version that tokens were issued with is kept in the
+PermissionCatalogVersion table, so any worker can serve it, also after a
+restart.
+"""
+
+import base64
+import hashlib
+import logging
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from apps.roles.models import Permission, UserRole
+from auth_service.cache import CacheAside
+from .models import PermissionCatalogVersion
+from .resolver import permission_resolver, CATALOG_VERSION_KEY
+
+logger = logging.getLogger(__name__)
+
+CATALOG_BY_VERSION_KEY = 'perms:catalog:v:{version}'
+
+ROLES_CLAIM = 'roles'
+PERMISSIONS_CLAIM = 'perms'
+CATALOG_VERSION_CLAIM = 'perms_v'
+
+
+class PermissionCatalog:
+    """
+    Ordered permission names with a content-derived version.
+    """
+
+    def __init__(self, names):
+        self.names = tuple(names)
+        self.index = {name: position for position, name in enumerate(self.names)}
+        self.version = hashlib.sha256('\n'.join(self.names).encode()).hexdigest()[:12]
+
+    def encode(self, permission_names):
+        """
+        Encode a set of permission names as a base64url bitmap (LSB first)
+        """
+        bitmap = bytearray((len(self.names) + 7) // 8)
+        for name in permission_names:
+            position = self.index.get(name)
+            if position is not None:
+                bitmap[position >> 3] |= 1 << (position & 7)
+        return base64.urlsafe_b64encode(bytes(bitmap)).rstrip(b'=').decode('ascii')
+
+    def decode(self, encoded):
+        """
+        Decode a bitmap produced by encode() back to permission names
+        """
+        padded = encoded + '=' * (-len(encoded) % 4)
+        bitmap = base64.urlsafe_b64decode(padded)
+        return frozenset(
+            name for position, name in enumerate(self.names)
+            if position >> 3 < len(bitmap) and bitmap[position >> 3] & (1 << (position & 7))
+        )
+
+    def to_dict(self):
+        return {'version': self.version, 'permissions': list(self.names)}
+
+
+def _catalog_history_timeout():
+    # Keep old catalogs around as long as tokens that reference them can live
+    lifetime = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+    return int(lifetime.total_seconds())
+
+
+def _load_catalog_names():
+    return list(Permission.objects.filter(is_active=True).order_by('id').values_list('name', flat=True))
+
+
+# Current catalog names, keyed by the resolver's catalog version counter
+_catalog_names = CacheAside(
+    'perms:catalog',
+    _load_catalog_names,
+    alias=getattr(settings, 'PERMISSIONS_CACHE_ALIAS', 'default'),
+    timeout=getattr(settings, 'PERMISSIONS_CACHE_TIMEOUT', 300),
+    version_keys=lambda: [CATALOG_VERSION_KEY],
+)
+
+
+# Versions this process has already stored, to skip the lookup on every token
+_stored_versions = set()
+
+
+def get_permission_catalog():
+    """
+    Return the current catalog, cached per catalog version and stored in
+    the database the first time this process sees its version
+    """
+    catalog = PermissionCatalog(_catalog_names.get())
+    if catalog.version not in _stored_versions:
+        PermissionCatalogVersion.objects.get_or_create(
+            version=catalog.version, defaults={'permissions': list(catalog.names)}
+        )
+        permission_resolver.cache.set(
+            CATALOG_BY_VERSION_KEY.format(version=catalog.version), catalog.names, _catalog_history_timeout()
+        )
+        _stored_versions.add(catalog.version)
+    return catalog
+
+
+def get_permission_catalog_version(version):
+    """
+    Return the catalog with the given version if it is known, else None
+    """
+    current = get_permission_catalog()
+    if current.version == version:
+        return current
+
+    key = CATALOG_BY_VERSION_KEY.format(version=version)
+    names = permission_resolver.cache.get(key)
+    if names is None:
+        names = PermissionCatalogVersion.objects.filter(version=version).values_list(
+            'permissions', flat=True
+        ).first()
+        if names is None:
+            return None
+        permission_resolver.cache.set(key, tuple(names), _catalog_history_timeout())
+    return PermissionCatalog(names)
+
+
+def get_active_role_names(user_id):
+    now = timezone.now()
+    return sorted(UserRole.objects.filter(
+        Q(expires_at__isnull=True) | Q(expires_at__gt=now),
+        user_id=user_id,
+        is_active=True,
+        role__is_active=True,
+    ).values_list('role__name', flat=True))
+
+
+def add_authorization_claims(token, user):
+    """
+    Add role names and the permission bitmap to a token
+    """
+    catalog = get_permission_catalog()
+    token[ROLES_CLAIM] = get_active_role_names(user.pk)
+    token[PERMISSIONS_CLAIM] = catalog.encode(permission_resolver.get_permissions(user.pk))
+    token[CATALOG_VERSION_CLAIM] = catalog.version
+    return token
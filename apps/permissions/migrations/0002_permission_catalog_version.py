@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-17 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('permissions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PermissionCatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=64, unique=True, verbose_name='نسخه')),
+                ('permissions', models.JSONField(verbose_name='مجوزها')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ایجاد')),
+            ],
+            options={
+                'verbose_name': 'نسخه کاتالوگ مجوزها',
+                'verbose_name_plural': 'نسخه\u200cهای کاتالوگ مجوزها',
+                'db_table': 'permission_catalog_versions',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
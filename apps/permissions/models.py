@@ -257,3 +257,35 @@ class AuditLog(models.Model):
     
     def __str__(self):
         return f"{self.get_action_display()} - {self.user} - {self.created_at}"
+
+
+class PermissionCatalogVersion(models.Model):
+    """
+    A permission catalog as it was when tokens were issued with it, so any
+    worker can decode the 'perms' claim of those tokens.
+    See apps.permissions.catalog.
+    """
+    
+    version = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name="نسخه"
+    )
+    
+    permissions = models.JSONField(
+        verbose_name="مجوزها"
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="تاریخ ایجاد"
+    )
+    
+    class Meta:
+        verbose_name = "نسخه کاتالوگ مجوزها"
+        verbose_name_plural = "نسخه‌های کاتالوگ مجوزها"
+        db_table = 'permission_catalog_versions'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return self.version
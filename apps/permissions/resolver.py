@@ -0,0 +1,145 @@
+"""
+Effective permission resolution for users.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.roles.models import Permission
+from .models import UserPermission
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_KEY = 'perms:catalog:version'
+USER_VERSION_KEY = 'perms:user:{user_id}:version'
+USER_PERMISSIONS_KEY = 'perms:user:{user_id}:{catalog_version}:{user_version}'
+
+
+class EffectivePermissionResolver:
+    """
+    Computes and caches the set of permission names a user effectively holds:
+    permissions of their active, unexpired roles (UserRole -> Role ->
+    RolePermission -> Permission) plus their active, unexpired direct grants
+    (UserPermission). Inactive roles and permissions are ignored.
+
+    The result is cached as a frozenset under a key made of two version
+    counters: a catalog version (bumped when roles, permissions or role
+    grants change, which can affect any user) and a per-user version (bumped
+    when that user's role or permission grants change). Bumping a counter
+    makes old entries unreachable; they expire on their own. An entry never
+    outlives the earliest expires_at among the grants it was built from.
+    """
+
+    def __init__(self, cache_alias=None, timeout=None):
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        alias = self.cache_alias or getattr(settings, 'PERMISSIONS_CACHE_ALIAS', 'default')
+        return caches[alias]
+
+    def get_timeout(self):
+        if self.timeout is not None:
+            return self.timeout
+        return getattr(settings, 'PERMISSIONS_CACHE_TIMEOUT', 300)
+
+    def _load(self, user_id):
+        """
+        Build (permission names, earliest expiry) with two queries
+        """
+        now = timezone.now()
+        names = set()
+        expiries = []
+
+        role_permissions = Permission.objects.filter(
+            Q(permission_roles__role__role_users__expires_at__isnull=True) |
+            Q(permission_roles__role__role_users__expires_at__gt=now),
+            is_active=True,
+            permission_roles__role__is_active=True,
+            permission_roles__role__role_users__user_id=user_id,
+            permission_roles__role__role_users__is_active=True,
+        ).values_list('name', 'permission_roles__role__role_users__expires_at')
+
+        direct_permissions = UserPermission.objects.filter(
+            Q(expires_at__isnull=True) | Q(expires_at__gt=now),
+            user_id=user_id,
+            is_active=True,
+            permission__is_active=True,
+        ).values_list('permission__name', 'expires_at')
+
+        for queryset in (role_permissions, direct_permissions):
+            for name, expires_at in queryset:
+                names.add(name)
+                if expires_at is not None:
+                    expiries.append(expires_at)
+
+        return frozenset(names), min(expiries) if expiries else None
+
+    def _cache_key(self, user_id):
+        user_version_key = USER_VERSION_KEY.format(user_id=user_id)
+        versions = self.cache.get_many([CATALOG_VERSION_KEY, user_version_key])
+        return USER_PERMISSIONS_KEY.format(
+            user_id=user_id,
+            catalog_version=versions.get(CATALOG_VERSION_KEY, 0),
+            user_version=versions.get(user_version_key, 0),
+        )
+
+    def get_permissions(self, user_id):
+        """
+        Return the user's effective permission names as a frozenset
+        """
+        key = self._cache_key(user_id)
+        permissions = self.cache.get(key)
+        if permissions is not None:
+            return permissions
+
+        permissions, earliest_expiry = self._load(user_id)
+
+        timeout = self.get_timeout()
+        if earliest_expiry is not None:
+            seconds_left = int((earliest_expiry - timezone.now()).total_seconds())
+            timeout = max(1, min(timeout, seconds_left))
+        self.cache.set(key, permissions, timeout)
+        return permissions
+
+    def has_perm(self, user, permission_name):
+        """
+        Fast permission check; superusers have every permission
+        """
+        if not user or not user.is_active:
+            return False
+        if user.is_superuser:
+            return True
+        return permission_name in self.get_permissions(user.pk)
+
+    def _bump(self, key):
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, 1, None)
+
+    def invalidate_user(self, user_id):
+        self._bump(USER_VERSION_KEY.format(user_id=user_id))
+
+    def invalidate_users(self, user_ids):
+        for user_id in set(user_ids):
+            self.invalidate_user(user_id)
+
+    def invalidate_all(self):
+        self._bump(CATALOG_VERSION_KEY)
+
+
+permission_resolver = EffectivePermissionResolver()
+
+
+def get_effective_permissions(user_id):
+    return permission_resolver.get_permissions(user_id)
+
+
+def has_perm(user, permission_name):
+    return permission_resolver.has_perm(user, permission_name)
@@ -0,0 +1,32 @@
+"""
+Signal handlers that keep cached effective permissions fresh.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.roles.models import Role, UserRole, Permission, RolePermission
+from .models import UserPermission
+from .resolver import permission_resolver
+
+
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+@receiver(post_save, sender=UserPermission)
+@receiver(post_delete, sender=UserPermission)
+def invalidate_user_permissions(sender, instance, **kwargs):
+    """A user's own grants changed: only their cached set is affected."""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: permission_resolver.invalidate_user(user_id))
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+@receiver(post_save, sender=RolePermission)
+@receiver(post_delete, sender=RolePermission)
+def invalidate_all_permissions(sender, instance, **kwargs):
+    """Roles, permissions or role grants changed: any user may be affected."""
+    transaction.on_commit(permission_resolver.invalidate_all)
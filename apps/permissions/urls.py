@@ -12,6 +12,8 @@ urlpatterns = [
     path('user-permissions/', views.UserPermissionListView.as_view(), name='user_permission_list'),
     path('user-permissions/<int:pk>/', views.UserPermissionDetailView.as_view(), name='user_permission_detail'),
     path('users/<int:user_id>/permissions/', views.user_permissions_view, name='user_permissions'),
+    path('users/<int:user_id>/effective/', views.user_effective_permissions_view, name='user_effective_permissions'),
+    path('catalog/', views.permission_catalog_view, name='permission_catalog'),
     
     # Permission group management
     path('groups/', views.PermissionGroupListView.as_view(), name='permission_group_list'),
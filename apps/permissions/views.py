@@ -4,16 +4,16 @@ Views for Permissions app.
 
 import logging
 from rest_framework import status, generics, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import never_cache
-from django_ratelimit.decorators import ratelimit
-from django_ratelimit.exceptions import Ratelimited
 from django.db.models import Q
 
+from auth_service.ratelimit import rate_limit
+
 from .models import UserPermission, PermissionGroup, PermissionGroupPermission, AuditLog
 from .serializers import (
     UserPermissionSerializer, UserPermissionCreateSerializer,
@@ -21,6 +21,8 @@ from .serializers import (
     PermissionGroupPermissionSerializer, PermissionGroupPermissionCreateSerializer,
     AuditLogSerializer, UserWithPermissionsSerializer
 )
+from .resolver import get_effective_permissions
+from .catalog import get_permission_catalog, get_permission_catalog_version
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -53,7 +55,7 @@ class UserPermissionListView(generics.ListCreateAPIView):
         
         return queryset
     
-    @method_decorator(ratelimit(key='user', rate='10/m', method='POST'))
+    @method_decorator(rate_limit('user_permission_grant', key='user'))
     def create(self, request, *args, **kwargs):
         """Grant permission to user."""
         try:
@@ -85,11 +87,6 @@ class UserPermissionListView(generics.ListCreateAPIView):
             
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        except Ratelimited:
-            return Response({
-                'error': 'تعداد درخواست‌های شما بیش از حد مجاز است.'
-            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
-        
         except Exception as e:
             logger.error(f"Grant permission error: {str(e)}")
             return Response({
@@ -189,7 +186,7 @@ class PermissionGroupListView(generics.ListCreateAPIView):
         
         return queryset
     
-    @method_decorator(ratelimit(key='user', rate='10/m', method='POST'))
+    @method_decorator(rate_limit('permission_group_create', key='user'))
     def create(self, request, *args, **kwargs):
         """Create new permission group."""
         try:
@@ -207,11 +204,6 @@ class PermissionGroupListView(generics.ListCreateAPIView):
             
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        except Ratelimited:
-            return Response({
-                'error': 'تعداد درخواست‌های شما بیش از حد مجاز است.'
-            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
-        
         except Exception as e:
             logger.error(f"Create permission group error: {str(e)}")
             return Response({
@@ -284,7 +276,7 @@ class PermissionGroupPermissionListView(generics.ListCreateAPIView):
         
         return queryset
     
-    @method_decorator(ratelimit(key='user', rate='10/m', method='POST'))
+    @method_decorator(rate_limit('permission_group_add', key='user'))
     def create(self, request, *args, **kwargs):
         """Add permission to group."""
         try:
@@ -302,11 +294,6 @@ class PermissionGroupPermissionListView(generics.ListCreateAPIView):
             
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        except Ratelimited:
-            return Response({
-                'error': 'تعداد درخواست‌های شما بیش از حد مجاز است.'
-            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
-        
         except Exception as e:
             logger.error(f"Add permission to group error: {str(e)}")
             return Response({
@@ -373,3 +360,67 @@ def user_permissions_view(request, user_id):
         return Response({
             'error': 'خطایی در دریافت مجوزهای کاربر رخ داد.'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def user_effective_permissions_view(request, user_id):
+    """
+    Get user effective permissions (role permissions + direct permissions).
+    """
+    try:
+        user = User.objects.get(id=user_id)
+        effective_permissions = get_effective_permissions(user.id)
+        
+        return Response({
+            'user': {
+                'id': user.id,
+                'username': user.username,
+                'email': user.email
+            },
+            'permissions': sorted(effective_permissions),
+            'count': len(effective_permissions)
+        }, status=status.HTTP_200_OK)
+    
+    except User.DoesNotExist:
+        return Response({
+            'error': 'کاربر یافت نشد.'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    except Exception as e:
+        logger.error(f"Get user effective permissions error: {str(e)}")
+        return Response({
+            'error': 'خطایی در دریافت مجوزهای کاربر رخ داد.'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+@throttle_classes([])
+def permission_catalog_view(request):
+    """
+    Publish the permission catalog used to decode the 'perms' bitmap claim.
+    Pass ?version=<perms_v> to fetch the catalog a given token was issued with.
+    """
+    version = request.query_params.get('version')
+    catalog = get_permission_catalog_version(version) if version else get_permission_catalog()
+    
+    if catalog is None:
+        return Response({
+            'error': 'نسخه کاتالوگ مجوزها یافت نشد.'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    etag = f'"{catalog.version}"'
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(catalog.to_dict(), status=status.HTTP_200_OK)
+    
+    response['ETag'] = etag
+    # A versioned catalog never changes; the current one may change at any time
+    if version:
+        response['Cache-Control'] = 'public, max-age=86400, immutable'
+    else:
+        response['Cache-Control'] = 'public, max-age=60'
+    return response
@@ -3,7 +3,9 @@ Serializers for Role app.
 """
 
 import logging
+import uuid
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from .models import Role, UserRole, Permission, RolePermission
 
@@ -30,7 +32,7 @@ class RoleSerializer(serializers.ModelSerializer):
     Serializer for Role model.
     """
     
-    permissions = PermissionSerializer(many=True, read_only=True)
+    permissions = serializers.SerializerMethodField()
     permission_count = serializers.SerializerMethodField()
     user_count = serializers.SerializerMethodField()
     
@@ -43,12 +45,21 @@ class RoleSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
     
+    def get_permissions(self, obj):
+        """Get permissions of this role (uses prefetched role_permissions__permission)."""
+        role_permissions = obj.role_permissions.all()
+        return PermissionSerializer([rp.permission for rp in role_permissions], many=True).data
+    
     def get_permission_count(self, obj):
         """Get count of permissions for this role."""
+        if hasattr(obj, 'permission_count'):
+            return obj.permission_count
         return obj.role_permissions.count()
     
     def get_user_count(self, obj):
         """Get count of users with this role."""
+        if hasattr(obj, 'user_count'):
+            return obj.user_count
         return obj.role_users.filter(is_active=True).count()
 
 
@@ -117,6 +128,55 @@ class UserRoleCreateSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class UserRoleBulkSerializer(serializers.Serializer):
+    """
+    Serializer for bulk assigning/revoking roles (users x roles).
+    
+    Users may be given by ID or GUID. Users and roles are resolved with one
+    query each; unknown identifiers are kept (mapped to None) so the view can
+    report a per-item outcome instead of rejecting the whole request.
+    """
+    
+    users = serializers.ListField(child=serializers.CharField(max_length=64), allow_empty=False)
+    roles = serializers.ListField(child=serializers.CharField(max_length=50), allow_empty=False)
+    expires_at = serializers.DateTimeField(required=False, allow_null=True)
+    
+    def validate(self, attrs):
+        """Resolve users and roles with set-based queries."""
+        user_identifiers = list(dict.fromkeys(attrs['users']))
+        role_names = list(dict.fromkeys(attrs['roles']))
+        
+        max_items = getattr(settings, 'ROLES_BULK_MAX_ITEMS', 10000)
+        if len(user_identifiers) * len(role_names) > max_items:
+            raise serializers.ValidationError({
+                'users': f'حداکثر {max_items} ترکیب کاربر و نقش در هر درخواست مجاز است.'
+            })
+        
+        ids, guids = {}, {}
+        for identifier in user_identifiers:
+            if identifier.isascii() and identifier.isdigit():
+                ids[int(identifier)] = identifier
+            else:
+                try:
+                    guids[uuid.UUID(identifier)] = identifier
+                except ValueError:
+                    pass
+        
+        found = {}
+        if ids:
+            for user in User.objects.filter(id__in=ids).only('id', 'username'):
+                found[ids[user.id]] = user
+        if guids:
+            for user in User.objects.filter(guid__in=guids).only('id', 'username', 'guid'):
+                found[guids[user.guid]] = user
+        
+        roles = {role.name: role for role in Role.objects.filter(name__in=role_names)}
+        
+        attrs['users'] = [(identifier, found.get(identifier)) for identifier in user_identifiers]
+        attrs['roles'] = [(name, roles.get(name)) for name in role_names]
+        return attrs
+
+
 class RolePermissionSerializer(serializers.ModelSerializer):
     """
     Serializer for RolePermission model.
@@ -15,6 +15,8 @@ urlpatterns = [
     # User role management
     path('user-roles/', views.UserRoleListView.as_view(), name='user_role_list'),
     path('user-roles/<int:pk>/', views.UserRoleDetailView.as_view(), name='user_role_detail'),
+    path('user-roles/bulk/', views.UserRoleBulkView.as_view(), name='user_role_bulk'),
+    path('user-roles/bulk/revoke/', views.UserRoleBulkRevokeView.as_view(), name='user_role_bulk_revoke'),
     path('users/<int:user_id>/roles/', views.user_roles_view, name='user_roles'),
     
     # Permission management
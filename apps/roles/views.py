@@ -10,22 +10,45 @@ from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import never_cache
-from django_ratelimit.decorators import ratelimit
-from django_ratelimit.exceptions import Ratelimited
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Q, Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from auth_service.ratelimit import rate_limit
+from sso.utils import get_client_ip
 
 from .models import Role, UserRole, Permission, RolePermission
 from .serializers import (
     RoleSerializer, RoleCreateSerializer, UserRoleSerializer,
     UserRoleCreateSerializer, RolePermissionSerializer,
     RolePermissionCreateSerializer, UserWithRolesSerializer,
-    PermissionSerializer
+    PermissionSerializer, UserRoleBulkSerializer
 )
+from apps.permissions.models import AuditLog
+from apps.permissions.resolver import permission_resolver
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
 
+def _role_count(model, **filters):
+    """Correlated COUNT of rows of model pointing at the outer role."""
+    counts = model.objects.filter(role=OuterRef('pk'), **filters).order_by().values('role')
+    return Coalesce(Subquery(counts.annotate(total=Count('pk')).values('total')), 0)
+
+
+def with_role_summary(queryset):
+    """
+    Annotate permission/user counts and prefetch permissions so serializing
+    any number of roles with RoleSerializer takes a constant number of queries.
+    Counts are subqueries rather than joins so the two don't multiply.
+    """
+    return queryset.annotate(
+        permission_count=_role_count(RolePermission),
+        user_count=_role_count(UserRole, is_active=True),
+    ).prefetch_related('role_permissions__permission')
+
+
 class RoleListView(generics.ListCreateAPIView):
     """
     List and create roles.
@@ -41,7 +64,7 @@ class RoleListView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         """Filter roles based on search parameters."""
-        queryset = super().get_queryset()
+        queryset = with_role_summary(super().get_queryset())
         search = self.request.query_params.get('search', None)
         
         if search:
@@ -57,11 +80,14 @@ class RoleListView(generics.ListCreateAPIView):
         """List roles with pagination."""
         try:
             queryset = self.get_queryset()
-            serializer = self.get_serializer(queryset, many=True)
+            page = self.paginate_queryset(queryset)
+            serializer = self.get_serializer(page, many=True)
             
             return Response({
                 'roles': serializer.data,
-                'count': queryset.count()
+                'count': self.paginator.page.paginator.count,
+                'next': self.paginator.get_next_link(),
+                'previous': self.paginator.get_previous_link()
             }, status=status.HTTP_200_OK)
         
         except Exception as e:
@@ -70,7 +96,7 @@ class RoleListView(generics.ListCreateAPIView):
                 'error': 'خطایی در دریافت لیست نقش‌ها رخ داد.'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
-    @method_decorator(ratelimit(key='user', rate='10/m', method='POST'))
+    @method_decorator(rate_limit('role_create', key='user'))
     def create(self, request, *args, **kwargs):
         """Create new role."""
         try:
@@ -88,11 +114,6 @@ class RoleListView(generics.ListCreateAPIView):
             
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        except Ratelimited:
-            return Response({
-                'error': 'تعداد درخواست‌های شما بیش از حد مجاز است.'
-            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
-        
         except Exception as e:
             logger.error(f"Create role error: {str(e)}")
             return Response({
@@ -109,6 +130,11 @@ class RoleDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = RoleSerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    def get_queryset(self):
+        if self.request.method == 'GET':
+            return with_role_summary(super().get_queryset())
+        return super().get_queryset()
+    
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
             return RoleCreateSerializer
@@ -174,7 +200,7 @@ class UserRoleListView(generics.ListCreateAPIView):
         
         return queryset
     
-    @method_decorator(ratelimit(key='user', rate='10/m', method='POST'))
+    @method_decorator(rate_limit('user_role_assign', key='user'))
     def create(self, request, *args, **kwargs):
         """Assign role to user."""
         try:
@@ -192,11 +218,6 @@ class UserRoleListView(generics.ListCreateAPIView):
             
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        except Ratelimited:
-            return Response({
-                'error': 'تعداد درخواست‌های شما بیش از حد مجاز است.'
-            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
-        
         except Exception as e:
             logger.error(f"Assign role error: {str(e)}")
             return Response({
@@ -233,6 +254,168 @@ class UserRoleDetailView(generics.RetrieveUpdateDestroyAPIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class UserRoleBulkView(APIView):
+    """
+    Assign roles to many users at once (every user x every role).
+    
+    Validation and lookups are set-based, new assignments are inserted with
+    bulk_create(ignore_conflicts=True) and previously revoked ones are
+    reactivated, all in one transaction. Each user/role pair gets an outcome.
+    """
+    
+    permission_classes = [permissions.IsAuthenticated]
+    audit_action = 'assign_role'
+    
+    def get_pairs(self, users, roles):
+        """
+        Yield (user_identifier, role_name, user, role, error) for every pair;
+        a user given twice (e.g. by ID and GUID) is reported as a duplicate.
+        """
+        seen = set()
+        for identifier, user in users:
+            for name, role in roles:
+                if user is None:
+                    yield identifier, name, None, None, 'user_not_found'
+                elif role is None:
+                    yield identifier, name, None, None, 'role_not_found'
+                elif (user.id, role.id) in seen:
+                    yield identifier, name, None, None, 'duplicate'
+                else:
+                    seen.add((user.id, role.id))
+                    yield identifier, name, user, role, None
+    
+    def existing_assignments(self, pairs):
+        user_ids = {user.id for _, _, user, _, error in pairs if not error}
+        role_ids = {role.id for _, _, _, role, error in pairs if not error}
+        if not user_ids:
+            return {}
+        queryset = UserRole.objects.filter(user_id__in=user_ids, role_id__in=role_ids)
+        return {
+            (user_id, role_id): (pk, is_active)
+            for pk, user_id, role_id, is_active in queryset.values_list('id', 'user_id', 'role_id', 'is_active')
+        }
+    
+    def build_audit_log(self, request, user, role):
+        return AuditLog(
+            user=request.user,
+            action=self.audit_action,
+            target_user=user,
+            role=role,
+            ip_address=get_client_ip(request),
+            user_agent=request.META.get('HTTP_USER_AGENT', ''),
+            details={
+                'role_name': role.name,
+                'user_username': user.username,
+                'bulk': True
+            }
+        )
+    
+    def apply(self, request, pairs, existing, expires_at):
+        """Assign roles; return the outcome of each pair."""
+        results = []
+        to_create = []
+        to_reactivate = []
+        audit_logs = []
+        
+        for identifier, name, user, role, error in pairs:
+            if error:
+                results.append({'user': identifier, 'role': name, 'status': error})
+                continue
+            
+            if not role.is_active:
+                outcome = 'role_inactive'
+            elif (user.id, role.id) not in existing:
+                outcome = 'assigned'
+                to_create.append(UserRole(
+                    user=user, role=role, assigned_by=request.user, expires_at=expires_at
+                ))
+            elif not existing[(user.id, role.id)][1]:
+                outcome = 'reactivated'
+                to_reactivate.append(existing[(user.id, role.id)][0])
+            else:
+                outcome = 'already_assigned'
+            
+            if outcome in ('assigned', 'reactivated'):
+                audit_logs.append(self.build_audit_log(request, user, role))
+            results.append({'user': identifier, 'role': name, 'status': outcome})
+        
+        UserRole.objects.bulk_create(to_create, batch_size=1000, ignore_conflicts=True)
+        if to_reactivate:
+            UserRole.objects.filter(id__in=to_reactivate).update(
+                is_active=True, assigned_by=request.user, expires_at=expires_at
+            )
+        AuditLog.objects.bulk_create(audit_logs, batch_size=1000)
+        return results
+    
+    @method_decorator(rate_limit('user_role_bulk', key='user'))
+    def post(self, request):
+        try:
+            serializer = UserRoleBulkSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            
+            data = serializer.validated_data
+            pairs = list(self.get_pairs(data['users'], data['roles']))
+            
+            with transaction.atomic():
+                existing = self.existing_assignments(pairs)
+                results = self.apply(request, pairs, existing, data.get('expires_at'))
+                
+                # bulk_create/update skip model signals; invalidate cached permissions here
+                changed_user_ids = {user.id for _, _, user, _, error in pairs if not error}
+                transaction.on_commit(lambda: permission_resolver.invalidate_users(changed_user_ids))
+            
+            summary = {}
+            for result in results:
+                summary[result['status']] = summary.get(result['status'], 0) + 1
+            
+            logger.info(f"Bulk {self.audit_action} by {request.user.username}: {summary}")
+            
+            return Response({
+                'results': results,
+                'summary': summary
+            }, status=status.HTTP_200_OK)
+        
+        except Exception as e:
+            logger.error(f"Bulk {self.audit_action} error: {str(e)}")
+            return Response({
+                'error': 'خطایی در پردازش گروهی نقش‌ها رخ داد.'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class UserRoleBulkRevokeView(UserRoleBulkView):
+    """
+    Revoke roles from many users at once (soft delete, like UserRoleDetailView).
+    """
+    
+    audit_action = 'remove_role'
+    
+    def apply(self, request, pairs, existing, expires_at):
+        """Revoke roles; return the outcome of each pair."""
+        results = []
+        to_revoke = []
+        audit_logs = []
+        
+        for identifier, name, user, role, error in pairs:
+            if error:
+                results.append({'user': identifier, 'role': name, 'status': error})
+                continue
+            
+            assignment = existing.get((user.id, role.id))
+            if assignment is None or not assignment[1]:
+                outcome = 'not_assigned'
+            else:
+                outcome = 'revoked'
+                to_revoke.append(assignment[0])
+                audit_logs.append(self.build_audit_log(request, user, role))
+            results.append({'user': identifier, 'role': name, 'status': outcome})
+        
+        if to_revoke:
+            UserRole.objects.filter(id__in=to_revoke).update(is_active=False)
+        AuditLog.objects.bulk_create(audit_logs, batch_size=1000)
+        return results
+
+
 class PermissionListView(generics.ListAPIView):
     """
     List permissions.
@@ -284,7 +467,7 @@ class RolePermissionListView(generics.ListCreateAPIView):
         
         return queryset
     
-    @method_decorator(ratelimit(key='user', rate='10/m', method='POST'))
+    @method_decorator(rate_limit('role_permission_grant', key='user'))
     def create(self, request, *args, **kwargs):
         """Grant permission to role."""
         try:
@@ -302,11 +485,6 @@ class RolePermissionListView(generics.ListCreateAPIView):
             
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        except Ratelimited:
-            return Response({
-                'error': 'تعداد درخواست‌های شما بیش از حد مجاز است.'
-            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
-        
         except Exception as e:
             logger.error(f"Grant permission error: {str(e)}")
             return Response({
@@ -5,3 +5,8 @@ class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.users'
     verbose_name = 'Users Management'
+
+    def ready(self):
+        """Sign and verify RSA tokens with the JWKS key ring"""
+        from .keys import install_token_backend
+        install_token_backend()
@@ -0,0 +1,23 @@
+"""
+JWT authentication that rejects revoked tokens.
+"""
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .revocation import get_revocation_store
+
+
+class RevocationJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication plus a revocation check; tokens that were never
+    revoked are checked against the in-process Bloom filter, without a query.
+    """
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        try:
+            get_revocation_store().check(validated_token)
+        except TokenError as e:
+            raise InvalidToken({'detail': e.args[0], 'code': 'token_revoked'})
+        return validated_token
@@ -0,0 +1,62 @@
+"""
+Authentication backend for the login API: username or email in one query.
+"""
+
+import logging
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from sso.utils import get_client_ip
+
+from .lockout import get_login_lockout
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+
+class CredentialBackend(ModelBackend):
+    """
+    Handles authenticate(request, login=..., password=...).
+
+    The account is looked up by username or email in a single query and the
+    password is hashed exactly once, also when no account matches. Failures
+    are counted by LoginLockout in the cache; the users row is written only
+    when a lock starts or an expired one is cleared. A locked account is
+    still returned for a correct password so the caller can report the lock.
+
+    Calls with username= are left to ModelBackend.
+    """
+
+    def authenticate(self, request, login=None, password=None):
+        if not login or password is None:
+            return None
+
+        lockout = get_login_lockout()
+        user = self.get_user_by_login(login)
+        if user is None:
+            # Hash anyway so unknown logins take as long as wrong passwords
+            User().set_password(password)
+            lockout.record_failure(None, get_client_ip(request))
+            return None
+
+        if not user.check_password(password):
+            lockout.record_failure(user, get_client_ip(request))
+            return None
+
+        if not self.user_can_authenticate(user):
+            return None
+
+        if not user.is_locked():
+            lockout.record_success(user)
+        return user
+
+    def get_user_by_login(self, login):
+        """
+        The account with this username, else the one with this email (both
+        case-insensitive), from one query over the LOWER() unique indexes.
+        """
+        candidates = list(User._default_manager.with_login(login)[:2])
+        for user in candidates:
+            if user.username.lower() == login.lower():
+                return user
+        return candidates[0] if candidates else None
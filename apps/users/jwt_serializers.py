@@ -2,9 +2,12 @@
 Custom JWT token serializers with GUID support.
 """
 
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 from .models import User
+from .revocation import get_revocation_store
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -39,9 +42,10 @@ class CustomRefreshToken(RefreshToken):
     """
     
     @classmethod
-    def for_user(cls, user):
+    def for_user(cls, user, client=None):
         """
         Generate refresh token with custom claims including GUID.
+        Clients that opted in also get role names and the permission bitmap.
         """
         token = super().for_user(user)
         
@@ -56,4 +60,47 @@ class CustomRefreshToken(RefreshToken):
         token['is_phone_verified'] = user.is_phone_verified
         token['is_email_verified'] = user.is_email_verified
         
+        if client is not None and client.include_authorization_claims:
+            from apps.permissions.catalog import add_authorization_claims
+            add_authorization_claims(token, user)
+        
         return token
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Token refresh that rejects revoked refresh tokens and, with
+    BLACKLIST_AFTER_ROTATION, revokes the old one when rotating. Tokens
+    with authorization claims get them recomputed for the user. Revoking
+    inserts a row with a unique jti, so of two concurrent refreshes of the
+    same token only one succeeds.
+    """
+    
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        store = get_revocation_store()
+        store.check(refresh)
+        
+        from apps.permissions.catalog import CATALOG_VERSION_CLAIM, add_authorization_claims
+        if CATALOG_VERSION_CLAIM in refresh.payload:
+            # Roles and permissions may have changed since the token was issued
+            user = User.objects.filter(
+                **{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}, is_active=True
+            ).first()
+            if user is None:
+                raise TokenError('توکن نامعتبر است')
+            add_authorization_claims(refresh, user)
+        
+        data = {'access': str(refresh.access_token)}
+        
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION and not store.revoke(refresh):
+                raise TokenError('توکن باطل شده است')
+            
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            
+            data['refresh'] = str(refresh)
+        
+        return data
@@ -0,0 +1,189 @@
+"""
+RSA signing keys, JWKS publication and the key-aware JWT backend.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from django.conf import settings
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+
+def _b64url_uint(value):
+    """Encode an unsigned integer as base64url without padding (RFC 7518)."""
+    data = value.to_bytes((value.bit_length() + 7) // 8 or 1, 'big')
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+class SigningKey:
+    """
+    One RSA key pair (or a retired public key) with its JWK representation.
+    """
+
+    def __init__(self, public_pem, private_pem=None, algorithm='RS256'):
+        self.public_pem = public_pem
+        self.private_pem = private_pem
+        self.algorithm = algorithm
+
+        # Parsed once: handing PEM text to PyJWT re-parses (and for private
+        # keys re-validates) the key on every encode/decode
+        self.public_key = serialization.load_pem_public_key(public_pem.encode())
+        self.private_key = (
+            serialization.load_pem_private_key(private_pem.encode(), password=None) if private_pem else None
+        )
+        numbers = self.public_key.public_numbers()
+        self.n = _b64url_uint(numbers.n)
+        self.e = _b64url_uint(numbers.e)
+        self.kid = self.thumbprint(self.e, self.n)
+
+    @staticmethod
+    def thumbprint(e, n):
+        """RFC 7638 JWK thumbprint, used as the key ID."""
+        canonical = json.dumps({'e': e, 'kty': 'RSA', 'n': n}, separators=(',', ':'), sort_keys=True)
+        digest = hashlib.sha256(canonical.encode()).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+
+    def to_jwk(self):
+        return {
+            'kty': 'RSA',
+            'use': 'sig',
+            'alg': self.algorithm,
+            'kid': self.kid,
+            'n': self.n,
+            'e': self.e,
+        }
+
+
+class KeyRing:
+    """
+    The active signing key plus retired public keys that are still accepted.
+
+    Layout (JWT_KEYS_DIR, supplied by the operator outside the source tree):
+        private_key.pem / public_key.pem   active key pair
+        retired/*.pem                      previous public keys, still published
+                                           until every token they signed expired
+    """
+
+    def __init__(self, active, retired=(), algorithm='RS256'):
+        self.active = active
+        self.algorithm = algorithm
+        self.keys = {active.kid: active}
+        for key in retired:
+            self.keys.setdefault(key.kid, key)
+        self.jwks = {'keys': [key.to_jwk() for key in self.keys.values()]}
+        self.etag = '"%s"' % hashlib.sha256(
+            json.dumps(self.jwks, sort_keys=True).encode()
+        ).hexdigest()[:32]
+
+    @classmethod
+    def from_directory(cls, keys_dir, private_path=None, public_path=None, algorithm='RS256'):
+        keys_dir = Path(keys_dir)
+        private_path = Path(private_path or keys_dir / 'private_key.pem')
+        public_path = Path(public_path or keys_dir / 'public_key.pem')
+
+        active = SigningKey(public_path.read_text(), private_path.read_text(), algorithm)
+        retired = [
+            SigningKey(path.read_text(), algorithm=algorithm)
+            for path in sorted((keys_dir / 'retired').glob('*.pem'))
+        ]
+        return cls(active, retired, algorithm)
+
+    def get_verifying_key(self, kid):
+        key = self.keys.get(kid) if kid else self.active
+        if key is None:
+            raise TokenBackendError('Unknown signing key')
+        return key.public_key
+
+
+_key_ring = None
+_key_ring_lock = threading.Lock()
+
+
+def get_key_ring():
+    """
+    Load the key ring once per process.
+    """
+    global _key_ring
+    if _key_ring is None:
+        with _key_ring_lock:
+            if _key_ring is None:
+                _key_ring = KeyRing.from_directory(
+                    settings.JWT_KEYS_DIR,
+                    settings.JWT_PRIVATE_KEY_PATH,
+                    settings.JWT_PUBLIC_KEY_PATH,
+                    api_settings.ALGORITHM,
+                )
+                logger.info(f"Loaded JWT key ring with {len(_key_ring.keys)} keys (active kid: {_key_ring.active.kid})")
+    return _key_ring
+
+
+def reset_key_ring():
+    """
+    Forget the loaded key ring (after a rotation).
+    """
+    global _key_ring
+    with _key_ring_lock:
+        _key_ring = None
+
+
+class KeyRingTokenBackend(TokenBackend):
+    """
+    TokenBackend that signs with the active RSA key, stamps its kid into the
+    JWT header and verifies with whichever published key the kid names, so
+    keys can be rotated without invalidating outstanding tokens.
+    """
+
+    def encode(self, payload):
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+
+        key_ring = get_key_ring()
+        return jwt.encode(
+            jwt_payload,
+            key_ring.active.private_key,
+            algorithm=self.algorithm,
+            headers={'kid': key_ring.active.kid},
+            json_encoder=self.json_encoder,
+        )
+
+    def get_verifying_key(self, token):
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as ex:
+            raise TokenBackendError('Token is invalid or expired') from ex
+        return get_key_ring().get_verifying_key(kid)
+
+
+def uses_key_ring():
+    return not api_settings.ALGORITHM.startswith('HS')
+
+
+def install_token_backend():
+    """
+    Make every simplejwt token class use KeyRingTokenBackend for RSA algorithms.
+    """
+    if not uses_key_ring():
+        return
+
+    from rest_framework_simplejwt.tokens import Token
+
+    Token._token_backend = KeyRingTokenBackend(
+        api_settings.ALGORITHM,
+        audience=api_settings.AUDIENCE,
+        issuer=api_settings.ISSUER,
+        leeway=api_settings.LEEWAY,
+        json_encoder=api_settings.JSON_ENCODER,
+    )
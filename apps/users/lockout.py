@@ -0,0 +1,180 @@
+"""
+Failed-login counting in the shared cache, per account and per client IP.
+
+Counting needs a cache all workers share (redis, or file on one host).
+When LOGIN_LOCKOUT_CACHE is process-local (locmem, dummy), each worker
+would count separately and an account could take workers x limit failures,
+so the account counters fall back to the users table instead.
+"""
+
+import logging
+import time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models import F, Q
+from django.utils import timezone
+
+from auth_service.cache import is_shared_cache
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+
+class SlidingWindowCounter:
+    """
+    Approximate number of events in the last `window` seconds.
+
+    Events go into fixed buckets of `window` seconds; the count is the
+    current bucket plus the previous one weighted by how much of it still
+    falls inside the sliding window. Each event is one atomic cache incr,
+    whatever the rate.
+    """
+
+    def __init__(self, prefix, window, cache_alias):
+        self.prefix = prefix
+        self.window = window
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def _keys(self, ident, now):
+        index, offset = divmod(now, self.window)
+        index = int(index)
+        return (
+            f'{self.prefix}:{ident}:{index}',
+            f'{self.prefix}:{ident}:{index - 1}',
+            offset / self.window,
+        )
+
+    def hit(self, ident, now=None):
+        """Record one event and return the count including it."""
+        current, previous, elapsed = self._keys(ident, time.time() if now is None else now)
+        cache = self.cache
+        cache.add(current, 0, self.window * 2)
+        try:
+            count = cache.incr(current)
+        except ValueError:
+            # Evicted (or a dummy cache) between add() and incr()
+            cache.set(current, 1, self.window * 2)
+            count = 1
+        return count + (cache.get(previous) or 0) * (1 - elapsed)
+
+    def count(self, ident, now=None):
+        current, previous, elapsed = self._keys(ident, time.time() if now is None else now)
+        values = self.cache.get_many([current, previous])
+        return values.get(current, 0) + values.get(previous, 0) * (1 - elapsed)
+
+    def reset(self, ident, now=None):
+        current, previous, _ = self._keys(ident, time.time() if now is None else now)
+        self.cache.delete_many([current, previous])
+
+
+class DatabaseFailureCounter:
+    """
+    Failed logins of an account in users.failed_login_attempts: one UPDATE
+    per failure, no window (the count lasts until a success or a lock).
+    Same interface as SlidingWindowCounter, keyed by user pk.
+    """
+
+    def hit(self, ident, now=None):
+        users = User._default_manager.filter(pk=ident)
+        users.update(failed_login_attempts=F('failed_login_attempts') + 1)
+        return users.values_list('failed_login_attempts', flat=True).first() or 0
+
+    def count(self, ident, now=None):
+        return User._default_manager.filter(pk=ident).values_list('failed_login_attempts', flat=True).first() or 0
+
+    def reset(self, ident, now=None):
+        User._default_manager.filter(pk=ident, failed_login_attempts__gt=0).update(failed_login_attempts=0)
+
+
+class LoginLockout:
+    """
+    Failed logins are counted in sliding windows in the cache, keyed by
+    account and by client IP, so a wrong password costs no database write.
+    The users row is written only when a lock starts (locked_until and a
+    snapshot of failed_login_attempts, 0 with the database counter) or when
+    an expired lock is cleared by the next successful login. An IP over its limit is refused before any
+    lookup or password hash.
+    """
+
+    def __init__(self, window=None, account_limit=None, ip_limit=None, lock_minutes=None, cache_alias=None,
+                 counter=None):
+        self.window = window or getattr(settings, 'LOGIN_LOCKOUT_WINDOW', 900)
+        self.account_limit = account_limit or getattr(settings, 'LOGIN_LOCKOUT_ACCOUNT_LIMIT', User.MAX_FAILED_LOGINS)
+        self.ip_limit = ip_limit or getattr(settings, 'LOGIN_LOCKOUT_IP_LIMIT', 50)
+        self.lock_minutes = lock_minutes or getattr(settings, 'LOGIN_LOCKOUT_MINUTES', User.LOCKOUT_MINUTES)
+        cache_alias = cache_alias or getattr(settings, 'LOGIN_LOCKOUT_CACHE', 'ratelimit')
+        counter = counter or getattr(settings, 'LOGIN_LOCKOUT_COUNTER', 'auto')
+        if counter == 'auto':
+            counter = 'cache' if is_shared_cache(cache_alias) else 'database'
+        if counter == 'database':
+            logger.info(f"Cache '{cache_alias}' is not shared between workers, counting login failures in the database")
+            self.by_account = DatabaseFailureCounter()
+        elif counter == 'cache':
+            self.by_account = SlidingWindowCounter('login:fail:user', self.window, cache_alias)
+        else:
+            raise ValueError(f"Unknown LOGIN_LOCKOUT_COUNTER '{counter}', expected auto, cache or database")
+        # Per worker on a local cache; only an extra brake in front of the account limit
+        self.by_ip = SlidingWindowCounter('login:fail:ip', self.window, cache_alias)
+
+    def ip_blocked(self, ip):
+        return bool(ip) and self.ip_limit > 0 and self.by_ip.count(ip) >= self.ip_limit
+
+    def record_failure(self, user, ip=None):
+        """
+        Count a failed attempt (user is None for unknown logins). Returns
+        True when this attempt locked the account.
+        """
+        if ip:
+            self.by_ip.hit(ip)
+        if user is None or user.is_locked():
+            return False
+
+        failures = self.by_account.hit(user.pk)
+        if failures < self.account_limit:
+            return False
+
+        now = timezone.now()
+        locked_until = now + timezone.timedelta(minutes=self.lock_minutes)
+        # The database counter is failed_login_attempts itself: it starts
+        # again from 0, as the cache counter does, instead of keeping the
+        # snapshot that one more failure after the lock would push over the limit
+        snapshot = 0 if isinstance(self.by_account, DatabaseFailureCounter) else int(failures)
+        # Conditional, so concurrent failures start the lock only once
+        started = User._default_manager.filter(
+            Q(locked_until__isnull=True) | Q(locked_until__lte=now), pk=user.pk
+        ).update(locked_until=locked_until, failed_login_attempts=snapshot)
+        self.by_account.reset(user.pk)
+        user.locked_until = locked_until
+        user.failed_login_attempts = snapshot
+        if started:
+            logger.warning(f"User {user.username} account locked until {locked_until}")
+        return bool(started)
+
+    def record_success(self, user):
+        """Forget the failures of an account that logged in (and is not locked)."""
+        self.by_account.reset(user.pk)
+        if user.locked_until is not None or user.failed_login_attempts:
+            User._default_manager.filter(pk=user.pk).update(locked_until=None, failed_login_attempts=0)
+            user.locked_until = None
+            user.failed_login_attempts = 0
+
+    def clear(self, user):
+        self.by_account.reset(user.pk)
+
+
+_lockout = None
+
+
+def get_login_lockout():
+    """
+    Return the process-wide LoginLockout configured from settings
+    """
+    global _lockout
+    if _lockout is None:
+        _lockout = LoginLockout()
+    return _lockout
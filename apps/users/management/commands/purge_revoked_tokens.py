@@ -0,0 +1,30 @@
+"""
+Delete revoked-token rows whose tokens have expired.
+
+An expired token is rejected by its exp claim anyway, so its revocation row
+is no longer needed; the in-process Bloom filters drop it at their next
+rebuild. Run it from cron, or keep it running with --loop:
+    python manage.py purge_revoked_tokens
+    python manage.py purge_revoked_tokens --loop 3600
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.users.revocation import get_revocation_store
+
+
+class Command(BaseCommand):
+    help = 'Delete revocation rows of expired JWTs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', type=float, metavar='SECONDS', help='Repeat every SECONDS until stopped')
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = get_revocation_store().purge_expired()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} revoked tokens'))
+            if not options['loop']:
+                return
+            time.sleep(options['loop'])
@@ -0,0 +1,78 @@
+"""
+Rotate the RSA key pair used to sign JWTs.
+
+Keys live in JWT_KEYS_DIR, which must be outside the source tree. The
+current public key is moved to JWT_KEYS_DIR/retired/<kid>.pem so it stays
+published on /auth/jwks/ (and accepted) until the tokens it signed expire,
+then a fresh key pair becomes active. Restart the workers afterwards.
+"""
+
+from datetime import timedelta
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.settings import api_settings
+
+from apps.users.keys import SigningKey, reset_key_ring
+
+
+class Command(BaseCommand):
+    help = 'Generate a new JWT signing key and retire the current one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--key-size', type=int, default=2048)
+        parser.add_argument(
+            '--prune', action='store_true',
+            help='Only delete retired keys older than the refresh token lifetime'
+        )
+
+    def handle(self, *args, **options):
+        if settings.JWT_KEYS_DIR is None:
+            raise CommandError('Set JWT_KEYS_DIR to a directory outside the source tree first')
+        retired_dir = settings.JWT_KEYS_DIR / 'retired'
+        retired_dir.mkdir(parents=True, exist_ok=True)
+
+        if options['prune']:
+            self.prune(retired_dir)
+            return
+
+        private_path = settings.JWT_PRIVATE_KEY_PATH
+        public_path = settings.JWT_PUBLIC_KEY_PATH
+
+        if public_path.exists():
+            current = SigningKey(public_path.read_text())
+            (retired_dir / f'{current.kid}.pem').write_text(current.public_pem)
+            self.stdout.write(f'Retired key {current.kid}')
+
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=options['key_size'])
+        private_path.write_bytes(private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        ))
+        public_path.write_bytes(private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
+        ))
+        reset_key_ring()
+
+        new_key = SigningKey(public_path.read_text())
+        self.stdout.write(self.style.SUCCESS(f'Active signing key is now {new_key.kid}'))
+        self.stdout.write('Restart the application workers to start signing with the new key.')
+
+    def prune(self, retired_dir):
+        max_age = max(
+            api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME
+        ) + timedelta(hours=1)
+        cutoff = time.time() - max_age.total_seconds()
+
+        removed = 0
+        for path in retired_dir.glob('*.pem'):
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} retired keys'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 11:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0003_user_avatar_url_user_display_name_user_region'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['email'], name='users_email_idx'),
+        ),
+    ]
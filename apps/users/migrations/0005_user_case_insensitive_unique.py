@@ -0,0 +1,121 @@
+# Generated by Django 5.2.5 on 2026-10-17 12:01
+
+import apps.users.models
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_case_insensitive_duplicates(apps, schema_editor):
+    """
+    Fail with a readable list instead of an IntegrityError halfway through
+    """
+    User = apps.get_model('users', 'User')
+    conflicts = []
+    for field, queryset in (('username', User.objects.all()), ('email', User.objects.exclude(email=''))):
+        duplicates = (
+            queryset.order_by().annotate(key=Lower(field)).values('key')
+            .annotate(total=Count('pk')).filter(total__gt=1).values_list('key', flat=True)[:20]
+        )
+        conflicts.extend(f'{field}: {key}' for key in duplicates)
+    if conflicts:
+        raise RuntimeError(
+            'Users differing only in letter case must be merged or renamed before '
+            'this migration: ' + ', '.join(conflicts)
+        )
+
+
+def drop_index_concurrently(schema_editor, name):
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {schema_editor.quote_name(name)}')
+
+
+def create_index_concurrently(schema_editor, name, statement, keyword):
+    """
+    Run a CREATE [UNIQUE] INDEX statement with CONCURRENTLY. A failed
+    concurrent build leaves an INVALID index behind, so any index of that
+    name is dropped first and the migration can simply be re-run.
+    """
+    drop_index_concurrently(schema_editor, name)
+    schema_editor.execute(str(statement).replace(keyword, f'{keyword} CONCURRENTLY', 1))
+
+
+class AddConstraintConcurrently(migrations.AddConstraint):
+    """
+    AddConstraint that builds and drops the unique index CONCURRENTLY on
+    PostgreSQL, so logins and registrations keep writing to the users table
+    meanwhile. Other databases use the plain operation.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            create_index_concurrently(
+                schema_editor, self.constraint.name,
+                self.constraint.create_sql(model, schema_editor), 'CREATE UNIQUE INDEX',
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            drop_index_concurrently(schema_editor, self.constraint.name)
+
+
+class RemoveIndexConcurrently(migrations.RemoveIndex):
+    """
+    RemoveIndex counterpart of AddConstraintConcurrently. IF EXISTS keeps a
+    re-run working after a later operation of this migration failed.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            drop_index_concurrently(schema_editor, self.name)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            index = to_state.models[app_label, self.model_name_lower].get_index_by_name(self.name)
+            create_index_concurrently(schema_editor, self.name, index.create_sql(model, schema_editor), 'CREATE INDEX')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0004_user_email_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', apps.users.models.UserManager()),
+            ],
+        ),
+        migrations.RunPython(check_case_insensitive_duplicates, migrations.RunPython.noop),
+        # Superseded by the LOWER(email) index below
+        RemoveIndexConcurrently(
+            model_name='user',
+            name='users_email_idx',
+        ),
+        AddConstraintConcurrently(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('username'), name='users_username_ci_uniq'),
+        ),
+        AddConstraintConcurrently(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), condition=models.Q(('email', ''), _negated=True), name='users_email_ci_uniq'),
+        ),
+    ]
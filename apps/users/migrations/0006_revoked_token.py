@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-17 12:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_user_case_insensitive_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(max_length=255, unique=True, verbose_name='شناسه توکن')),
+                ('token_type', models.CharField(blank=True, max_length=20, verbose_name='نوع توکن')),
+                ('expires_at', models.DateTimeField(verbose_name='تاریخ انقضا')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ابطال')),
+            ],
+            options={
+                'verbose_name': 'توکن باطل\u200cشده',
+                'verbose_name_plural': 'توکن\u200cهای باطل\u200cشده',
+                'db_table': 'revoked_tokens',
+                'indexes': [models.Index(fields=['created_at'], name='revoked_token_created_idx'), models.Index(fields=['expires_at'], name='revoked_token_expires_idx')],
+            },
+        ),
+    ]
@@ -4,19 +4,56 @@ User models for authentication service.
 
 import logging
 import uuid
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager as DjangoUserManager
 from django.db import models
+from django.db.models import Q, Value
+from django.db.models.functions import Lower
+from django.db.models.lookups import Exact
 from django.core.validators import RegexValidator
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
 
+def _iexact(field, value):
+    # LOWER(field) = LOWER(value): matches the functional unique indexes,
+    # unlike __iexact (UPPER on PostgreSQL, LIKE on SQLite)
+    return Exact(Lower(field), Lower(Value(value)))
+
+
+class UserQuerySet(models.QuerySet):
+    """
+    Case-insensitive username/email lookups that use the LOWER() indexes.
+    """
+    
+    def with_username(self, username):
+        return self.filter(_iexact('username', username))
+    
+    def with_email(self, email):
+        # The email index is partial (blank emails are not unique)
+        return self.filter(_iexact('email', email), ~Q(email=''))
+    
+    def with_login(self, login):
+        """Users whose username or email is login."""
+        return self.filter(Q(_iexact('username', login)) | Q(_iexact('email', login), ~Q(email='')))
+
+
+class UserManager(DjangoUserManager.from_queryset(UserQuerySet)):
+    
+    def get_by_natural_key(self, username):
+        return self.with_username(username).get()
+
+
 class User(AbstractUser):
     """
     Custom User model with additional fields for authentication service.
     """
     
+    # Failed logins before the account is locked, and for how long (defaults
+    # for LOGIN_LOCKOUT_ACCOUNT_LIMIT / LOGIN_LOCKOUT_MINUTES, see lockout.py)
+    MAX_FAILED_LOGINS = 5
+    LOCKOUT_MINUTES = 30
+    
     # Phone number validator
     phone_regex = RegexValidator(
         regex=r'^\+?1?\d{9,15}$',
@@ -101,10 +138,18 @@ class User(AbstractUser):
         help_text="نام کامل نمایشی کاربر"
     )
     
+    objects = UserManager()
+    
     class Meta:
         verbose_name = "کاربر"
         verbose_name_plural = "کاربران"
         db_table = 'users'
+        constraints = [
+            # Usernames and emails are unique regardless of case; look them
+            # up with User.objects.with_username() / with_email() / with_login()
+            models.UniqueConstraint(Lower('username'), name='users_username_ci_uniq'),
+            models.UniqueConstraint(Lower('email'), condition=~Q(email=''), name='users_email_ci_uniq'),
+        ]
     
     def __str__(self):
         return f"{self.username} ({self.email})"
@@ -115,7 +160,7 @@ class User(AbstractUser):
             return True
         return False
     
-    def lock_account(self, minutes=30):
+    def lock_account(self, minutes=LOCKOUT_MINUTES):
         """Lock user account for specified minutes."""
         self.locked_until = timezone.now() + timezone.timedelta(minutes=minutes)
         self.save(update_fields=['locked_until'])
@@ -123,17 +168,23 @@ class User(AbstractUser):
     
     def unlock_account(self):
         """Unlock user account."""
+        from .lockout import get_login_lockout
+        
         self.locked_until = None
         self.failed_login_attempts = 0
         self.save(update_fields=['locked_until', 'failed_login_attempts'])
+        get_login_lockout().clear(self)
         logger.info(f"User {self.username} account unlocked")
     
     def increment_failed_login(self):
         """Increment failed login attempts."""
         self.failed_login_attempts += 1
-        if self.failed_login_attempts >= 5:  # Lock after 5 failed attempts
-            self.lock_account()
-        self.save(update_fields=['failed_login_attempts'])
+        update_fields = ['failed_login_attempts']
+        if self.failed_login_attempts >= self.MAX_FAILED_LOGINS:
+            self.locked_until = timezone.now() + timezone.timedelta(minutes=self.LOCKOUT_MINUTES)
+            update_fields.append('locked_until')
+            logger.warning(f"User {self.username} account locked until {self.locked_until}")
+        self.save(update_fields=update_fields)
     
     def reset_failed_login(self):
         """Reset failed login attempts."""
@@ -147,15 +198,16 @@ class User(AbstractUser):
     
     def get_meet_user_data(self):
         """Get user data formatted for meet JWT token."""
+        name = self.display_name or f"{self.first_name} {self.last_name}".strip() or self.username
         return {
             "id": str(self.id),
-            "name": self.display_name or f"{self.first_name} {self.last_name}".strip() or self.username,
+            "name": name,
             "email": self.email,
             "avatar": self.avatar_url or "",
             "affiliation": "owner" if self.is_superuser else "member",
             "moderator": self.is_superuser or self.is_staff,
             "region": self.region,
-            "displayName": self.display_name or f"{self.first_name} {self.last_name}".strip() or self.username
+            "displayName": name
         }
 
 
@@ -229,3 +281,45 @@ class UserProfile(models.Model):
         if self.first_name_fa and self.last_name_fa:
             return f"{self.first_name_fa} {self.last_name_fa}"
         return None
+
+
+class RevokedToken(models.Model):
+    """
+    A revoked JWT (refresh or access), kept until the token itself expires.
+    See apps.users.revocation.
+    """
+    
+    jti = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name="شناسه توکن"
+    )
+    
+    token_type = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name="نوع توکن"
+    )
+    
+    expires_at = models.DateTimeField(
+        verbose_name="تاریخ انقضا"
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="تاریخ ابطال"
+    )
+    
+    class Meta:
+        verbose_name = "توکن باطل‌شده"
+        verbose_name_plural = "توکن‌های باطل‌شده"
+        db_table = 'revoked_tokens'
+        indexes = [
+            # Incremental sync of the in-process Bloom filters
+            models.Index(fields=['created_at'], name='revoked_token_created_idx'),
+            # Rebuild from live rows and purge of expired ones
+            models.Index(fields=['expires_at'], name='revoked_token_expires_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.token_type} {self.jti}"
@@ -0,0 +1,211 @@
+"""
+Revocation of JWTs (refresh and access tokens) by jti.
+
+A revoked token is a RevokedToken row kept until the token's own exp. Every
+process keeps a Bloom filter of the revoked jtis in front of the table, so
+checking a token that was never revoked costs no query: only filter hits
+(revoked tokens, plus about TOKEN_REVOCATION_ERROR_RATE of the others) are
+confirmed in the database. The filter picks up revocations made by other
+workers with one range query on created_at every
+TOKEN_REVOCATION_SYNC_INTERVAL seconds, and is rebuilt from the live rows
+every TOKEN_REVOCATION_REBUILD_INTERVAL seconds so expired jtis drop out.
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# Rows created this long before the previous sync are read again, for
+# transactions that committed late and clocks that differ between hosts
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+class BloomFilter:
+    """
+    Bloom filter over strings: never a false negative, about error_rate
+    false positives once `capacity` items are in. Adds take a lock,
+    lookups do not.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(1, int(capacity))
+        self.error_rate = error_rate
+        self.size = max(64, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _positions(self, item):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        positions = self._positions(item)
+        with self._lock:
+            if all(self.bits[p >> 3] & (1 << (p & 7)) for p in positions):
+                return
+            for p in positions:
+                self.bits[p >> 3] |= 1 << (p & 7)
+            self.count += 1
+
+    def __contains__(self, item):
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def __len__(self):
+        return self.count
+
+
+class TokenRevocationStore:
+    """
+    RevokedToken rows behind an in-process Bloom filter.
+
+    A token revoked in this process is rejected here at once; other
+    processes reject it after their next sync, at most sync_interval
+    seconds later. If a sync fails the current filter stays in use and the
+    error is logged.
+    """
+
+    def __init__(self, sync_interval=None, rebuild_interval=None, capacity=None, error_rate=None,
+                 clock=time.monotonic):
+        self.sync_interval = (getattr(settings, 'TOKEN_REVOCATION_SYNC_INTERVAL', 2.0)
+                              if sync_interval is None else sync_interval)
+        self.rebuild_interval = (getattr(settings, 'TOKEN_REVOCATION_REBUILD_INTERVAL', 3600)
+                                 if rebuild_interval is None else rebuild_interval)
+        self.capacity = capacity or getattr(settings, 'TOKEN_REVOCATION_CAPACITY', 100000)
+        self.error_rate = error_rate or getattr(settings, 'TOKEN_REVOCATION_ERROR_RATE', 0.001)
+        self.clock = clock
+        self._filter = None
+        self._synced_at = None
+        self._next_sync = 0
+        self._next_rebuild = 0
+        self._lock = threading.Lock()
+
+    def revoke(self, token):
+        """
+        Revoke a simplejwt token until its exp. Returns False when it was
+        already revoked, which makes refresh token rotation single-use.
+        """
+        return self.revoke_jti(
+            token[api_settings.JTI_CLAIM],
+            token['exp'],
+            token.get(api_settings.TOKEN_TYPE_CLAIM, ''),
+        )
+
+    def revoke_jti(self, jti, exp, token_type=''):
+        try:
+            # Savepoint, so a duplicate does not break the caller's transaction
+            with transaction.atomic():
+                RevokedToken.objects.create(
+                    jti=jti,
+                    token_type=token_type,
+                    expires_at=datetime.fromtimestamp(exp, tz=dt_timezone.utc)
+                )
+            revoked = True
+        except IntegrityError:
+            revoked = False
+        self._get_filter().add(jti)
+        return revoked
+
+    def is_revoked(self, jti):
+        if not jti or jti not in self._get_filter():
+            return False
+        return RevokedToken.objects.filter(jti=jti, expires_at__gt=timezone.now()).exists()
+
+    def check(self, token):
+        """
+        Raise TokenError if the token was revoked
+        """
+        if self.is_revoked(token.get(api_settings.JTI_CLAIM)):
+            raise TokenError('توکن باطل شده است')
+
+    def purge_expired(self):
+        """
+        Delete the rows of tokens that have expired anyway; returns the count
+        """
+        deleted, _ = RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+        return deleted
+
+    def _get_filter(self):
+        now = self.clock()
+        if self._filter is not None and now < self._next_sync:
+            return self._filter
+
+        # One thread refreshes, the others go on with the current filter
+        if not self._lock.acquire(blocking=self._filter is None):
+            return self._filter
+        try:
+            if self._filter is None or now >= self._next_rebuild:
+                self._rebuild(now)
+            elif now >= self._next_sync:
+                self._sync(now)
+        finally:
+            self._lock.release()
+        return self._filter
+
+    def _rebuild(self, now):
+        started = timezone.now()
+        try:
+            jtis = list(RevokedToken.objects.filter(expires_at__gt=started).values_list('jti', flat=True))
+        except Exception as e:
+            if self._filter is None:
+                raise
+            logger.warning(f"Token revocation rebuild failed: {str(e)}")
+            self._next_sync = now + self.sync_interval
+            return
+
+        bloom = BloomFilter(max(self.capacity, 2 * len(jtis)), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        # Revocations between the query and the swap come back with the next sync
+        self._filter = bloom
+        self._synced_at = started
+        self._next_sync = now + self.sync_interval
+        self._next_rebuild = now + self.rebuild_interval
+
+    def _sync(self, now):
+        started = timezone.now()
+        try:
+            jtis = RevokedToken.objects.filter(
+                created_at__gte=self._synced_at - SYNC_OVERLAP
+            ).values_list('jti', flat=True)
+            for jti in jtis:
+                self._filter.add(jti)
+        except Exception as e:
+            logger.warning(f"Token revocation sync failed: {str(e)}")
+        else:
+            self._synced_at = started
+        self._next_sync = now + self.sync_interval
+        if len(self._filter) > self._filter.capacity:
+            # Past its capacity the error rate climbs: rebuild larger
+            self._next_rebuild = now
+
+
+_store = None
+
+
+def get_revocation_store():
+    """
+    Return the process-wide TokenRevocationStore configured from settings
+    """
+    global _store
+    if _store is None:
+        _store = TokenRevocationStore()
+    return _store
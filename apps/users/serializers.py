@@ -7,6 +7,8 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
+from sso.utils import get_client_ip
+from .lockout import get_login_lockout
 from .models import User, UserProfile
 
 logger = logging.getLogger(__name__)
@@ -48,13 +50,13 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             })
         
         # Check if email already exists
-        if User.objects.filter(email=attrs['email']).exists():
+        if User.objects.with_email(attrs['email']).exists():
             raise serializers.ValidationError({
                 'email': 'کاربری با این ایمیل قبلاً ثبت‌نام کرده است.'
             })
         
         # Check if username already exists
-        if User.objects.filter(username=attrs['username']).exists():
+        if User.objects.with_username(attrs['username']).exists():
             raise serializers.ValidationError({
                 'username': 'کاربری با این نام کاربری قبلاً ثبت‌نام کرده است.'
             })
@@ -101,25 +103,20 @@ class UserLoginSerializer(serializers.Serializer):
         password = attrs.get('password')
         
         if username and password:
-            # Try to authenticate with username or email
+            request = self.context.get('request')
+            if get_login_lockout().ip_blocked(get_client_ip(request)):
+                raise serializers.ValidationError({
+                    'non_field_errors': 'تعداد تلاش‌های ناموفق ورود از این آدرس بیش از حد مجاز است. لطفاً بعداً تلاش کنید.'
+                })
+            
+            # Username or email in one query, one password hash; failures
+            # are counted in the cache by the backend (CredentialBackend)
             user = authenticate(
-                request=self.context.get('request'),
-                username=username,
+                request=request,
+                login=username,
                 password=password
             )
             
-            if not user:
-                # Try with email if username failed
-                try:
-                    user_obj = User.objects.get(email=username)
-                    user = authenticate(
-                        request=self.context.get('request'),
-                        username=user_obj.username,
-                        password=password
-                    )
-                except User.DoesNotExist:
-                    pass
-            
             if user:
                 if not user.is_active:
                     raise serializers.ValidationError({
@@ -131,26 +128,12 @@ class UserLoginSerializer(serializers.Serializer):
                         'non_field_errors': 'حساب کاربری شما قفل شده است. لطفاً بعداً تلاش کنید.'
                     })
                 
-                # Reset failed login attempts on successful login
-                user.reset_failed_login()
-                
                 attrs['user'] = user
                 return attrs
-            else:
-                # Increment failed login attempts
-                try:
-                    user_obj = User.objects.get(username=username)
-                    user_obj.increment_failed_login()
-                except User.DoesNotExist:
-                    try:
-                        user_obj = User.objects.get(email=username)
-                        user_obj.increment_failed_login()
-                    except User.DoesNotExist:
-                        pass
-                
-                raise serializers.ValidationError({
-                    'non_field_errors': 'نام کاربری یا رمز عبور اشتباه است.'
-                })
+            
+            raise serializers.ValidationError({
+                'non_field_errors': 'نام کاربری یا رمز عبور اشتباه است.'
+            })
         else:
             raise serializers.ValidationError({
                 'non_field_errors': 'نام کاربری و رمز عبور الزامی است.'
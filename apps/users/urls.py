@@ -14,6 +14,7 @@ urlpatterns = [
     path('login/', views.UserLoginView.as_view(), name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('jwks/', views.jwks_view, name='jwks'),
     
     # User profile endpoints
     path('me/', views.UserProfileView.as_view(), name='user_profile'),
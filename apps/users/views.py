@@ -4,24 +4,30 @@ Views for User app.
 
 import logging
 from rest_framework import status, generics, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import (
+    api_view, permission_classes, authentication_classes, throttle_classes
+)
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken, Token
 from .jwt_serializers import CustomRefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import get_user_model
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import never_cache
-from django_ratelimit.decorators import ratelimit
-from django_ratelimit.exceptions import Ratelimited
 from django.core.exceptions import ValidationError
+from django.conf import settings
+
+from auth_service.ratelimit import rate_limit
 
 from .models import User, UserProfile
 from .serializers import (
     UserRegistrationSerializer, UserLoginSerializer, UserSerializer,
     UserProfileSerializer, ChangePasswordSerializer
 )
+from .keys import get_key_ring, uses_key_ring
+from .revocation import get_revocation_store
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -34,7 +40,7 @@ class UserRegistrationView(APIView):
     
     permission_classes = [permissions.AllowAny]
     
-    @method_decorator(ratelimit(key='ip', rate='5/m', method='POST'))
+    @method_decorator(rate_limit('register', key='ip'))
     @method_decorator(never_cache)
     def post(self, request):
         """Register new user."""
@@ -63,11 +69,6 @@ class UserRegistrationView(APIView):
             
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        except Ratelimited:
-            return Response({
-                'error': 'تعداد درخواست‌های شما بیش از حد مجاز است. لطفاً کمی صبر کنید.'
-            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
-        
         except Exception as e:
             logger.error(f"Registration error: {str(e)}")
             return Response({
@@ -82,7 +83,7 @@ class UserLoginView(TokenObtainPairView):
     
     permission_classes = [permissions.AllowAny]
     
-    @method_decorator(ratelimit(key='ip', rate='10/m', method='POST'))
+    @method_decorator(rate_limit('login', key='ip'))
     @method_decorator(never_cache)
     def post(self, request, *args, **kwargs):
         """Login user and return JWT tokens."""
@@ -115,11 +116,6 @@ class UserLoginView(TokenObtainPairView):
             
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        except Ratelimited:
-            return Response({
-                'error': 'تعداد درخواست‌های شما بیش از حد مجاز است. لطفاً کمی صبر کنید.'
-            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
-        
         except Exception as e:
             logger.error(f"Login error: {str(e)}")
             return Response({
@@ -209,7 +205,7 @@ class ChangePasswordView(APIView):
     
     permission_classes = [permissions.IsAuthenticated]
     
-    @method_decorator(ratelimit(key='user', rate='5/m', method='POST'))
+    @method_decorator(rate_limit('change_password', key='user'))
     def post(self, request):
         """Change user password."""
         try:
@@ -224,11 +220,6 @@ class ChangePasswordView(APIView):
             
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        except Ratelimited:
-            return Response({
-                'error': 'تعداد درخواست‌های شما بیش از حد مجاز است. لطفاً کمی صبر کنید.'
-            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
-        
         except Exception as e:
             logger.error(f"Change password error: {str(e)}")
             return Response({
@@ -240,13 +231,22 @@ class ChangePasswordView(APIView):
 @permission_classes([permissions.IsAuthenticated])
 def logout_view(request):
     """
-    Logout user by blacklisting refresh token.
+    Logout user by revoking the refresh token and the access token in use.
     """
     try:
         refresh_token = request.data.get('refresh_token')
         if refresh_token:
-            token = RefreshToken(refresh_token)
-            token.blacklist()
+            try:
+                token = RefreshToken(refresh_token)
+            except TokenError:
+                return Response({
+                    'error': 'توکن refresh نامعتبر است.'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            store = get_revocation_store()
+            store.revoke(token)
+            if isinstance(request.auth, Token):
+                store.revoke(request.auth)
             
             logger.info(f"User logged out: {request.user.username}")
             
@@ -263,3 +263,27 @@ def logout_view(request):
         return Response({
             'error': 'خطایی در خروج رخ داد.'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+@throttle_classes([])
+def jwks_view(request):
+    """
+    Publish the public signing keys as a JWK Set so client apps can verify
+    access tokens locally instead of calling the validation endpoint.
+    """
+    if not uses_key_ring():
+        return Response({'keys': []}, status=status.HTTP_200_OK)
+    
+    key_ring = get_key_ring()
+    
+    if request.META.get('HTTP_IF_NONE_MATCH') == key_ring.etag:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(key_ring.jwks, status=status.HTTP_200_OK)
+    
+    response['ETag'] = key_ring.etag
+    response['Cache-Control'] = f'public, max-age={settings.JWKS_MAX_AGE}'
+    return response
@@ -0,0 +1,157 @@
+"""
+Cache configuration and a versioned cache-aside helper.
+
+build_caches() turns the CACHE_* settings into CACHES with one alias per
+kind of data (default, clients, permissions, ratelimit, sessions), all on
+the same backend but with separate key prefixes. CacheAside wraps a loader
+function with read-through caching under versioned keys.
+"""
+
+import logging
+from typing import Callable, Generic, Iterable, Optional, TypeVar
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+CACHE_BACKENDS = {
+    'dummy': 'django.core.cache.backends.dummy.DummyCache',
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+
+# alias -> default entry timeout (seconds, None = no expiry)
+CACHE_ALIASES = {
+    'default': 300,
+    'clients': 300,
+    'permissions': 300,
+    'ratelimit': 300,
+    'sessions': 1209600,
+}
+
+
+def build_caches(backend='locmem', location='', key_prefix='auth', aliases=None):
+    """
+    Return a CACHES dict for the given backend.
+
+    location is the Redis URL for 'redis' and the base directory for 'file'
+    (one sub-directory per alias); it is ignored for 'locmem' and 'dummy'.
+    """
+    if backend not in CACHE_BACKENDS:
+        raise ValueError(f"Unknown CACHE_BACKEND '{backend}', expected one of: {', '.join(CACHE_BACKENDS)}")
+    if backend in ('redis', 'file') and not location:
+        raise ValueError(f"CACHE_LOCATION is required for CACHE_BACKEND={backend}")
+
+    caches = {}
+    for alias, timeout in (aliases or CACHE_ALIASES).items():
+        config = {
+            'BACKEND': CACHE_BACKENDS[backend],
+            'KEY_PREFIX': f'{key_prefix}:{alias}' if key_prefix else alias,
+            'TIMEOUT': timeout,
+        }
+        if backend == 'locmem':
+            config['LOCATION'] = f'{key_prefix}-{alias}'
+        elif backend == 'file':
+            config['LOCATION'] = f"{location.rstrip('/')}/{alias}"
+        elif backend == 'redis':
+            config['LOCATION'] = location
+        caches[alias] = config
+    return caches
+
+
+def is_shared_cache(alias):
+    """
+    Whether every worker process sees the same entries in this cache alias
+    (false for locmem, which is per process, and dummy, which keeps nothing)
+    """
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    return backend not in (CACHE_BACKENDS['locmem'], CACHE_BACKENDS['dummy'])
+
+
+class CacheAside(Generic[T]):
+    """
+    Read-through cache for values produced by loader(*parts).
+
+    Keys look like '{namespace}:s{schema}:{versions}:{parts}', where versions
+    are counters kept in the cache: the namespace's own counter (bumped by
+    invalidate_all()) plus any keys returned by version_keys(*parts), which
+    lets a value follow counters that other code already bumps (for example
+    the permission resolver's catalog version). Bumping a counter makes old
+    entries unreachable; they expire on their own. Raise schema_version when
+    the shape of cached values changes. None results are cached too.
+    Cache errors are logged and fall back to calling the loader.
+    """
+
+    def __init__(self, namespace: str, loader: Callable[..., T], alias: str = 'default',
+                 timeout: Optional[int] = 300, schema_version: int = 1,
+                 version_keys: Optional[Callable[..., Iterable[str]]] = None):
+        self.namespace = namespace
+        self.loader = loader
+        self.alias = alias
+        self.timeout = timeout
+        self.schema_version = schema_version
+        self.version_keys = version_keys
+
+    @property
+    def cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    @property
+    def namespace_version_key(self) -> str:
+        return f'{self.namespace}:version'
+
+    def key(self, *parts) -> str:
+        """
+        Current versioned key for parts (one round trip for all counters)
+        """
+        counter_keys = [self.namespace_version_key]
+        if self.version_keys is not None:
+            counter_keys.extend(self.version_keys(*parts))
+        counters = self.cache.get_many(counter_keys)
+        versions = '.'.join(str(counters.get(key, 0)) for key in counter_keys)
+        suffix = ':'.join(str(part) for part in parts)
+        return f'{self.namespace}:s{self.schema_version}:{versions}:{suffix}'
+
+    def get(self, *parts) -> T:
+        """
+        Return the cached value for parts, loading and storing it on a miss
+        """
+        try:
+            key = self.key(*parts)
+            cached = self.cache.get(key)
+        except Exception as e:
+            logger.warning(f"Cache '{self.alias}' unavailable for {self.namespace}: {str(e)}")
+            return self.loader(*parts)
+
+        if cached is not None:
+            # Values are stored wrapped so that a cached None is a hit
+            return cached[0]
+
+        value = self.loader(*parts)
+        try:
+            self.cache.set(key, (value,), self.timeout)
+        except Exception as e:
+            logger.warning(f"Cache '{self.alias}' unavailable for {self.namespace}: {str(e)}")
+        return value
+
+    def set(self, value: T, *parts) -> None:
+        self.cache.set(self.key(*parts), (value,), self.timeout)
+
+    def invalidate(self, *parts) -> None:
+        """
+        Drop the entry for parts under the current versions
+        """
+        self.cache.delete(self.key(*parts))
+
+    def invalidate_all(self) -> None:
+        """
+        Make every entry of the namespace unreachable
+        """
+        try:
+            self.cache.incr(self.namespace_version_key)
+        except ValueError:
+            self.cache.set(self.namespace_version_key, 1, None)
@@ -0,0 +1,77 @@
+"""
+Database profiles.
+
+build_database() turns the DB_* settings into DATABASES['default']:
+  - sqlite:     development defaults (rollback journal, one connection per request)
+  - sqlite-wal: single-host production on SQLite; WAL journaling, busy_timeout
+                and synchronous=NORMAL applied on every new connection through
+                the backend's init_command, writes take the lock up front
+                (BEGIN IMMEDIATE) and connections are kept open
+  - postgresql / mysql: persistent connections (CONN_MAX_AGE) with health checks
+"""
+
+DB_PROFILES = ('sqlite', 'sqlite-wal', 'postgresql', 'mysql')
+
+SERVER_ENGINES = {
+    'postgresql': 'django.db.backends.postgresql',
+    'mysql': 'django.db.backends.mysql',
+}
+
+SERVER_PORTS = {
+    'postgresql': '5432',
+    'mysql': '3306',
+}
+
+
+def sqlite_init_command(busy_timeout=5000, synchronous='NORMAL'):
+    """
+    PRAGMAs run on each new SQLite connection for the sqlite-wal profile
+    """
+    return ';'.join((
+        'PRAGMA journal_mode=WAL',
+        f'PRAGMA busy_timeout={int(busy_timeout)}',
+        f'PRAGMA synchronous={synchronous}',
+        'PRAGMA temp_store=MEMORY',
+    ))
+
+
+def build_database(profile='sqlite', sqlite_path='db.sqlite3', name='', user='', password='',
+                   host='localhost', port='', conn_max_age=None, busy_timeout=5000, synchronous='NORMAL'):
+    """
+    Return the settings dict for one database connection
+    """
+    if profile not in DB_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE '{profile}', expected one of: {', '.join(DB_PROFILES)}")
+
+    if profile == 'sqlite':
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': sqlite_path,
+            'CONN_MAX_AGE': conn_max_age or 0,
+        }
+
+    if profile == 'sqlite-wal':
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': sqlite_path,
+            # Reusing connections also skips re-running the PRAGMAs per request
+            'CONN_MAX_AGE': 600 if conn_max_age is None else conn_max_age,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'init_command': sqlite_init_command(busy_timeout, synchronous),
+                'transaction_mode': 'IMMEDIATE',
+                # Python-level wait for the write lock, in seconds
+                'timeout': busy_timeout / 1000,
+            },
+        }
+
+    return {
+        'ENGINE': SERVER_ENGINES[profile],
+        'NAME': name,
+        'USER': user,
+        'PASSWORD': password,
+        'HOST': host,
+        'PORT': port or SERVER_PORTS[profile],
+        'CONN_MAX_AGE': 60 if conn_max_age is None else conn_max_age,
+        'CONN_HEALTH_CHECKS': True,
+    }
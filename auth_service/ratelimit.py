@@ -0,0 +1,297 @@
+"""
+Token-bucket rate limiting shared by all workers.
+
+Each (scope, client) pair has a bucket of `capacity` tokens that refills at
+capacity/period tokens per second; a request takes one token and is refused
+with a Retry-After when the bucket is empty. RedisBucketStore refills and
+takes the token in one Lua script, so every gunicorn worker and host sees the
+same buckets; MemoryBucketStore is the in-process stand-in for development
+and single-process servers. Rates are DRF rate strings ('10/m') looked up by
+scope in REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'].
+
+BucketThrottle and its subclasses are DRF throttle classes; rate_limit()
+limits a single view method.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from typing import NamedTuple
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from sso.utils import get_client_ip
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+TOO_MANY_REQUESTS = 'تعداد درخواست‌های شما بیش از حد مجاز است. لطفاً کمی صبر کنید.'
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    remaining: float
+    retry_after: float
+
+
+UNLIMITED = Decision(True, math.inf, 0.0)
+
+
+@lru_cache(maxsize=64)
+def parse_rate(rate):
+    """
+    '10/m' -> (10, 60), in DRF's format (s, m, h or d; only the first
+    letter of the period counts). None means no limit.
+    """
+    if rate is None:
+        return None
+    num, period = rate.split('/')
+    return int(num), PERIODS[period.strip()[0].lower()]
+
+
+def get_rate(scope):
+    return api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+
+
+class MemoryBucketStore:
+    """
+    Buckets in a dict of this process, behind a lock. Each worker has its
+    own buckets, so N workers allow N times the rate; use RedisBucketStore
+    when more than one process serves requests.
+    """
+
+    # Past this many buckets, the least recently used one is dropped
+    max_keys = 100000
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate, cost=1):
+        with self._lock:
+            now = self.clock()
+            bucket = self._buckets.pop(key, None)
+            tokens = capacity if bucket is None else min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / rate
+            # (tokens, last refill), most recently used last
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                # Idle longest, so the most likely to have refilled, and a
+                # full bucket is the same as no bucket
+                self._buckets.popitem(last=False)
+        return Decision(allowed, tokens, wait)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisBucketStore:
+    """
+    Buckets as Redis hashes (tokens, ts), updated by a Lua script that
+    refills, checks and takes the token atomically using the Redis clock, so
+    workers need neither a lock nor synchronised clocks. A bucket expires
+    once it would be full again. Requires Redis 5+ and the redis package.
+    """
+
+    SCRIPT = """
+if redis.replicate_commands then redis.replicate_commands() end
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+if tokens == nil then
+    tokens = capacity
+else
+    tokens = math.min(capacity, tokens + math.max(0, now - tonumber(state[2])) * rate)
+end
+local allowed = 0
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens), tostring(wait)}
+"""
+
+    def __init__(self, url='', client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        # Runs with EVALSHA, loading the script again after a SCRIPT FLUSH
+        self._script = client.register_script(self.SCRIPT)
+
+    def consume(self, key, capacity, rate, cost=1):
+        allowed, tokens, wait = self._script(keys=[key], args=[capacity, repr(float(rate)), cost])
+        return Decision(bool(allowed), float(tokens), float(wait))
+
+    def clear(self, pattern='*'):
+        for key in self.client.scan_iter(match=pattern, count=1000):
+            self.client.delete(key)
+
+
+class RateLimiter:
+    """
+    Takes tokens from the bucket of (scope, ident). When the store fails
+    the request is let through (fail_open) and a warning is logged, so a
+    Redis outage degrades to no limit instead of an outage of the API.
+    """
+
+    def __init__(self, store, prefix='bucket', enabled=True, fail_open=True):
+        self.store = store
+        self.prefix = prefix
+        self.enabled = enabled
+        self.fail_open = fail_open
+
+    def consume(self, scope, ident, rate, cost=1):
+        parsed = parse_rate(rate)
+        if not self.enabled or parsed is None:
+            return UNLIMITED
+        capacity, period = parsed
+        try:
+            return self.store.consume(f'{self.prefix}:{scope}:{ident}', capacity, capacity / period, cost)
+        except Exception as e:
+            if not self.fail_open:
+                raise
+            logger.warning(f"Rate limiter store unavailable for {scope}: {str(e)}")
+            return UNLIMITED
+
+
+def build_store(backend='memory', url=''):
+    if backend == 'memory':
+        return MemoryBucketStore()
+    if backend == 'redis':
+        if not url:
+            raise ValueError("RATELIMIT_REDIS_URL is required for RATELIMIT_BACKEND=redis")
+        return RedisBucketStore(url)
+    raise ValueError(f"Unknown RATELIMIT_BACKEND '{backend}', expected memory or redis")
+
+
+_limiter = None
+
+
+def get_rate_limiter():
+    """
+    Return the process-wide RateLimiter configured from settings
+    """
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter(
+            build_store(getattr(settings, 'RATELIMIT_BACKEND', 'memory'),
+                        getattr(settings, 'RATELIMIT_REDIS_URL', '')),
+            prefix=getattr(settings, 'RATELIMIT_KEY_PREFIX', 'bucket'),
+            enabled=getattr(settings, 'RATELIMIT_ENABLED', True),
+            fail_open=getattr(settings, 'RATELIMIT_FAIL_OPEN', True),
+        )
+    return _limiter
+
+
+def client_key(request, key='user'):
+    """
+    'user:<pk>' for an authenticated user when key='user', else 'ip:<address>'
+    """
+    user = getattr(request, 'user', None)
+    if key == 'user' and user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f'ip:{get_client_ip(request)}'
+
+
+class BucketThrottle(BaseThrottle):
+    """
+    DRF throttle backed by the token buckets; the rate is
+    DEFAULT_THROTTLE_RATES[scope]. DRF answers a refusal with 429 and a
+    Retry-After header.
+    """
+
+    scope = None
+    key = 'user'
+
+    def get_scope(self, view):
+        return self.scope
+
+    def get_key(self, request, view):
+        """Bucket identity for the request, None to skip throttling."""
+        return client_key(request, self.key)
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(view)
+        ident = self.get_key(request, view)
+        if scope is None or ident is None:
+            self.decision = UNLIMITED
+            return True
+        self.decision = get_rate_limiter().consume(scope, ident, get_rate(scope))
+        return self.decision.allowed
+
+    def wait(self):
+        return self.decision.retry_after
+
+
+class AnonBucketThrottle(BucketThrottle):
+    """Anonymous requests, per IP, at the 'anon' rate."""
+
+    scope = 'anon'
+
+    def get_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return client_key(request, 'ip')
+
+
+class UserBucketThrottle(BucketThrottle):
+    """Per user (per IP when anonymous) at the 'user' rate."""
+
+    scope = 'user'
+
+
+class ScopedBucketThrottle(BucketThrottle):
+    """Per user at the rate of the view's throttle_scope."""
+
+    def get_scope(self, view):
+        return getattr(view, 'throttle_scope', None)
+
+
+def too_many_requests(retry_after, message=TOO_MANY_REQUESTS):
+    return Response({'error': message}, status=status.HTTP_429_TOO_MANY_REQUESTS,
+                    headers={'Retry-After': str(max(1, math.ceil(retry_after)))})
+
+
+def rate_limit(scope, key='user', methods=('POST',)):
+    """
+    Limit a view to the rate of `scope`, per user (key='user', the IP for
+    anonymous requests) or per IP (key='ip'), for the given methods (None
+    for all). Over the limit the view is not called and the response is 429
+    with Retry-After. Wrap class methods with method_decorator.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapped(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                decision = get_rate_limiter().consume(scope, client_key(request, key), get_rate(scope))
+                if not decision.allowed:
+                    logger.info(f"Rate limit '{scope}' exceeded by {client_key(request, key)}")
+                    return too_many_requests(decision.retry_after)
+            return view_func(request, *args, **kwargs)
+        return wrapped
+    return decorator
@@ -8,8 +8,12 @@ import os
 import logging.config
 from pathlib import Path
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 from datetime import timedelta
 
+from .cache import build_caches
+from .database import build_database
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -17,6 +21,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = config('SECRET_KEY', default='django-insecure-change-this-in-production')
 DEBUG = config('DEBUG', default=True, cast=bool)
 ALLOWED_HOSTS = ['localhost', '127.0.0.1', 'auth.avinoo.ir', '87.248.150.86']
+# Reverse proxies in front of the service that append to X-Forwarded-For
+# (nginx: 1); 0 ignores the header and uses REMOTE_ADDR (see sso.utils.get_client_ip)
+TRUSTED_PROXY_COUNT = config('TRUSTED_PROXY_COUNT', default=0, cast=int)
 
 # Microservice Configuration
 AUTH_SERVICE_DOMAIN = ['localhost', '127.0.0.1', 'auth.avinoo.ir', '87.248.150.86']
@@ -27,6 +34,60 @@ SSO_REDIRECT_URL = config('SSO_REDIRECT_URL', default='https://{domain}/callback
 SSO_LOGIN_URL = config('SSO_LOGIN_URL', default='https://{domain}/login')
 SSO_LOGOUT_URL = config('SSO_LOGOUT_URL', default='https://{domain}/logout')
 
+# SSO client registry (in-process cache of SSOClient rows)
+SSO_CLIENT_REGISTRY_TTL = config('SSO_CLIENT_REGISTRY_TTL', default=300, cast=int)
+# Cache alias used to share invalidations between workers (empty = local only)
+SSO_CLIENT_REGISTRY_CACHE = config('SSO_CLIENT_REGISTRY_CACHE', default='clients') or None
+
+# SSO login sessions: 'db' (SSOSession rows) or 'cache' (ephemeral, in the 'sessions' alias)
+SSO_SESSION_STORE = config('SSO_SESSION_STORE', default='db')
+SSO_SESSION_TTL = config('SSO_SESSION_TTL', default=600, cast=int)
+
+# Retention sweep (python manage.py sweep_sso, see sso.retention)
+SSO_AUDIT_RETENTION_DAYS = config('SSO_AUDIT_RETENTION_DAYS', default=90, cast=int)
+# Per-action overrides, "action:days,...", 0 = keep forever
+SSO_AUDIT_RETENTION_BY_ACTION = config('SSO_AUDIT_RETENTION_BY_ACTION', default='token_validated:7,redirect:30')
+SSO_SWEEP_BATCH_SIZE = config('SSO_SWEEP_BATCH_SIZE', default=1000, cast=int)
+SSO_SWEEP_PAUSE = config('SSO_SWEEP_PAUSE', default=0.05, cast=float)
+# Hourly stats rollups (python manage.py rollup_sso_stats, see sso.stats), 0 = keep forever
+SSO_STATS_ROLLUP_RETENTION_DAYS = config('SSO_STATS_ROLLUP_RETENTION_DAYS', default=400, cast=int)
+
+# Maximum number of tokens accepted by api/validate-tokens/
+SSO_BATCH_VALIDATION_MAX_TOKENS = config('SSO_BATCH_VALIDATION_MAX_TOKENS', default=100, cast=int)
+
+# SSO audit log writer (see sso.audit.BufferedAuditWriter)
+SSO_AUDIT_BUFFERED = config('SSO_AUDIT_BUFFERED', default=True, cast=bool)
+SSO_AUDIT_BATCH_SIZE = config('SSO_AUDIT_BATCH_SIZE', default=100, cast=int)
+SSO_AUDIT_FLUSH_INTERVAL = config('SSO_AUDIT_FLUSH_INTERVAL', default=1.0, cast=float)
+SSO_AUDIT_MAX_QUEUE_SIZE = config('SSO_AUDIT_MAX_QUEUE_SIZE', default=10000, cast=int)
+SSO_AUDIT_OVERFLOW_POLICY = config('SSO_AUDIT_OVERFLOW_POLICY', default='drop')  # drop | block
+SSO_AUDIT_BLOCK_TIMEOUT = config('SSO_AUDIT_BLOCK_TIMEOUT', default=0.05, cast=float)
+
+# Meet room-access cache (see apps.meet.access_cache.MeetAccessCache), in seconds
+MEET_ACCESS_CACHE = config('MEET_ACCESS_CACHE', default='default')
+MEET_ACCESS_CACHE_TTL = config('MEET_ACCESS_CACHE_TTL', default=60, cast=int)
+MEET_ACCESS_NEGATIVE_TTL = config('MEET_ACCESS_NEGATIVE_TTL', default=30, cast=int)
+MEET_ACCESS_PAST_TTL = config('MEET_ACCESS_PAST_TTL', default=86400, cast=int)
+MEET_ACCESS_STALE_TTL = config('MEET_ACCESS_STALE_TTL', default=300, cast=int)
+
+# Meets API HTTP client (see apps.meet.http_client.UpstreamClient)
+MEET_API_POOL_SIZE = config('MEET_API_POOL_SIZE', default=10, cast=int)
+MEET_API_TIMEOUT = config('MEET_API_TIMEOUT', default=10, cast=float)
+MEET_API_MAX_RETRIES = config('MEET_API_MAX_RETRIES', default=2, cast=int)
+# Overall budget of one call, retries and backoff included
+MEET_API_DEADLINE = config('MEET_API_DEADLINE', default=15, cast=float)
+MEET_API_BACKOFF_BASE = config('MEET_API_BACKOFF_BASE', default=0.1, cast=float)
+MEET_API_BACKOFF_MAX = config('MEET_API_BACKOFF_MAX', default=2.0, cast=float)
+MEET_API_CIRCUIT_FAILURES = config('MEET_API_CIRCUIT_FAILURES', default=5, cast=int)
+MEET_API_CIRCUIT_RESET = config('MEET_API_CIRCUIT_RESET', default=30.0, cast=float)
+# Connection pool of the async (httpx) client used by /callback/async/
+MEET_API_ASYNC_POOL_SIZE = config('MEET_API_ASYNC_POOL_SIZE', default=100, cast=int)
+
+# Room token batches (POST /api/admin/meet/tokens/)
+MEET_BATCH_MAX_USERS = config('MEET_BATCH_MAX_USERS', default=1000, cast=int)
+MEET_BATCH_WORKERS = config('MEET_BATCH_WORKERS', default=4, cast=int)
+MEET_BATCH_CHUNK_SIZE = config('MEET_BATCH_CHUNK_SIZE', default=50, cast=int)
+
 
 # Application definition
 DJANGO_APPS = [
@@ -42,7 +103,6 @@ THIRD_PARTY_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
-    # 'django_ratelimit',  # Disabled for development
 ]
 
 LOCAL_APPS = [
@@ -58,7 +118,7 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'auth_service.middleware.AsyncWhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -88,12 +148,23 @@ TEMPLATES = [
 WSGI_APPLICATION = 'auth_service.wsgi.application'
 
 
-# Database Configuration
+# Database Configuration (see auth_service.database.build_database)
+# DB_PROFILE: sqlite (development) | sqlite-wal (single host) | postgresql | mysql
+DB_PROFILE = config('DB_PROFILE', default='sqlite')
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default='')
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': build_database(
+        DB_PROFILE,
+        sqlite_path=config('DB_SQLITE_PATH', default=str(BASE_DIR / 'db.sqlite3')),
+        name=config('DB_NAME', default='auth_service_db'),
+        user=config('DB_USER', default=''),
+        password=config('DB_PASSWORD', default=''),
+        host=config('DB_HOST', default='localhost'),
+        port=config('DB_PORT', default=''),
+        conn_max_age=int(DB_CONN_MAX_AGE) if DB_CONN_MAX_AGE else None,
+        busy_timeout=config('DB_SQLITE_BUSY_TIMEOUT', default=5000, cast=int),
+        synchronous=config('DB_SQLITE_SYNCHRONOUS', default='NORMAL'),
+    )
 }
 
 
@@ -139,10 +210,16 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
 
+AUTHENTICATION_BACKENDS = [
+    'django.contrib.auth.backends.ModelBackend',
+    # authenticate(login=...): username or email in one query (UserLoginSerializer)
+    'apps.users.backends.CredentialBackend',
+]
+
 # Django REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.RevocationJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -152,16 +229,60 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # Token buckets in auth_service.ratelimit; rates per scope, rate_limit('<scope>') on views
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'auth_service.ratelimit.AnonBucketThrottle',
+        'auth_service.ratelimit.UserBucketThrottle'
     ],
     'DEFAULT_THROTTLE_RATES': {
-        'anon': '100/hour',
-        'user': '1000/hour'
+        'anon': config('THROTTLE_ANON_RATE', default='100/hour'),
+        'user': config('THROTTLE_USER_RATE', default='1000/hour'),
+        'register': config('THROTTLE_REGISTER_RATE', default='5/min'),
+        'login': config('THROTTLE_LOGIN_RATE', default='10/min'),
+        'change_password': '5/min',
+        'role_create': '10/min',
+        'user_role_assign': '10/min',
+        'user_role_bulk': '10/min',
+        'role_permission_grant': '10/min',
+        'user_permission_grant': '10/min',
+        'permission_group_create': '10/min',
+        'permission_group_add': '10/min',
     }
 }
 
+# JWT signing keys (see apps.users.keys)
+# RS256 needs a key pair supplied by the operator outside the source tree:
+# JWT_KEYS_DIR (private_key.pem, public_key.pem, retired/*.pem) or the two
+# *_PATH variables. Without them tokens are signed with HS256 and SECRET_KEY.
+# Retired public keys in JWT_KEYS_DIR/retired/ stay published on /auth/jwks/
+# during a rotation.
+def _key_path(value):
+    return Path(value).expanduser().resolve() if value else None
+
+
+JWT_KEYS_DIR = config('JWT_KEYS_DIR', default='', cast=_key_path)
+JWT_PRIVATE_KEY_PATH = config('JWT_PRIVATE_KEY_PATH', default='', cast=_key_path) or (
+    JWT_KEYS_DIR / 'private_key.pem' if JWT_KEYS_DIR else None
+)
+JWT_PUBLIC_KEY_PATH = config('JWT_PUBLIC_KEY_PATH', default='', cast=_key_path) or (
+    JWT_KEYS_DIR / 'public_key.pem' if JWT_KEYS_DIR else None
+)
+if JWT_KEYS_DIR is None and JWT_PRIVATE_KEY_PATH is not None:
+    JWT_KEYS_DIR = JWT_PRIVATE_KEY_PATH.parent
+JWT_ALGORITHM = config(
+    'JWT_ALGORITHM',
+    default='RS256' if JWT_PRIVATE_KEY_PATH and JWT_PUBLIC_KEY_PATH
+    and JWT_PRIVATE_KEY_PATH.exists() and JWT_PUBLIC_KEY_PATH.exists() else 'HS256'
+)
+if not JWT_ALGORITHM.startswith('HS'):
+    if not (JWT_PRIVATE_KEY_PATH and JWT_PUBLIC_KEY_PATH):
+        raise ImproperlyConfigured(f"JWT_ALGORITHM={JWT_ALGORITHM} needs JWT_KEYS_DIR or JWT_PRIVATE_KEY_PATH/JWT_PUBLIC_KEY_PATH")
+    for _path in (JWT_KEYS_DIR, JWT_PRIVATE_KEY_PATH, JWT_PUBLIC_KEY_PATH):
+        if _path.is_relative_to(BASE_DIR):
+            raise ImproperlyConfigured(f"JWT signing keys must live outside the source tree, not in {_path}")
+JWKS_URL = config('JWKS_URL', default='https://auth.avinoo.ir/auth/jwks/')
+JWKS_MAX_AGE = config('JWKS_MAX_AGE', default=3600, cast=int)
+
 # JWT Configuration with RSA
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=config('JWT_ACCESS_TOKEN_LIFETIME', default=60, cast=int)),
@@ -169,12 +290,14 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'UPDATE_LAST_LOGIN': True,
-    'ALGORITHM': 'HS256',  # Using HMAC for simplicity
+    'ALGORITHM': JWT_ALGORITHM,
+    # Only used for HS*; RSA keys come from the key ring in apps.users.keys
     'SIGNING_KEY': SECRET_KEY,
     'VERIFYING_KEY': SECRET_KEY,
     'AUDIENCE': 'auth.avinoo.ir',
     'ISSUER': 'auth.avinoo.ir',
-    'JWK_URL': 'https://auth.avinoo.ir/auth/jwks/',
+    # Keys are verified locally from the key ring and published at JWKS_URL
+    'JWK_URL': None,
     'LEEWAY': 0,
     'AUTH_HEADER_TYPES': ('Bearer',),
     'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION',
@@ -188,8 +311,16 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=5),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
+    # Rotation revokes the old refresh token in apps.users.revocation
+    'TOKEN_REFRESH_SERIALIZER': 'apps.users.jwt_serializers.RevocableTokenRefreshSerializer',
 }
 
+# Token revocation (apps.users.revocation): revoked jtis in the database behind a per-process Bloom filter
+TOKEN_REVOCATION_SYNC_INTERVAL = config('TOKEN_REVOCATION_SYNC_INTERVAL', default=2.0, cast=float)
+TOKEN_REVOCATION_REBUILD_INTERVAL = config('TOKEN_REVOCATION_REBUILD_INTERVAL', default=3600, cast=int)
+TOKEN_REVOCATION_CAPACITY = config('TOKEN_REVOCATION_CAPACITY', default=100000, cast=int)
+TOKEN_REVOCATION_ERROR_RATE = config('TOKEN_REVOCATION_ERROR_RATE', default=0.001, cast=float)
+
 # CORS Configuration for Microservices
 CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS', default='http://localhost:3000,http://127.0.0.1:3000,http://app1.avinoo.ir,http://app2.avinoo.ir,https://app1.avinoo.ir,https://app2.avinoo.ir').split(',')
 CORS_ALLOW_CREDENTIALS = True
@@ -200,12 +331,40 @@ SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
 X_FRAME_OPTIONS = 'DENY'
 
-# Cache Configuration
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
-    }
-}
+# Cache Configuration (see auth_service.cache.build_caches)
+# CACHE_BACKEND: locmem (per process) | file (shared on one host) | redis | dummy
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+CACHE_LOCATION = config('CACHE_LOCATION', default='')
+CACHE_KEY_PREFIX = config('CACHE_KEY_PREFIX', default='auth')
+CACHES = build_caches(CACHE_BACKEND, CACHE_LOCATION, CACHE_KEY_PREFIX)
+
+# Rate limiting (auth_service.ratelimit): token buckets per scope and client
+# RATELIMIT_BACKEND: redis (shared by all workers) | memory (per process)
+RATELIMIT_BACKEND = config('RATELIMIT_BACKEND', default='redis' if CACHE_BACKEND == 'redis' else 'memory')
+RATELIMIT_REDIS_URL = config('RATELIMIT_REDIS_URL', default=CACHE_LOCATION if CACHE_BACKEND == 'redis' else '')
+RATELIMIT_KEY_PREFIX = config('RATELIMIT_KEY_PREFIX', default=f'{CACHE_KEY_PREFIX}:bucket')
+RATELIMIT_ENABLED = config('RATELIMIT_ENABLED', default=True, cast=bool)
+RATELIMIT_FAIL_OPEN = config('RATELIMIT_FAIL_OPEN', default=True, cast=bool)
+
+# Login lockout (apps.users.lockout): failed logins counted in a sliding window in the cache
+LOGIN_LOCKOUT_CACHE = config('LOGIN_LOCKOUT_CACHE', default='ratelimit')
+# auto: in LOGIN_LOCKOUT_CACHE when it is shared by all workers, else in the users table
+LOGIN_LOCKOUT_COUNTER = config('LOGIN_LOCKOUT_COUNTER', default='auto')
+LOGIN_LOCKOUT_WINDOW = config('LOGIN_LOCKOUT_WINDOW', default=900, cast=int)
+LOGIN_LOCKOUT_ACCOUNT_LIMIT = config('LOGIN_LOCKOUT_ACCOUNT_LIMIT', default=5, cast=int)
+LOGIN_LOCKOUT_IP_LIMIT = config('LOGIN_LOCKOUT_IP_LIMIT', default=50, cast=int)
+LOGIN_LOCKOUT_MINUTES = config('LOGIN_LOCKOUT_MINUTES', default=30, cast=int)
+
+# Sessions; use django.contrib.sessions.backends.cached_db with a shared (redis) cache
+SESSION_ENGINE = config('SESSION_ENGINE', default='django.contrib.sessions.backends.db')
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Effective permission cache (see apps.permissions.resolver)
+PERMISSIONS_CACHE_ALIAS = config('PERMISSIONS_CACHE_ALIAS', default='permissions')
+PERMISSIONS_CACHE_TIMEOUT = config('PERMISSIONS_CACHE_TIMEOUT', default=300, cast=int)
+
+# Maximum user x role pairs per bulk assign/revoke request
+ROLES_BULK_MAX_ITEMS = config('ROLES_BULK_MAX_ITEMS', default=10000, cast=int)
 
 # Logging Configuration
 LOGGING = {
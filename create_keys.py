@@ -13,7 +13,8 @@ def generate_rsa_keys():
     print("🔑 تولید کلیدهای RSA...")
     
     # ایجاد دایرکتوری
-    os.makedirs('keys', exist_ok=True)
+    keys_dir = os.environ['JWT_KEYS_DIR']  # خارج از پوشه پروژه
+    os.makedirs(keys_dir, mode=0o700, exist_ok=True)
     
     # تولید کلید
     private_key = rsa.generate_private_key(
@@ -24,7 +25,7 @@ def generate_rsa_keys():
     public_key = private_key.public_key()
     
     # ذخیره کلید خصوصی
-    with open('keys/private_key.pem', 'wb') as f:
+    with open(os.path.join(keys_dir, 'private_key.pem'), 'wb') as f:
         f.write(private_key.private_bytes(
             encoding=serialization.Encoding.PEM,
             format=serialization.PrivateFormat.PKCS8,
@@ -32,7 +33,7 @@ def generate_rsa_keys():
         ))
     
     # ذخیره کلید عمومی
-    with open('keys/public_key.pem', 'wb') as f:
+    with open(os.path.join(keys_dir, 'public_key.pem'), 'wb') as f:
         f.write(public_key.public_bytes(
             encoding=serialization.Encoding.PEM,
             format=serialization.PublicFormat.SubjectPublicKeyInfo
@@ -40,8 +41,8 @@ def generate_rsa_keys():
     
     print("✅ کلیدهای RSA تولید شدند!")
     print("📁 فایل‌ها:")
-    print("   - keys/private_key.pem")
-    print("   - keys/public_key.pem")
+    print(f"   - {keys_dir}/private_key.pem")
+    print(f"   - {keys_dir}/public_key.pem")
 
 if __name__ == '__main__':
     generate_rsa_keys()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Local access-token verification for client applications.
+
+Copy this module into a client app to validate auth.avinoo.ir access tokens
+without calling /api/validate-token/. Public keys are fetched from the JWKS
+endpoint once, cached, and refetched only when a token names an unknown kid
+(i.e. after a key rotation). Requires PyJWT[crypto].
+
+    verifier = JWKSTokenVerifier('https://auth.avinoo.ir/auth/jwks/')
+    claims = verifier.verify(token)      # raises jwt.InvalidTokenError
+    print(claims['user_id'], claims['guid'], claims['username'])
+
+Clients with include_authorization_claims enabled also receive 'roles' and a
+'perms' bitmap; decode it with PermissionCatalogClient:
+
+    catalog = PermissionCatalogClient('https://auth.avinoo.ir/permissions/catalog/')
+    permissions = catalog.decode(claims)  # frozenset of permission names
+"""
+
+import base64
+import json
+import sys
+import urllib.request
+
+import jwt
+
+
+class JWKSTokenVerifier:
+    """
+    Verify RS256 access tokens against the auth service's published keys.
+    """
+
+    def __init__(self, jwks_url, audience='auth.avinoo.ir', issuer='auth.avinoo.ir',
+                 cache_lifespan=3600, leeway=0):
+        self.audience = audience
+        self.issuer = issuer
+        self.leeway = leeway
+        self.jwks_client = jwt.PyJWKClient(jwks_url, cache_keys=True, lifespan=cache_lifespan)
+
+    def verify(self, token):
+        """
+        Return the token claims if the signature, expiry, audience and issuer
+        are valid and the token is an access token.
+        """
+        signing_key = self.jwks_client.get_signing_key_from_jwt(token)
+        claims = jwt.decode(
+            token,
+            signing_key.key,
+            algorithms=['RS256'],
+            audience=self.audience,
+            issuer=self.issuer,
+            leeway=self.leeway,
+        )
+        if claims.get('token_type') != 'access':
+            raise jwt.InvalidTokenError('Not an access token')
+        return claims
+
+
+class PermissionCatalogClient:
+    """
+    Decode the 'perms' bitmap claim using the published permission catalog.
+    Catalogs are immutable per version, so each one is fetched only once.
+    """
+
+    def __init__(self, catalog_url, timeout=5):
+        self.catalog_url = catalog_url
+        self.timeout = timeout
+        self._catalogs = {}
+
+    def get_catalog(self, version):
+        if version not in self._catalogs:
+            url = f'{self.catalog_url}?version={version}'
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                self._catalogs[version] = json.load(response)['permissions']
+        return self._catalogs[version]
+
+    def decode(self, claims):
+        """
+        Return the permission names encoded in the token claims
+        """
+        if 'perms' not in claims:
+            return frozenset()
+
+        names = self.get_catalog(claims['perms_v'])
+        encoded = claims['perms']
+        bitmap = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+        return frozenset(
+            name for position, name in enumerate(names)
+            if position >> 3 < len(bitmap) and bitmap[position >> 3] & (1 << (position & 7))
+        )
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print(f'Usage: {sys.argv[0]} <jwks_url> <access_token>')
+        sys.exit(1)
+
+    verifier = JWKSTokenVerifier(sys.argv[1])
+    try:
+        print(verifier.verify(sys.argv[2]))
+    except jwt.PyJWTError as e:
+        print(f'❌ Invalid token: {e}')
+        sys.exit(1)
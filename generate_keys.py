@@ -4,7 +4,8 @@ from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.backends import default_backend
 
 # ایجاد دایرکتوری
-os.makedirs('keys', exist_ok=True)
+keys_dir = os.environ['JWT_KEYS_DIR']  # خارج از پوشه پروژه
+os.makedirs(keys_dir, mode=0o700, exist_ok=True)
 
 # تولید کلید
 private_key = rsa.generate_private_key(
@@ -15,7 +16,7 @@ private_key = rsa.generate_private_key(
 public_key = private_key.public_key()
 
 # ذخیره کلید خصوصی
-with open('keys/private_key.pem', 'wb') as f:
+with open(os.path.join(keys_dir, 'private_key.pem'), 'wb') as f:
     f.write(private_key.private_bytes(
         encoding=serialization.Encoding.PEM,
         format=serialization.PrivateFormat.PKCS8,
@@ -23,7 +24,7 @@ with open('keys/private_key.pem', 'wb') as f:
     ))
 
 # ذخیره کلید عمومی
-with open('keys/public_key.pem', 'wb') as f:
+with open(os.path.join(keys_dir, 'public_key.pem'), 'wb') as f:
     f.write(public_key.public_bytes(
         encoding=serialization.Encoding.PEM,
         format=serialization.PublicFormat.SubjectPublicKeyInfo
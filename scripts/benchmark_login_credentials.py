@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""
+Benchmark: queries, password hashes and time per UserLoginSerializer call
+
+Compares the previous validate() flow (authenticate by username, then a
+lookup by email and a second authenticate, then more lookups to bump the
+failed-login counter) with the CredentialBackend flow, on the success and
+failure paths, by username and by email. Uses a scratch test database and
+the configured password hasher, so the timings include the real hash cost.
+
+Usage:
+    python scripts/benchmark_login_credentials.py [--iterations 5]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'auth_service.settings')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import get_hasher
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+
+from apps.users.models import User
+from apps.users.serializers import UserLoginSerializer
+
+PASSWORD = 'correct-horse-battery'
+
+
+def legacy_validate(username, password):
+    """
+    UserLoginSerializer.validate before CredentialBackend
+    """
+    user = authenticate(username=username, password=password)
+    if not user:
+        try:
+            user_obj = User.objects.get(email=username)
+            user = authenticate(username=user_obj.username, password=password)
+        except User.DoesNotExist:
+            pass
+    if user:
+        if user.is_locked():
+            raise serializers.ValidationError('locked')
+        user.reset_failed_login()
+        return user
+    try:
+        User.objects.get(username=username).increment_failed_login()
+    except User.DoesNotExist:
+        try:
+            User.objects.get(email=username).increment_failed_login()
+        except User.DoesNotExist:
+            pass
+    raise serializers.ValidationError('invalid')
+
+
+def current_validate(username, password):
+    serializer = UserLoginSerializer(data={'username': username, 'password': password})
+    if not serializer.is_valid():
+        raise serializers.ValidationError(serializer.errors)
+    return serializer.validated_data['user']
+
+
+class HashCounter:
+    """
+    Count calls to the default hasher's encode() (every hash computed)
+    """
+
+    def __init__(self):
+        self.hasher = type(get_hasher())
+        self.calls = 0
+
+    def __enter__(self):
+        self.original = self.hasher.encode
+        counter = self
+
+        def encode(hasher, *args, **kwargs):
+            counter.calls += 1
+            return counter.original(hasher, *args, **kwargs)
+
+        self.hasher.encode = encode
+        return self
+
+    def __exit__(self, *exc):
+        self.hasher.encode = self.original
+
+
+def measure(validate, login, password, iterations):
+    """
+    Return (queries, hashes, ms) per call, resetting the lockout between calls
+    """
+    queries = hashes = 0
+    elapsed = 0.0
+    for _ in range(iterations):
+        User.objects.update(failed_login_attempts=0, locked_until=None)
+        with CaptureQueriesContext(connection) as captured, HashCounter() as counter:
+            started = time.perf_counter()
+            try:
+                validate(login, password)
+            except serializers.ValidationError:
+                pass
+            elapsed += time.perf_counter() - started
+        queries += len(captured)
+        hashes += counter.calls
+    return queries / iterations, hashes / iterations, elapsed / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=5)
+    args = parser.parse_args()
+
+    if connection.vendor == 'sqlite':
+        settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = os.path.join(
+            tempfile.mkdtemp(), 'credentials.sqlite3'
+        )
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        User.objects.bulk_create([
+            User(username=f'filler-{i}', email=f'filler-{i}@example.com', password='!')
+            for i in range(10000)
+        ])
+        User.objects.create_user(username='bench', email='bench@example.com', password=PASSWORD)
+        # Warm up the hasher and the connection
+        current_validate('bench', PASSWORD)
+
+        cases = [
+            ('success, username', 'bench', PASSWORD),
+            ('success, email', 'bench@example.com', PASSWORD),
+            ('wrong password, username', 'bench', 'wrong'),
+            ('wrong password, email', 'bench@example.com', 'wrong'),
+            ('unknown login', 'nobody', 'wrong'),
+        ]
+        print(f"{get_hasher().algorithm} hasher, {connection.vendor}, {args.iterations} iterations\n")
+        print(f"{'case':<26} {'flow':<8} {'queries':>8} {'hashes':>7} {'ms':>9}")
+        for name, login, password in cases:
+            for flow, validate in (('before', legacy_validate), ('after', current_validate)):
+                queries, hashes, ms = measure(validate, login, password, args.iterations)
+                print(f"{name:<26} {flow:<8} {queries:>8.0f} {hashes:>7.0f} {ms:>9.1f}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+"""
+Benchmark: SSO logins/sec for each database profile (see auth_service.database)
+
+Every profile gets a fresh database. --workers separate processes (like
+gunicorn workers) then POST /api/login/ in a loop for --duration seconds,
+each as its own user and with a fresh browser session per login, so every
+login does its full set of writes (SSOSession insert + update, audit log,
+last_login, Django session). Passwords use the MD5 hasher and caches are
+disabled so the numbers measure the database, not PBKDF2 or throttling.
+
+SQLite profiles use a temporary file. The postgresql profile uses the
+DB_NAME/DB_USER/DB_PASSWORD/DB_HOST/DB_PORT environment variables (point
+DB_NAME at a scratch database) and is skipped when psycopg is missing.
+
+Usage:
+    python scripts/benchmark_login_db.py [--profiles sqlite,sqlite-wal,postgresql]
+        [--workers 4] [--duration 5]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Add the project directory to Python path
+sys.path.append(PROJECT_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'auth_service.settings')
+
+CLIENT_ID = 'login-bench'
+PASSWORD = 'bench-password'
+
+
+def setup_django():
+    import logging
+    import django
+
+    django.setup()
+    from django.conf import settings
+
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    settings.ALLOWED_HOSTS = ['*']
+    logging.disable(logging.INFO)
+
+
+def seed(workers):
+    """
+    Create the schema, the SSO client and one user per worker
+    """
+    setup_django()
+    from django.core.management import call_command
+    from apps.users.models import User
+    from sso.models import SSOClient
+
+    call_command('migrate', verbosity=0)
+    SSOClient.objects.update_or_create(client_id=CLIENT_ID, defaults={
+        'name': 'Login benchmark', 'domain': 'bench.example.com', 'client_secret': 'bench',
+        'redirect_uri': 'https://bench.example.com/', 'allow_any_path': True,
+    })
+    for index in range(workers):
+        username = f'login-bench-{index}'
+        User.objects.filter(username=username).delete()
+        User.objects.create_user(username=username, email=f'{username}@example.com', password=PASSWORD)
+
+
+def worker(index, duration):
+    """
+    Log in repeatedly and print {"ok": n, "errors": n} as JSON
+    """
+    setup_django()
+    from django.db import OperationalError
+    from django.test import Client
+    from sso.audit import get_audit_writer
+
+    client = Client()
+    body = json.dumps({
+        'username': f'login-bench-{index}', 'password': PASSWORD,
+        'client_id': CLIENT_ID, 'redirect_uri': 'https://bench.example.com/cb',
+    })
+    ok = errors = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        client.cookies.clear()
+        try:
+            response = client.post('/api/login/', body, content_type='application/json')
+        except OperationalError:
+            errors += 1
+            continue
+        if response.status_code == 200:
+            ok += 1
+        else:
+            errors += 1
+    get_audit_writer().close()
+    print(json.dumps({'ok': ok, 'errors': errors}))
+
+
+def run_profile(profile, workers, duration):
+    env = dict(os.environ, DB_PROFILE=profile, CACHE_BACKEND='dummy', SSO_AUDIT_BUFFERED='True')
+    if profile.startswith('sqlite'):
+        env['DB_SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='login-bench-'), 'bench.sqlite3')
+    else:
+        try:
+            import psycopg  # noqa: F401
+        except ImportError:
+            try:
+                import psycopg2  # noqa: F401
+            except ImportError:
+                print(f'{profile:<11} skipped (psycopg not installed)')
+                return
+
+    script = os.path.abspath(__file__)
+    subprocess.run([sys.executable, script, '--seed', str(workers)], env=env, check=True, cwd=PROJECT_DIR)
+
+    processes = [
+        subprocess.Popen(
+            [sys.executable, script, '--worker', str(index), '--duration', str(duration)],
+            env=env, cwd=PROJECT_DIR, stdout=subprocess.PIPE, text=True
+        )
+        for index in range(workers)
+    ]
+    ok = errors = 0
+    for process in processes:
+        output, _ = process.communicate()
+        result = json.loads(output.strip().splitlines()[-1])
+        ok += result['ok']
+        errors += result['errors']
+    print(f'{profile:<11} {ok / duration:8.1f} logins/s   errors {errors}   ({workers} workers, {duration}s)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profiles', default='sqlite,sqlite-wal,postgresql')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        seed(args.seed)
+    elif args.worker is not None:
+        worker(args.worker, args.duration)
+    else:
+        for profile in args.profiles.split(','):
+            run_profile(profile.strip(), args.workers, args.duration)
+
+
+if __name__ == '__main__':
+    main()
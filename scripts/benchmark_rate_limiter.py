@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""
+Benchmark: overhead of the token-bucket rate limiter per request
+
+Measures RateLimiter.consume() on its own (memory store, one thread and
+--threads threads on the same keys, and Redis when --redis-url is given) and
+the cost it adds to a minimal DRF view: no throttle, DRF's cache-based
+UserRateThrottle, UserBucketThrottle and the rate_limit() decorator. Rates are
+set high enough that no request is refused, so the numbers are pure
+overhead.
+
+Usage:
+    python scripts/benchmark_rate_limiter.py [--iterations 20000] [--threads 4]
+        [--clients 1000] [--redis-url redis://127.0.0.1:6379/15]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'auth_service.settings')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.decorators import method_decorator
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework.throttling import UserRateThrottle
+from rest_framework.views import APIView
+
+from auth_service import ratelimit
+from auth_service.ratelimit import MemoryBucketStore, RateLimiter, RedisBucketStore, UserBucketThrottle, rate_limit
+
+RATE = '100000000/s'
+
+
+def per_call(limiter, iterations, clients, threads=1):
+    """Microseconds per consume() with `threads` threads sharing the keys."""
+    idents = [f'ip:10.0.{i // 250}.{i % 250}' for i in range(clients)]
+
+    def worker(offset):
+        for i in range(offset, iterations, threads):
+            limiter.consume('bench', idents[i % clients], RATE)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(worker, range(threads)))
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+class PlainView(APIView):
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    throttle_classes = []
+
+    def get(self, request):
+        return Response({'ok': True})
+
+
+class DRFThrottledView(PlainView):
+    throttle_classes = [UserRateThrottle]
+
+
+class BucketThrottledView(PlainView):
+    throttle_classes = [UserBucketThrottle]
+
+
+class DecoratedView(PlainView):
+    @method_decorator(rate_limit('user', methods=None))
+    def get(self, request):
+        return Response({'ok': True})
+
+
+def per_request(view_class, iterations, clients):
+    """Microseconds per GET through the whole DRF view."""
+    view = view_class.as_view()
+    factory = APIRequestFactory()
+    requests = [factory.get('/bench/', REMOTE_ADDR=f'10.0.{i // 250}.{i % 250}') for i in range(clients)]
+    for request in requests[:100]:
+        view(request)
+    started = time.perf_counter()
+    for i in range(iterations):
+        view(requests[i % clients])
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--redis-url', default='')
+    args = parser.parse_args()
+
+    # Every scope the views use, far above what the benchmark sends
+    api_settings.DEFAULT_THROTTLE_RATES['user'] = RATE
+    UserRateThrottle.THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+
+    print(f"{args.iterations} calls over {args.clients} clients, cache {settings.CACHE_BACKEND}\n")
+    print(f"{'consume()':<32} {'µs/call':>9}")
+    memory = RateLimiter(MemoryBucketStore())
+    print(f"{'memory, 1 thread':<32} {per_call(memory, args.iterations, args.clients):9.2f}")
+    print(f"{f'memory, {args.threads} threads':<32} "
+          f"{per_call(memory, args.iterations, args.clients, args.threads):9.2f}")
+    if args.redis_url:
+        store = RedisBucketStore(args.redis_url)
+        store.clear('bench:*')
+        redis_limiter = RateLimiter(store, prefix='bench', fail_open=False)
+        print(f"{'redis, 1 thread':<32} {per_call(redis_limiter, args.iterations, args.clients):9.2f}")
+        print(f"{f'redis, {args.threads} threads':<32} "
+              f"{per_call(redis_limiter, args.iterations, args.clients, args.threads):9.2f}")
+        store.clear('bench:*')
+
+    limiters = [('memory', memory)]
+    if args.redis_url:
+        limiters.append(('redis', redis_limiter))
+
+    print(f"\n{'DRF view':<32} {'µs/req':>9} {'overhead':>9}")
+    caches['default'].clear()
+    base = per_request(PlainView, args.iterations, args.clients)
+    print(f"{'no throttle':<32} {base:9.2f} {'':>9}")
+    drf = per_request(DRFThrottledView, args.iterations, args.clients)
+    print(f"{'UserRateThrottle (cache)':<32} {drf:9.2f} {drf - base:+9.2f}")
+    for name, limiter in limiters:
+        ratelimit._limiter = limiter
+        throttled = per_request(BucketThrottledView, args.iterations, args.clients)
+        print(f"{f'UserBucketThrottle ({name})':<32} {throttled:9.2f} {throttled - base:+9.2f}")
+        decorated = per_request(DecoratedView, args.iterations, args.clients)
+        print(f"{f'rate_limit() ({name})':<32} {decorated:9.2f} {decorated - base:+9.2f}")
+    ratelimit._limiter = None
+
+
+if __name__ == '__main__':
+    main()
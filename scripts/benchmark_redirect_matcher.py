@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+Benchmark: compiled RedirectURIMatcher vs the legacy startswith loop
+
+Usage:
+    python scripts/benchmark_redirect_matcher.py [--iterations 20000]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from urllib.parse import urlparse
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sso.matchers import RedirectURIMatcher
+
+
+DOMAIN = 'app.avinoo.ir'
+
+
+def legacy_is_redirect_uri_allowed(domain, allowed_redirect_uris, allow_any_path, redirect_uri):
+    """Previous SSOClient.is_redirect_uri_allowed implementation"""
+    try:
+        parsed_uri = urlparse(redirect_uri)
+        redirect_domain = parsed_uri.netloc.lower()
+        client_domain = domain.lower()
+
+        domain_matches = (
+            redirect_domain == client_domain or
+            redirect_domain.endswith(f'.{client_domain}')
+        )
+        if not domain_matches:
+            return False
+        if allow_any_path:
+            return True
+        if redirect_uri in allowed_redirect_uris:
+            return True
+        for allowed_uri in allowed_redirect_uris:
+            if redirect_uri.startswith(allowed_uri):
+                return True
+        return False
+    except Exception:
+        return False
+
+
+def build_allowed_uris(count):
+    return [f'https://{DOMAIN}/tenant-{i:05d}/callback' for i in range(count)]
+
+
+def run(sizes, iterations):
+    print(f"{'allowed URIs':>12} | {'legacy (µs)':>12} | {'matcher (µs)':>12} | {'speedup':>8}")
+    print('-' * 54)
+
+    for size in sizes:
+        allowed = build_allowed_uris(size)
+        matcher = RedirectURIMatcher(DOMAIN, allowed, False)
+        # Worst case for the loop: the last allowed URI, plus a miss
+        probes = [
+            f'https://{DOMAIN}/tenant-{size - 1:05d}/callback?next=/home',
+            f'https://{DOMAIN}/unknown/callback',
+        ]
+
+        for probe in probes:
+            assert matcher.is_allowed(probe) == legacy_is_redirect_uri_allowed(DOMAIN, allowed, False, probe)
+
+        legacy_time = timeit.timeit(
+            lambda: [legacy_is_redirect_uri_allowed(DOMAIN, allowed, False, p) for p in probes],
+            number=iterations
+        )
+        matcher_time = timeit.timeit(
+            lambda: [matcher.is_allowed(p) for p in probes],
+            number=iterations
+        )
+
+        per_call = iterations * len(probes)
+        legacy_us = legacy_time / per_call * 1e6
+        matcher_us = matcher_time / per_call * 1e6
+        print(f"{size:>12} | {legacy_us:>12.2f} | {matcher_us:>12.2f} | {legacy_us / matcher_us:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100, 500, 1000, 5000])
+    args = parser.parse_args()
+    run(args.sizes, args.iterations)
+
+
+if __name__ == '__main__':
+    main()
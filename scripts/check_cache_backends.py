@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+"""
+Check the cache aliases and the CacheAside helper against local backends
+
+Runs the same checks with CACHES built for the in-process 'locmem' backend
+and the 'file' backend (a stand-in for a shared Redis: a second cache
+handler, like another worker process, sees the same entries):
+  - every alias has its own key space
+  - CacheAside loads once, caches None, and invalidates per key, per
+    namespace and through external version counters
+  - login lockout counters live in the 'ratelimit' alias
+Exits non-zero on the first failure.
+
+Usage:
+    python scripts/check_cache_backends.py [--backend locmem|file|both]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'auth_service.settings')
+
+import django
+django.setup()
+
+from django.core.cache import CacheHandler, caches
+from django.test import override_settings
+
+from auth_service.cache import CACHE_ALIASES, CacheAside, build_caches
+
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f'FAIL: {message}')
+    print(f'  ok  {message}')
+
+
+def check_aliases():
+    for alias in CACHE_ALIASES:
+        caches[alias].set('probe', alias)
+    check(all(caches[alias].get('probe') == alias for alias in CACHE_ALIASES), 'aliases do not share keys')
+
+
+def check_cache_aside():
+    calls = []
+
+    def loader(*parts):
+        calls.append(parts)
+        return None if parts == ('none',) else f'value-{len(calls)}'
+
+    def version_keys(*parts):
+        return ['external:version']
+
+    helper = CacheAside('check', loader, alias='permissions', timeout=60, version_keys=version_keys)
+
+    first = helper.get('a', 1)
+    check(helper.get('a', 1) == first and len(calls) == 1, 'second get is a hit')
+
+    helper.get('none')
+    helper.get('none')
+    check(calls.count(('none',)) == 1, 'None results are cached')
+
+    helper.invalidate('a', 1)
+    check(helper.get('a', 1) != first, 'invalidate() reloads one key')
+
+    loads = len(calls)
+    helper.get('b')
+    helper.invalidate_all()
+    helper.get('b')
+    check(len(calls) == loads + 2, 'invalidate_all() reloads the namespace')
+
+    loads = len(calls)
+    caches['permissions'].set('external:version', 7)
+    helper.get('b')
+    check(len(calls) == loads + 1, 'bumping a version key reloads')
+
+    schema_2 = CacheAside('check', loader, alias='permissions', timeout=60, schema_version=2,
+                          version_keys=version_keys)
+    loads = len(calls)
+    schema_2.get('b')
+    check(len(calls) == loads + 1, 'a new schema version does not read old entries')
+    return helper
+
+
+def check_shared(helper):
+    other_worker = CacheHandler()
+    key = helper.key('b')
+    check(other_worker['permissions'].get(key) is not None, 'entries are visible to another worker')
+
+
+def check_ratelimit():
+    from apps.users.lockout import SlidingWindowCounter
+
+    counter = SlidingWindowCounter('check', 60, 'ratelimit')
+    results = [counter.hit('203.0.113.9', now=1000) for _ in range(6)]
+    check(results == [1, 2, 3, 4, 5, 6], 'sliding window counts every hit')
+
+    caches['ratelimit'].clear()
+    check(counter.count('203.0.113.9', now=1000) == 0, 'counters live in the ratelimit alias')
+
+
+def run(backend):
+    location = tempfile.mkdtemp(prefix='cache-check-') if backend == 'file' else ''
+    print(f'[{backend}]')
+    with override_settings(CACHES=build_caches(backend, location, 'check')):
+        for alias in CACHE_ALIASES:
+            caches[alias].clear()
+        check_aliases()
+        helper = check_cache_aside()
+        if backend == 'file':
+            check_shared(helper)
+        check_ratelimit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--backend', choices=['locmem', 'file', 'both'], default='both')
+    args = parser.parse_args()
+
+    for backend in ('locmem', 'file'):
+        if args.backend in (backend, 'both'):
+            run(backend)
+    print('all checks passed')
+
+
+if __name__ == '__main__':
+    main()
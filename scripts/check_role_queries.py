@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+Query-count regression check for the role list/detail endpoints
+
+Creates 1, 100 and 1000 roles (each with permissions and users) in a
+throwaway test database and asserts that GET /roles/, GET /roles/<id>/ and
+serializing the whole annotated queryset take the same number of queries
+regardless of the number of roles. Exits with status 1 on regression.
+
+Usage:
+    python scripts/check_role_queries.py [--sizes 1 100 1000]
+"""
+
+import argparse
+import os
+import sys
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'auth_service.settings')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from rest_framework.test import APIClient
+
+from apps.roles.models import Role, UserRole, Permission, RolePermission
+from apps.roles.serializers import RoleSerializer
+from apps.roles.views import with_role_summary
+from apps.users.models import User
+
+
+def populate(role_count, permissions, users):
+    Role.objects.all().delete()
+    roles = Role.objects.bulk_create([
+        Role(name=f'role_{i}', display_name=f'Role {i}') for i in range(role_count)
+    ])
+    RolePermission.objects.bulk_create([
+        RolePermission(role=role, permission=permission)
+        for role in roles for permission in permissions
+    ])
+    UserRole.objects.bulk_create([
+        UserRole(user=user, role=role) for role in roles for user in users
+    ])
+    return roles
+
+
+def count_queries(func):
+    with CaptureQueriesContext(connection) as context:
+        func()
+    return len(context.captured_queries)
+
+
+def measure(client, role_count, permissions, users):
+    roles = populate(role_count, permissions, users)
+
+    def list_roles():
+        response = client.get('/roles/')
+        assert response.status_code == 200, response.content
+        assert response.json()['count'] == role_count
+
+    def role_detail():
+        response = client.get(f'/roles/{roles[-1].id}/')
+        assert response.status_code == 200, response.content
+        assert response.json()['permission_count'] == len(permissions)
+
+    def serialize_all():
+        data = RoleSerializer(with_role_summary(Role.objects.all()), many=True).data
+        assert len(data) == role_count
+        assert all(len(item['permissions']) == len(permissions) for item in data)
+        assert all(item['user_count'] == len(users) for item in data)
+
+    return {
+        'list': count_queries(list_roles),
+        'detail': count_queries(role_detail),
+        'serialize_all': count_queries(serialize_all),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 100, 1000])
+    args = parser.parse_args()
+
+    setup_test_environment()
+    settings.ALLOWED_HOSTS = ['*']
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        admin = User.objects.create_user(username='query_check', email='query_check@example.com', password='x')
+        users = [admin] + [
+            User.objects.create_user(username=f'member_{i}', email=f'member_{i}@example.com', password='x')
+            for i in range(3)
+        ]
+        permissions = [
+            Permission.objects.create(
+                name=f'app.perm_{i}', display_name=f'Perm {i}', app_label='app', codename=f'perm_{i}'
+            )
+            for i in range(5)
+        ]
+
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        results = {}
+        for size in args.sizes:
+            results[size] = measure(client, size, permissions, users)
+            print(f'{size:>6} roles: ' + ', '.join(f'{name}={count}' for name, count in results[size].items()))
+
+        failed = False
+        for name in results[args.sizes[0]]:
+            counts = {results[size][name] for size in args.sizes}
+            if len(counts) != 1:
+                print(f'❌ {name}: query count depends on role count {sorted(counts)}')
+                failed = True
+
+        if failed:
+            sys.exit(1)
+        print('✅ Query counts are constant')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -166,6 +166,8 @@ sudo -u "$SERVICE_USER" tee "$PROJECT_DIR/.env" > /dev/null << EOF
 SECRET_KEY=$(python3 -c "import secrets; print(secrets.token_urlsafe(50))")
 DEBUG=False
 ALLOWED_HOSTS=$DOMAIN,www.$DOMAIN,87.248.150.86
+# nginx in front appends the client address to X-Forwarded-For
+TRUSTED_PROXY_COUNT=1
 
 # Microservice Configuration
 AUTH_SERVICE_DOMAIN=$DOMAIN
@@ -202,6 +204,9 @@ X_FRAME_OPTIONS=DENY
 
 # Redis Configuration
 REDIS_URL=redis://localhost:6379/0
+# Caches, rate limits and login lockout shared by all gunicorn workers
+CACHE_BACKEND=redis
+CACHE_LOCATION=redis://localhost:6379/1
 
 # Logging
 LOG_LEVEL=WARNING
@@ -505,6 +510,20 @@ EOF
 
 print_success "Logrotate تنظیم شد"
 
+# =============================================================================
+# کارهای زمان‌بندی‌شده
+# =============================================================================
+
+print_status "تنظیمات Cron..."
+
+# SSO stats rollups for the admin dashboard, and the retention sweep
+tee /etc/cron.d/$SERVICE_NAME > /dev/null << EOF
+*/5 * * * * $SERVICE_USER cd $PROJECT_DIR && venv/bin/python manage.py rollup_sso_stats >> logs/cron.log 2>&1
+17 * * * * $SERVICE_USER cd $PROJECT_DIR && venv/bin/python manage.py sweep_sso >> logs/cron.log 2>&1
+EOF
+
+print_success "Cron تنظیم شد"
+
 # =============================================================================
 # خلاصه Deploy
 # =============================================================================
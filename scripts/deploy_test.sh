@@ -142,6 +142,8 @@ sudo -u "$SERVICE_USER" tee "$PROJECT_DIR/.env" > /dev/null << EOF
 SECRET_KEY=$(python3 -c "import secrets; print(secrets.token_urlsafe(50))")
 DEBUG=False
 ALLOWED_HOSTS=$DOMAIN,www.$DOMAIN,87.248.150.86
+# nginx in front appends the client address to X-Forwarded-For
+TRUSTED_PROXY_COUNT=1
 
 # Microservice Configuration
 AUTH_SERVICE_DOMAIN=$DOMAIN
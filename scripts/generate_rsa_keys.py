@@ -4,6 +4,7 @@ Script to generate RSA keys for JWT signing
 """
 
 import os
+import sys
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.backends import default_backend
@@ -11,9 +12,11 @@ from cryptography.hazmat.backends import default_backend
 def generate_rsa_keys():
     """Generate RSA private and public keys for JWT signing."""
     
-    # Create keys directory if it doesn't exist
-    keys_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'keys')
-    os.makedirs(keys_dir, exist_ok=True)
+    # Keys live outside the source tree, in the directory JWT_KEYS_DIR names
+    keys_dir = os.environ.get('JWT_KEYS_DIR')
+    if not keys_dir:
+        sys.exit("Set JWT_KEYS_DIR to a directory outside the source tree first")
+    os.makedirs(keys_dir, mode=0o700, exist_ok=True)
     
     # Generate private key
     private_key = rsa.generate_private_key(
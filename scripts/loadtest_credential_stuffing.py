@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+"""
+Load test: replay a credential-stuffing attack against UserLoginSerializer
+
+Seeds --users accounts, then --threads workers replay --attempts logins from
+--ips client addresses: mostly existing usernames with leaked (wrong)
+passwords, some unknown usernames, and a trickle of real users logging in
+with the right password. Each run is repeated with failures counted on the
+users row (the previous behaviour, one UPDATE per failed attempt) and with
+apps.users.lockout (sliding windows in the cache), and reports throughput,
+writes to the users table, database errors, locks started, attempts refused
+by the per-IP limit and how many real logins got through.
+
+Passwords use the MD5 hasher so the numbers measure the lockout, not PBKDF2.
+
+Usage:
+    python scripts/loadtest_credential_stuffing.py [--attempts 5000] [--users 2000]
+        [--ips 20] [--threads 4]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'auth_service.settings')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, connection, connections
+from django.db.models import Case, F, Value, When
+from django.test import RequestFactory
+from django.utils import timezone
+
+from apps.users import lockout
+from apps.users.models import User
+from apps.users.serializers import UserLoginSerializer
+
+PASSWORD = 'real-password'
+
+
+class RowLockout(lockout.LoginLockout):
+    """
+    The previous behaviour: every failure is a conditional UPDATE of the
+    users row, every success with a non-zero counter another one
+    """
+
+    def ip_blocked(self, ip):
+        return False
+
+    def record_failure(self, user, ip=None):
+        if user is None:
+            return False
+        locked_until = timezone.now() + timezone.timedelta(minutes=self.lock_minutes)
+        User.objects.filter(pk=user.pk).update(
+            failed_login_attempts=F('failed_login_attempts') + 1,
+            locked_until=Case(
+                When(failed_login_attempts__gte=self.account_limit - 1, then=Value(locked_until)),
+                default=F('locked_until'),
+            ),
+        )
+        return user.failed_login_attempts + 1 >= self.account_limit
+
+    def record_success(self, user):
+        if user.failed_login_attempts:
+            User.objects.filter(pk=user.pk).update(failed_login_attempts=0)
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.errors = 0
+        self.ip_refused = 0
+        self.real_ok = 0
+        self.real_total = 0
+
+    def add(self, **counts):
+        with self.lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+
+def build_attempts(count, users, ips, seed=23):
+    """
+    (login, password, ip, is_real_user) tuples for the attack
+    """
+    rng = random.Random(seed)
+    attacker_ips = [f'198.51.{i // 250}.{i % 250 + 1}' for i in range(ips)]
+    attempts = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.02:
+            # A real user on their own address
+            attempts.append((f'user{rng.randrange(users)}', PASSWORD, f'203.0.113.{rng.randrange(1, 250)}', True))
+        elif roll < 0.12:
+            attempts.append((f'ghost{rng.randrange(10 * users)}', 'leaked', rng.choice(attacker_ips), False))
+        else:
+            attempts.append((f'user{rng.randrange(users)}', f'leaked{rng.randrange(1000)}', rng.choice(attacker_ips), False))
+    return attempts
+
+
+def run(mode, attempts, threads):
+    lockout._lockout = RowLockout() if mode == 'row' else lockout.LoginLockout(counter='cache')
+    caches[lockout._lockout.by_ip.cache_alias].clear()
+    User.objects.update(failed_login_attempts=0, locked_until=None)
+
+    stats = Stats()
+    factory = RequestFactory()
+    chunks = [attempts[i::threads] for i in range(threads)]
+
+    def count_writes(execute, sql, params, many, context):
+        if sql.startswith('UPDATE "users"'):
+            stats.add(writes=1)
+        return execute(sql, params, many, context)
+
+    def worker(chunk):
+        with connection.execute_wrapper(count_writes):
+            for login, password, ip, real in chunk:
+                request = factory.post('/api/auth/login/', REMOTE_ADDR=ip)
+                serializer = UserLoginSerializer(data={'username': login, 'password': password},
+                                                 context={'request': request})
+                try:
+                    valid = serializer.is_valid()
+                except DatabaseError:
+                    stats.add(errors=1)
+                    continue
+                if real:
+                    stats.add(real_total=1, real_ok=int(valid))
+                elif not valid and 'آدرس' in str(serializer.errors.get('non_field_errors', '')):
+                    stats.add(ip_refused=1)
+        connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(worker, chunks))
+    elapsed = time.perf_counter() - started
+
+    locked = User.objects.filter(locked_until__gt=timezone.now()).count()
+    print(f"{mode:<6} {len(attempts) / elapsed:9.0f} {stats.writes:>8} {stats.errors:>7} {locked:>7} "
+          f"{stats.ip_refused:>11} {stats.real_ok:>5}/{stats.real_total}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--attempts', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--ips', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    if connection.vendor == 'sqlite':
+        settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = os.path.join(
+            tempfile.mkdtemp(), 'stuffing.sqlite3'
+        )
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        # Hash the shared password once for every account
+        seed_user = User(username='seed')
+        seed_user.set_password(PASSWORD)
+        User.objects.bulk_create([
+            User(username=f'user{i}', email=f'user{i}@example.com', password=seed_user.password)
+            for i in range(args.users)
+        ], batch_size=1000)
+        attempts = build_attempts(args.attempts, args.users, args.ips)
+
+        print(f"{args.attempts} attempts, {args.users} accounts, {args.ips} attacker IPs, "
+              f"{args.threads} threads, {connection.vendor}, cache {settings.CACHE_BACKEND}\n")
+        print(f"{'mode':<6} {'logins/s':>9} {'writes':>8} {'errors':>7} {'locked':>7} "
+              f"{'ip refused':>11} {'real logins':>11}")
+        for mode in ('row', 'cache'):
+            run(mode, attempts, args.threads)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
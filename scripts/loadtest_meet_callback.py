@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+"""
+Load test: sync (WSGI) vs async (ASGI) meet callback against a slow meets API
+
+Starts a fake meets access API that answers after --delay seconds, then
+drives the meet callback flow in-process:
+  - wsgi: /callback/ through Django's WSGI handler, --workers threads
+          (one thread = one sync worker blocked for the whole upstream call)
+  - asgi: /callback/async/ through Django's ASGI handler in a single event
+          loop (= one ASGI worker) with --concurrency requests in flight
+Access caching is disabled so every request hits the upstream.
+
+Usage:
+    python scripts/loadtest_meet_callback.py [--requests 200] [--delay 0.5]
+        [--workers 1] [--concurrency 100] [--mode both|wsgi|asgi]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'auth_service.settings')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment
+
+ROOM = 'loadtest-room'
+
+
+def start_slow_upstream(delay):
+    """
+    Minimal keep-alive HTTP/1.1 server returning an 'ongoing' access response
+    after `delay` seconds; returns its URL
+    """
+    body = json.dumps({
+        'success': True,
+        'data': {
+            'room_name': ROOM, 'has_access': True, 'status': 'ongoing',
+            'user_type': 'participant', 'is_organizer': False,
+            'start_time': '2000-01-01T00:00:00+00:00', 'end_time': '2100-01-01T00:00:00+00:00',
+        },
+    }).encode()
+    response = (
+        b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+        b'Content-Length: ' + str(len(body)).encode() + b'\r\n\r\n' + body
+    )
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                headers = await reader.readuntil(b'\r\n\r\n')
+                if not headers:
+                    break
+                await asyncio.sleep(delay)
+                writer.write(response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    ready = threading.Event()
+    address = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(asyncio.start_server(handle, '127.0.0.1', 0, backlog=1024))
+        address['port'] = server.sockets[0].getsockname()[1]
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, name='slow-upstream', daemon=True).start()
+    ready.wait()
+    return f"http://127.0.0.1:{address['port']}/api/meets/access/"
+
+
+def callback_path(path):
+    return f'{path}?client_id=meet_avinoo&redirect_uri=https://meet.avinoo.ir/{ROOM}'
+
+
+def report(name, latencies, errors, elapsed):
+    latencies.sort()
+    count = len(latencies)
+    p50 = latencies[count // 2] if count else 0
+    p95 = latencies[int(count * 0.95) - 1] if count else 0
+    print(f'{name:<5} {count / elapsed:8.1f} req/s   p50 {p50 * 1000:7.1f} ms   '
+          f'p95 {p95 * 1000:7.1f} ms   errors {errors}   ({count} in {elapsed:.2f}s)')
+
+
+def run_wsgi(user, total, workers):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    remaining = [total]
+
+    def worker():
+        client = Client()
+        client.force_login(user)
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            started = time.perf_counter()
+            response = client.get(callback_path('/callback/'))
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code != 302:
+                    errors[0] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report('wsgi', latencies, errors[0], time.perf_counter() - started)
+
+
+async def run_asgi(user, total, concurrency):
+    client = AsyncClient()
+    await client.aforce_login(user)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], [0]
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(callback_path('/callback/async/'))
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 302:
+                errors[0] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    report('asgi', latencies, errors[0], time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--delay', type=float, default=0.5, help='upstream response delay (seconds)')
+    parser.add_argument('--workers', type=int, default=1, help='sync worker threads for the WSGI run')
+    parser.add_argument('--concurrency', type=int, default=100, help='in-flight requests for the ASGI run')
+    parser.add_argument('--mode', choices=['both', 'wsgi', 'asgi'], default='both')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    settings.MEET_EXTERNAL_API_URL = start_slow_upstream(args.delay)
+    settings.MEET_ACCESS_CACHE_TTL = 0
+    settings.MEET_ACCESS_STALE_TTL = 0
+    settings.MEET_API_TIMEOUT = args.delay + 10
+    settings.MEET_API_DEADLINE = args.delay + 10
+    settings.MEET_API_ASYNC_POOL_SIZE = max(args.concurrency, 1)
+    settings.ALLOWED_HOSTS = ['*']
+    settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = os.path.join(
+        tempfile.mkdtemp(), 'loadtest.sqlite3'
+    )
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        from apps.users.models import User
+        from sso.models import SSOClient
+
+        user = User.objects.create_user(username='loadtest', email='loadtest@example.com', password='x')
+        SSOClient.objects.create(
+            name='Meet', domain='meet.avinoo.ir', client_id='meet_avinoo',
+            client_secret='loadtest', redirect_uri='https://meet.avinoo.ir/', allow_any_path=True
+        )
+
+        print(f'{args.requests} requests, upstream delay {args.delay}s, '
+              f'wsgi workers {args.workers}, asgi concurrency {args.concurrency}')
+        if args.mode in ('both', 'wsgi'):
+            run_wsgi(user, args.requests, args.workers)
+        if args.mode in ('both', 'asgi'):
+            asyncio.run(run_asgi(user, args.requests, args.concurrency))
+    finally:
+        from sso.audit import get_audit_writer
+        get_audit_writer().close()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
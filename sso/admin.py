@@ -10,6 +10,9 @@ from django.shortcuts import render
 from django.http import HttpResponseRedirect
 from django.contrib import messages
 from .models import SSOClient, SSOSession, SSOAuditLog
+from .registry import client_registry
+from .stats import audit_stats, dashboard_stats, session_stats
+from .utils import cleanup_expired_sessions as sweep_expired_sessions
 
 
 @admin.register(SSOClient)
@@ -31,6 +34,10 @@ class SSOClientAdmin(admin.ModelAdmin):
             'fields': ('redirect_uri', 'allowed_redirect_uris', 'allow_any_path'),
             'description': 'تنظیمات مربوط به آدرس‌های بازگشت مجاز'
         }),
+        ('توکن', {
+            'fields': ('include_authorization_claims',),
+            'description': 'درج نقش‌ها و بیت‌مپ مجوزهای کاربر در توکن‌های صادرشده برای این کلاینت'
+        }),
         ('وضعیت', {
             'fields': ('is_active',)
         }),
@@ -55,12 +62,14 @@ class SSOClientAdmin(admin.ModelAdmin):
     def activate_clients(self, request, queryset):
         """فعال کردن کلاینت‌های انتخاب شده"""
         updated = queryset.update(is_active=True)
+        client_registry.invalidate()
         self.message_user(request, f'{updated} کلاینت فعال شد.')
     activate_clients.short_description = 'فعال کردن کلاینت‌های انتخاب شده'
     
     def deactivate_clients(self, request, queryset):
         """غیرفعال کردن کلاینت‌های انتخاب شده"""
         updated = queryset.update(is_active=False)
+        client_registry.invalidate()
         self.message_user(request, f'{updated} کلاینت غیرفعال شد.')
     deactivate_clients.short_description = 'غیرفعال کردن کلاینت‌های انتخاب شده'
     
@@ -87,28 +96,24 @@ class SSOClientAdmin(admin.ModelAdmin):
         try:
             client = SSOClient.objects.get(id=client_id)
             
-            # آمار جلسات این کلاینت
+            # آمار جلسات و لاگ‌های این کلاینت (لاگ‌ها از جدول آمار ساعتی)
             sessions = SSOSession.objects.filter(client=client)
-            active_sessions = sessions.filter(expires_at__gt=timezone.now())
-            expired_sessions = sessions.filter(expires_at__lt=timezone.now())
-            
-            # آمار لاگ‌های این کلاینت
             logs = SSOAuditLog.objects.filter(client=client)
-            login_logs = logs.filter(action='login')
-            logout_logs = logs.filter(action='logout')
+            session_counts = session_stats(client=client)
+            log_counts = audit_stats(client=client)
             
             context = {
                 'title': f'جزئیات کلاینت: {client.name}',
                 'client': client,
                 'sessions': {
-                    'total': sessions.count(),
-                    'active': active_sessions.count(),
-                    'expired': expired_sessions.count(),
+                    'total': session_counts['total_sessions'],
+                    'active': session_counts['active_sessions'],
+                    'expired': session_counts['expired_sessions'],
                 },
                 'logs': {
-                    'total': logs.count(),
-                    'login': login_logs.count(),
-                    'logout': logout_logs.count(),
+                    'total': log_counts['total_logs'],
+                    'login': log_counts['login_logs'],
+                    'logout': log_counts['logout_logs'],
                 },
                 'recent_sessions': sessions.order_by('-created_at')[:10],
                 'recent_logs': logs.order_by('-created_at')[:10],
@@ -306,56 +311,10 @@ class SSOAuditLogAdmin(admin.ModelAdmin):
 # Admin Actions برای مدیریت کلی SSO
 @admin.action(description='نمایش آمار SSO')
 def show_sso_stats(modeladmin, request, queryset):
-    """نمایش آمار کلی SSO"""
-    from django.db.models import Count
-    from datetime import timedelta
-    
-    now = timezone.now()
-    last_24h = now - timedelta(hours=24)
-    last_7d = now - timedelta(days=7)
-    last_30d = now - timedelta(days=30)
-    
-    # آمار کلاینت‌ها
-    total_clients = SSOClient.objects.count()
-    active_clients = SSOClient.objects.filter(is_active=True).count()
-    
-    # آمار جلسات
-    total_sessions = SSOSession.objects.count()
-    active_sessions = SSOSession.objects.filter(expires_at__gt=now).count()
-    expired_sessions = SSOSession.objects.filter(expires_at__lt=now).count()
-    
-    # آمار لاگ‌ها
-    total_logs = SSOAuditLog.objects.count()
-    logs_24h = SSOAuditLog.objects.filter(created_at__gte=last_24h).count()
-    logs_7d = SSOAuditLog.objects.filter(created_at__gte=last_7d).count()
-    logs_30d = SSOAuditLog.objects.filter(created_at__gte=last_30d).count()
-    
-    # آمار فعالیت‌ها
-    login_logs = SSOAuditLog.objects.filter(action='login').count()
-    logout_logs = SSOAuditLog.objects.filter(action='logout').count()
-    token_validations = SSOAuditLog.objects.filter(action='token_validated').count()
-    
-    # آمار کاربران فعال
-    active_users_24h = SSOAuditLog.objects.filter(
-        created_at__gte=last_24h,
-        action='login'
-    ).values('user').distinct().count()
-    
+    """نمایش آمار کلی SSO (لاگ‌ها از جدول آمار ساعتی به‌علاوه لاگ‌های پس از آخرین rollup_sso_stats)"""
     context = {
         'title': 'آمار SSO',
-        'total_clients': total_clients,
-        'active_clients': active_clients,
-        'total_sessions': total_sessions,
-        'active_sessions': active_sessions,
-        'expired_sessions': expired_sessions,
-        'total_logs': total_logs,
-        'logs_24h': logs_24h,
-        'logs_7d': logs_7d,
-        'logs_30d': logs_30d,
-        'login_logs': login_logs,
-        'logout_logs': logout_logs,
-        'token_validations': token_validations,
-        'active_users_24h': active_users_24h,
+        **dashboard_stats(),
     }
     
     return render(request, 'admin/sso_stats.html', context)
@@ -371,10 +330,7 @@ SSOAuditLogAdmin.actions = SSOAuditLogAdmin.actions + [show_sso_stats]
 @admin.action(description='پاک کردن جلسات منقضی شده')
 def cleanup_expired_sessions(modeladmin, request, queryset):
     """پاک کردن جلسات منقضی شده"""
-    now = timezone.now()
-    expired_sessions = SSOSession.objects.filter(expires_at__lt=now)
-    count = expired_sessions.count()
-    expired_sessions.delete()
+    count = sweep_expired_sessions()
     
     messages.success(request, f'{count} جلسه منقضی شده پاک شد.')
     return HttpResponseRedirect(request.get_full_path())
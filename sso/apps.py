@@ -5,3 +5,7 @@ class SsoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sso'
     verbose_name = 'Single Sign-On Service'
+
+    def ready(self):
+        """Register signal handlers"""
+        from . import signals  # noqa: F401
@@ -0,0 +1,186 @@
+"""
+Buffered, background writer for SSOAuditLog entries
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import SSOAuditLog
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_DROP = 'drop'
+OVERFLOW_BLOCK = 'block'
+
+
+class BufferedAuditWriter:
+    """
+    Queue audit entries in memory and write them with bulk_create from a
+    background thread, so requests never wait on an audit INSERT.
+
+    A batch is flushed when batch_size entries are waiting or flush_interval
+    seconds have passed. The queue is bounded: when it is full, the 'drop'
+    policy discards the new entry immediately, while 'block' applies
+    backpressure by waiting up to block_timeout seconds before dropping.
+    Pending entries are flushed on interpreter shutdown.
+
+    Entries get their created_at when they are written, so it may lag the
+    request by up to flush_interval.
+    """
+
+    def __init__(self, batch_size=100, flush_interval=1.0, max_queue_size=10000,
+                 overflow_policy=OVERFLOW_DROP, block_timeout=0.05):
+        if overflow_policy not in (OVERFLOW_DROP, OVERFLOW_BLOCK):
+            raise ValueError(f"Unknown audit overflow policy: {overflow_policy}")
+
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+        self.enqueued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def _ensure_started(self):
+        # Start lazily, and again in a forked worker whose parent owned the thread
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='sso-audit-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, entry):
+        """
+        Queue an unsaved SSOAuditLog. Returns False if the entry was dropped.
+        """
+        self._ensure_started()
+        try:
+            if self.overflow_policy == OVERFLOW_BLOCK:
+                self._queue.put(entry, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(entry)
+        except queue.Full:
+            self._count('dropped')
+            # Warn on the first drop and then periodically, not once per entry
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"SSO audit queue full, {self.dropped} entries dropped so far")
+            return False
+
+        self._count('enqueued')
+        return True
+
+    def submit_many(self, entries):
+        return sum(1 for entry in entries if self.submit(entry))
+
+    def _collect_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        with self._write_lock:
+            try:
+                close_old_connections()
+                SSOAuditLog.objects.bulk_create(batch, batch_size=self.batch_size)
+                self._count('flushed', len(batch))
+            except Exception as e:
+                self._count('failed', len(batch))
+                logger.error(f"Failed to write {len(batch)} SSO audit entries: {str(e)}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._write(batch)
+
+    def flush(self):
+        """
+        Synchronously write everything that is currently queued
+        """
+        while True:
+            batch = []
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if not batch:
+                return
+            self._write(batch)
+
+    def close(self, timeout=5.0):
+        """
+        Stop the background thread and flush pending entries
+        """
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout)
+        self.flush()
+        logger.info(f"SSO audit writer closed: {self.stats()}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enqueued': self.enqueued,
+                'flushed': self.flushed,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'pending': self._queue.qsize(),
+            }
+
+
+_audit_writer = None
+_audit_writer_lock = threading.Lock()
+
+
+def get_audit_writer():
+    """
+    Return the process-wide audit writer configured from settings
+    """
+    global _audit_writer
+    if _audit_writer is None:
+        with _audit_writer_lock:
+            if _audit_writer is None:
+                _audit_writer = BufferedAuditWriter(
+                    batch_size=getattr(settings, 'SSO_AUDIT_BATCH_SIZE', 100),
+                    flush_interval=getattr(settings, 'SSO_AUDIT_FLUSH_INTERVAL', 1.0),
+                    max_queue_size=getattr(settings, 'SSO_AUDIT_MAX_QUEUE_SIZE', 10000),
+                    overflow_policy=getattr(settings, 'SSO_AUDIT_OVERFLOW_POLICY', OVERFLOW_DROP),
+                    block_timeout=getattr(settings, 'SSO_AUDIT_BLOCK_TIMEOUT', 0.05),
+                )
+                atexit.register(_audit_writer.close)
+    return _audit_writer
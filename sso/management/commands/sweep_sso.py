@@ -0,0 +1,59 @@
+"""
+Delete expired SSO sessions and audit rows past their retention.
+
+Rows are removed in primary-key batches (SSO_SWEEP_BATCH_SIZE) with a short
+pause between batches, so the sweep never holds long locks. Audit retention
+is SSO_AUDIT_RETENTION_DAYS, overridden per action by
+SSO_AUDIT_RETENTION_BY_ACTION (e.g. "token_validated:7,login:180"). Audit
+rows are rolled up into the hourly stats before they are deleted, and the
+rollups themselves are kept for SSO_STATS_ROLLUP_RETENTION_DAYS.
+
+Run it from cron, or keep it running with --loop:
+    python manage.py sweep_sso
+    python manage.py sweep_sso --loop 300
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from sso.retention import sweep_all
+
+
+class Command(BaseCommand):
+    help = 'Delete expired SSO sessions and aged SSO audit rows in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Rows per delete (default SSO_SWEEP_BATCH_SIZE)')
+        parser.add_argument('--pause', type=float, help='Seconds between batches (default SSO_SWEEP_PAUSE)')
+        parser.add_argument('--dry-run', action='store_true', help='Count matching rows without deleting')
+        parser.add_argument('--sessions-only', action='store_true')
+        parser.add_argument('--audit-only', action='store_true')
+        parser.add_argument('--loop', type=float, metavar='SECONDS', help='Repeat every SECONDS until stopped')
+
+    def handle(self, *args, **options):
+        while True:
+            self.run_once(options)
+            if not options['loop']:
+                return
+            time.sleep(options['loop'])
+
+    def run_once(self, options):
+        results = sweep_all(
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            dry_run=options['dry_run'],
+            sessions=not options['audit_only'],
+            audit=not options['sessions_only'],
+            rollups=not (options['sessions_only'] or options['audit_only']),
+        )
+
+        verb = 'would delete' if options['dry_run'] else 'deleted'
+        total = 0
+        for result in results:
+            total += result.deleted
+            self.stdout.write(
+                f'{result.name:<24} {verb} {result.deleted:>8} rows in {result.batches:>4} batches, '
+                f'{result.seconds:6.2f}s ({result.rate:,.0f} rows/s)'
+            )
+        self.stdout.write(self.style.SUCCESS(f'{verb.capitalize()} {total} rows'))
@@ -0,0 +1,107 @@
+"""
+Compiled redirect URI matching for SSO clients
+"""
+
+import re
+
+_END = ''
+
+# scheme "://" netloc, following the scheme/netloc rules of urllib.parse.urlsplit
+_NETLOC_RE = re.compile(r'(?:[A-Za-z][A-Za-z0-9+.-]*:)?//([^/?#]*)')
+
+
+def extract_netloc(uri):
+    """
+    Return the lower-cased network location of an absolute URI.
+    Equivalent to urlparse(uri).netloc.lower() for scheme://host/... URIs
+    without building a ParseResult.
+    """
+    match = _NETLOC_RE.match(uri)
+    return match.group(1).lower() if match else ''
+
+
+def _compress(node):
+    """
+    Turn a character trie into a radix trie of {first_char: (label, terminal, child)}
+    """
+    edges = {}
+    for char, child in node.items():
+        if char == _END:
+            continue
+        label = char
+        # Merge single-child chains into one edge label
+        while _END not in child and len(child) == 1:
+            (next_char, next_child), = child.items()
+            label += next_char
+            child = next_child
+        edges[char] = (label, _END in child, _compress(child))
+    return edges
+
+
+class RedirectURIMatcher:
+    """
+    Precompiled form of an SSOClient's redirect rules.
+
+    Built once per client: the domain check becomes two string comparisons
+    and the allowed_redirect_uris prefix scan becomes a walk over a
+    compressed prefix trie, so a lookup costs O(len(redirect_uri)) no
+    matter how many allowed URIs the client has.
+    """
+
+    __slots__ = ('domain', 'domain_suffix', 'allow_any_path', 'match_all', '_edges')
+
+    def __init__(self, domain, allowed_redirect_uris=(), allow_any_path=False):
+        self.domain = (domain or '').lower()
+        self.domain_suffix = f'.{self.domain}'
+        self.allow_any_path = allow_any_path
+
+        trie = {}
+        for allowed_uri in allowed_redirect_uris or ():
+            node = trie
+            for char in allowed_uri:
+                node = node.setdefault(char, {})
+            node[_END] = True
+
+        # An empty allowed URI is a prefix of everything
+        self.match_all = _END in trie
+        self._edges = _compress(trie)
+
+    @classmethod
+    def for_client(cls, client):
+        return cls(client.domain, client.allowed_redirect_uris, client.allow_any_path)
+
+    def domain_matches(self, redirect_uri):
+        netloc = extract_netloc(redirect_uri)
+        return netloc == self.domain or netloc.endswith(self.domain_suffix)
+
+    def path_matches(self, redirect_uri):
+        """
+        True if redirect_uri starts with any allowed URI (exact match included)
+        """
+        if self.match_all:
+            return True
+
+        edges = self._edges
+        position = 0
+        length = len(redirect_uri)
+        while position < length:
+            edge = edges.get(redirect_uri[position])
+            if edge is None:
+                return False
+            label, terminal, edges = edge
+            if not redirect_uri.startswith(label, position):
+                return False
+            if terminal:
+                return True
+            position += len(label)
+        return False
+
+    def is_allowed(self, redirect_uri):
+        try:
+            if not self.domain_matches(redirect_uri):
+                return False
+            if self.allow_any_path:
+                return True
+            return self.path_matches(redirect_uri)
+        except Exception:
+            return False
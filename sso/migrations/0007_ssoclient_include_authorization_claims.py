@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 11:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sso', '0006_alter_ssoclient_redirect_uri'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ssoclient',
+            name='include_authorization_claims',
+            field=models.BooleanField(default=False, help_text='اگر فعال باشد، نام نقش\u200cهای فعال کاربر و بیت\u200cمپ مجوزها (بر اساس کاتالوگ مجوزها) در توکن درج می\u200cشود', verbose_name='درج نقش\u200cها و مجوزها در توکن'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-17 11:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sso', '0007_ssoclient_include_authorization_claims'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ssoauditlog',
+            index=models.Index(fields=['-created_at'], name='sso_audit_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ssoauditlog',
+            index=models.Index(fields=['action', 'created_at'], name='sso_audit_action_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ssoauditlog',
+            index=models.Index(fields=['client', 'action', 'created_at'], name='sso_audit_client_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ssosession',
+            index=models.Index(condition=models.Q(('is_used', False)), fields=['client', 'state', 'expires_at'], name='sso_session_unused_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ssosession',
+            index=models.Index(fields=['expires_at'], name='sso_session_expires_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ssosession',
+            index=models.Index(fields=['-created_at'], name='sso_session_created_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-17 11:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sso', '0008_sso_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SSOAuditRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(verbose_name='ساعت')),
+                ('action', models.CharField(choices=[('login', 'ورود'), ('logout', 'خروج'), ('token_issued', 'صدور توکن'), ('token_validated', 'اعتبارسنجی توکن'), ('redirect', 'انتقال'), ('error', 'خطا')], max_length=20, verbose_name='عمل')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='تعداد')),
+                ('users', models.BinaryField(blank=True, null=True, verbose_name='کاربران یکتا')),
+                ('client', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='sso.ssoclient', verbose_name='کلاینت')),
+            ],
+            options={
+                'verbose_name': 'آمار ساعتی SSO',
+                'verbose_name_plural': 'آمار ساعتی SSO',
+                'ordering': ['-hour'],
+                'indexes': [models.Index(fields=['hour', 'action'], name='sso_rollup_hour_idx'), models.Index(fields=['client', 'hour'], name='sso_rollup_client_idx')],
+            },
+        ),
+    ]
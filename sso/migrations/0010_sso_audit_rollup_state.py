@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-17 12:43
+
+from django.db import migrations, models
+
+
+def create_state_row(apps, schema_editor):
+    """The row rollup runs lock; it must exist before any of them starts"""
+    SSOAuditRollupState = apps.get_model('sso', 'SSOAuditRollupState')
+    SSOAuditRollupState.objects.using(schema_editor.connection.alias).get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sso', '0009_sso_audit_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SSOAuditRollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rolled_up_at', models.DateTimeField(blank=True, null=True, verbose_name='زمان آخرین تجمیع')),
+            ],
+            options={
+                'verbose_name': 'وضعیت آمار ساعتی SSO',
+                'verbose_name_plural': 'وضعیت آمار ساعتی SSO',
+            },
+        ),
+        migrations.RunPython(create_state_row, migrations.RunPython.noop),
+    ]
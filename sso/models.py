@@ -5,8 +5,11 @@ SSO Models for microservice authentication
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from django.utils.functional import cached_property
 import uuid
 
+from .matchers import RedirectURIMatcher
+
 User = get_user_model()
 
 
@@ -31,6 +34,11 @@ class SSOClient(models.Model):
         verbose_name="اجازه هر مسیر",
         help_text="اگر فعال باشد، هر مسیری روی دامنه این کلاینت مجاز است"
     )
+    include_authorization_claims = models.BooleanField(
+        default=False,
+        verbose_name="درج نقش‌ها و مجوزها در توکن",
+        help_text="اگر فعال باشد، نام نقش‌های فعال کاربر و بیت‌مپ مجوزها (بر اساس کاتالوگ مجوزها) در توکن درج می‌شود"
+    )
     is_active = models.BooleanField(default=True, verbose_name="فعال")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاریخ ایجاد")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="تاریخ به‌روزرسانی")
@@ -43,47 +51,29 @@ class SSOClient(models.Model):
     def __str__(self):
         return f"{self.name} ({self.domain})"
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Redirect rules may have changed; rebuild the matcher on next use
+        self.__dict__.pop('redirect_matcher', None)
+    
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.__dict__.pop('redirect_matcher', None)
+    
+    @cached_property
+    def redirect_matcher(self):
+        """
+        Compiled redirect rules (domain suffix + prefix trie) for this client
+        """
+        return RedirectURIMatcher.for_client(self)
+    
     def is_redirect_uri_allowed(self, redirect_uri):
         """
         Check if a redirect URI is allowed for this client
         If allow_any_path=True: accepts ANY path on the domain
         If allow_any_path=False: uses exact match or allowed_redirect_uris
         """
-        from urllib.parse import urlparse
-        
-        try:
-            # Parse the redirect URI
-            parsed_uri = urlparse(redirect_uri)
-            redirect_domain = parsed_uri.netloc.lower()
-            client_domain = self.domain.lower()
-            
-            # Check if domains match (exact or subdomain)
-            domain_matches = (
-                redirect_domain == client_domain or 
-                redirect_domain.endswith(f'.{client_domain}')
-            )
-            
-            if not domain_matches:
-                return False
-            
-            # If allow_any_path is enabled, accept any path on the domain
-            if self.allow_any_path:
-                return True
-            
-            # For strict validation, check allowed_redirect_uris
-            # Check exact match in allowed_redirect_uris
-            if redirect_uri in self.allowed_redirect_uris:
-                return True
-            
-            # Check if redirect_uri starts with any allowed pattern
-            for allowed_uri in self.allowed_redirect_uris:
-                if redirect_uri.startswith(allowed_uri):
-                    return True
-            
-            return False
-            
-        except Exception:
-            return False
+        return self.redirect_matcher.is_allowed(redirect_uri)
 
 
 class SSOSession(models.Model):
@@ -103,6 +93,17 @@ class SSOSession(models.Model):
         verbose_name = "جلسه SSO"
         verbose_name_plural = "جلسات SSO"
         ordering = ['-created_at']
+        indexes = [
+            # Redeeming a state: (client, state) among unused sessions only
+            models.Index(
+                fields=['client', 'state', 'expires_at'],
+                condition=models.Q(is_used=False),
+                name='sso_session_unused_idx',
+            ),
+            # Expiry sweep and active/expired counts
+            models.Index(fields=['expires_at'], name='sso_session_expires_idx'),
+            models.Index(fields=['-created_at'], name='sso_session_created_idx'),
+        ]
     
     def __str__(self):
         return f"SSO Session: {self.user.username} -> {self.client.name}"
@@ -137,6 +138,54 @@ class SSOAuditLog(models.Model):
         verbose_name = "لاگ حسابرسی SSO"
         verbose_name_plural = "لاگ‌های حسابرسی SSO"
         ordering = ['-created_at']
+        indexes = [
+            # Admin list, date hierarchy and recent-activity counts
+            models.Index(fields=['-created_at'], name='sso_audit_created_idx'),
+            # Per-action counts and per-action retention
+            models.Index(fields=['action', 'created_at'], name='sso_audit_action_idx'),
+            # Per-client admin pages and filters
+            models.Index(fields=['client', 'action', 'created_at'], name='sso_audit_client_idx'),
+        ]
     
     def __str__(self):
         return f"{self.action}: {self.user.username if self.user else 'Anonymous'} -> {self.client.name if self.client else 'Unknown'}"
+
+
+class SSOAuditRollup(models.Model):
+    """
+    Hourly audit counts per client and action (see sso.stats)
+    """
+    hour = models.DateTimeField(verbose_name="ساعت")
+    client = models.ForeignKey(SSOClient, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="کلاینت")
+    action = models.CharField(max_length=20, choices=SSOAuditLog.ACTION_CHOICES, verbose_name="عمل")
+    count = models.PositiveIntegerField(default=0, verbose_name="تعداد")
+    # UserSketch of the distinct users, only for actions in sso.stats.SKETCH_ACTIONS
+    users = models.BinaryField(null=True, blank=True, verbose_name="کاربران یکتا")
+
+    class Meta:
+        verbose_name = "آمار ساعتی SSO"
+        verbose_name_plural = "آمار ساعتی SSO"
+        ordering = ['-hour']
+        indexes = [
+            models.Index(fields=['hour', 'action'], name='sso_rollup_hour_idx'),
+            models.Index(fields=['client', 'hour'], name='sso_rollup_client_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H}:00 {self.action}: {self.count}"
+
+
+class SSOAuditRollupState(models.Model):
+    """
+    Single row locked by every rollup write, so concurrent runs (cron and
+    sweep_sso) replace the rollups of an hour one after the other, and the
+    time of the last completed run
+    """
+    rolled_up_at = models.DateTimeField(null=True, blank=True, verbose_name="زمان آخرین تجمیع")
+
+    class Meta:
+        verbose_name = "وضعیت آمار ساعتی SSO"
+        verbose_name_plural = "وضعیت آمار ساعتی SSO"
+
+    def __str__(self):
+        return f"rolled up at {self.rolled_up_at}"
@@ -0,0 +1,137 @@
+"""
+In-process registry of active SSO clients
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import SSOClient
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = 'sso:client_registry:version'
+
+
+class SSOClientRegistry:
+    """
+    Per-process cache of active SSOClient rows keyed by client_id.
+
+    The whole (small) client table is loaded with one query and served from
+    memory until it is invalidated by the post_save/post_delete signals in
+    sso.signals. If SSO_CLIENT_REGISTRY_CACHE names a cache alias, every
+    invalidation also bumps a shared version counter there so the other
+    worker processes reload on their next lookup. SSO_CLIENT_REGISTRY_TTL
+    bounds how long a snapshot is trusted when no shared cache is configured.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = None
+        self._version = None
+        self._loaded_at = 0.0
+
+    def _get_cache(self):
+        alias = getattr(settings, 'SSO_CLIENT_REGISTRY_CACHE', None)
+        return caches[alias] if alias else None
+
+    def _get_shared_version(self):
+        cache = self._get_cache()
+        if cache is None:
+            return None
+        try:
+            return cache.get(VERSION_CACHE_KEY)
+        except Exception as e:
+            logger.warning(f"Client registry cache unavailable: {str(e)}")
+            return None
+
+    def _is_stale(self):
+        if self._clients is None:
+            return True
+
+        ttl = getattr(settings, 'SSO_CLIENT_REGISTRY_TTL', 300)
+        if ttl and time.monotonic() - self._loaded_at > ttl:
+            return True
+
+        shared_version = self._get_shared_version()
+        return shared_version is not None and shared_version != self._version
+
+    def load(self):
+        """
+        Load all active clients in bulk and return the new snapshot
+        """
+        with self._lock:
+            # Read the version before querying so a concurrent invalidation
+            # forces another reload instead of being lost.
+            version = self._get_shared_version()
+            clients = {
+                client.client_id: client
+                for client in SSOClient.objects.filter(is_active=True)
+            }
+            # Compile redirect rules up front instead of on the first login
+            for client in clients.values():
+                client.redirect_matcher
+            self._clients = clients
+            self._version = version
+            self._loaded_at = time.monotonic()
+
+        logger.debug(f"SSO client registry loaded {len(clients)} clients")
+        return clients
+
+    def _snapshot(self):
+        # Read the attribute once: a concurrent load() or invalidate() may
+        # replace it between the staleness check and the lookup.
+        clients = self._clients
+        if clients is None or self._is_stale():
+            clients = self.load()
+        return clients
+
+    def get(self, client_id):
+        """
+        Return the active client with the given client_id.
+        Raises SSOClient.DoesNotExist like SSOClient.objects.get would.
+        """
+        clients = self._snapshot()
+
+        client = clients.get(client_id)
+        if client is None:
+            raise SSOClient.DoesNotExist(f"Active SSO client '{client_id}' not found")
+        return client
+
+    def all(self):
+        """
+        Return all active clients
+        """
+        clients = self._snapshot()
+        return list(clients.values())
+
+    def invalidate(self):
+        """
+        Drop the local snapshot and notify other processes
+        """
+        with self._lock:
+            self._clients = None
+
+        cache = self._get_cache()
+        if cache is None:
+            return
+
+        try:
+            cache.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            cache.set(VERSION_CACHE_KEY, 1, None)
+        except Exception as e:
+            logger.warning(f"Failed to publish client registry invalidation: {str(e)}")
+
+
+client_registry = SSOClientRegistry()
+
+
+def get_active_client(client_id):
+    """
+    Shortcut for client_registry.get()
+    """
+    return client_registry.get(client_id)
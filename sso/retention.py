@@ -0,0 +1,147 @@
+"""
+Batched deletion of expired SSO sessions and aged audit rows
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SSOAuditLog, SSOAuditRollup, SSOSession
+
+logger = logging.getLogger(__name__)
+
+
+def parse_retention(value):
+    """
+    Parse 'action:days,action:days' into {action: days}
+    """
+    retention = {}
+    for item in (value or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        action, _, days = item.partition(':')
+        try:
+            retention[action.strip()] = int(days)
+        except ValueError:
+            raise ValueError(f"Invalid retention entry '{item}', expected action:days")
+    return retention
+
+
+class SweepResult:
+    def __init__(self, name):
+        self.name = name
+        self.deleted = 0
+        self.batches = 0
+        self.seconds = 0.0
+
+    @property
+    def rate(self):
+        return self.deleted / self.seconds if self.seconds else 0.0
+
+
+def sweep(queryset, name, batch_size=1000, pause=0.0, dry_run=False):
+    """
+    Delete the rows of queryset in primary-key order, batch_size at a time.
+
+    Each batch reads the next batch_size matching keys after the last one
+    seen, then deletes the matching rows between the first and last of those
+    keys in its own short transaction, so no statement locks more than one
+    batch. pause seconds are slept between batches to leave room for the
+    login path's writes.
+    """
+    result = SweepResult(name)
+    model = queryset.model
+    last_pk = None
+    started = time.perf_counter()
+
+    while True:
+        page = queryset.order_by('pk')
+        if last_pk is not None:
+            page = page.filter(pk__gt=last_pk)
+        pks = list(page.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            break
+
+        first_pk, last_pk = pks[0], pks[-1]
+        if dry_run:
+            deleted = len(pks)
+        else:
+            with transaction.atomic():
+                # No cascades or delete signals on these models, so this is
+                # a single DELETE ... WHERE pk BETWEEN first AND last
+                deleted, _ = queryset.filter(pk__gte=first_pk, pk__lte=last_pk).delete()
+        result.deleted += deleted
+        result.batches += 1
+
+        if len(pks) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    result.seconds = time.perf_counter() - started
+    if result.deleted:
+        logger.info(f"Swept {result.deleted} {model._meta.verbose_name_plural} ({name}) in {result.batches} batches")
+    return result
+
+
+def expired_sessions(now=None):
+    return SSOSession.objects.filter(expires_at__lt=now or timezone.now())
+
+
+def aged_audit_logs(now=None):
+    """
+    Yield (name, queryset) for every audit retention rule: one per action
+    listed in SSO_AUDIT_RETENTION_BY_ACTION, then the default for the rest.
+    A retention of 0 days keeps rows forever.
+    """
+    now = now or timezone.now()
+    by_action = parse_retention(getattr(settings, 'SSO_AUDIT_RETENTION_BY_ACTION', ''))
+
+    for action, days in by_action.items():
+        if days > 0:
+            yield f'audit:{action}', SSOAuditLog.objects.filter(
+                action=action, created_at__lt=now - timedelta(days=days)
+            )
+
+    default_days = getattr(settings, 'SSO_AUDIT_RETENTION_DAYS', 90)
+    if default_days > 0:
+        yield 'audit:default', SSOAuditLog.objects.filter(
+            created_at__lt=now - timedelta(days=default_days)
+        ).exclude(action__in=list(by_action))
+
+
+def aged_rollups(now=None):
+    """
+    Hourly stats rollups older than SSO_STATS_ROLLUP_RETENTION_DAYS (0 = keep)
+    """
+    days = getattr(settings, 'SSO_STATS_ROLLUP_RETENTION_DAYS', 400)
+    if days > 0:
+        yield 'rollups', SSOAuditRollup.objects.filter(hour__lt=(now or timezone.now()) - timedelta(days=days))
+
+
+def sweep_all(batch_size=None, pause=None, dry_run=False, sessions=True, audit=True, rollups=True):
+    """
+    Run every sweep and return the list of SweepResult
+    """
+    from .stats import refresh_rollups
+
+    batch_size = batch_size or getattr(settings, 'SSO_SWEEP_BATCH_SIZE', 1000)
+    pause = getattr(settings, 'SSO_SWEEP_PAUSE', 0.05) if pause is None else pause
+
+    targets = []
+    if sessions:
+        targets.append(('sessions', expired_sessions()))
+    if audit:
+        # Roll up what is about to be deleted so the stats keep counting it
+        if not dry_run:
+            refresh_rollups()
+        targets.extend(aged_audit_logs())
+    if rollups:
+        targets.extend(aged_rollups())
+
+    return [sweep(queryset, name, batch_size, pause, dry_run) for name, queryset in targets]
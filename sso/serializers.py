@@ -8,6 +8,8 @@ from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from django.conf import settings
 from .models import SSOClient, SSOSession, SSOAuditLog
+from .registry import client_registry
+from .sessions import get_session_store
 from apps.users.models import User
 import logging
 
@@ -32,7 +34,7 @@ class SSOLoginSerializer(serializers.Serializer):
         
         # Validate client
         try:
-            client = SSOClient.objects.get(client_id=client_id, is_active=True)
+            client = client_registry.get(client_id)
             logger.info(f"Client found: {client.name}")
         except SSOClient.DoesNotExist:
             logger.warning(f"Client not found: {client_id}")
@@ -97,6 +99,16 @@ class SSORegisterSerializer(serializers.ModelSerializer):
         fields = ['username', 'email', 'phone_number', 'first_name', 'last_name', 
                  'password', 'password_confirm', 'client_id', 'redirect_uri', 'state']
     
+    def validate_username(self, value):
+        if User.objects.with_username(value).exists():
+            raise serializers.ValidationError("این نام کاربری قبلاً استفاده شده است.")
+        return value
+    
+    def validate_email(self, value):
+        if value and User.objects.with_email(value).exists():
+            raise serializers.ValidationError("این ایمیل قبلاً استفاده شده است.")
+        return value
+    
     def validate(self, attrs):
         password = attrs.get('password')
         password_confirm = attrs.get('password_confirm')
@@ -109,7 +121,7 @@ class SSORegisterSerializer(serializers.ModelSerializer):
         
         # Validate client
         try:
-            client = SSOClient.objects.get(client_id=client_id, is_active=True)
+            client = client_registry.get(client_id)
             logger.info(f"Client found: {client.name}")
         except SSOClient.DoesNotExist:
             logger.warning(f"Client not found: {client_id}")
@@ -171,7 +183,7 @@ class SSOTokenValidationSerializer(serializers.Serializer):
         
         # Validate client
         try:
-            client = SSOClient.objects.get(client_id=client_id, is_active=True)
+            client = client_registry.get(client_id)
             logger.info(f"Client found: {client.name}")
         except SSOClient.DoesNotExist:
             logger.warning(f"Client not found: {client_id}")
@@ -183,7 +195,7 @@ class SSOTokenValidationSerializer(serializers.Serializer):
                     domain='meet.avinoo.ir',
                     client_id=client_id,
                     client_secret='jitsi_meet_secret_2024',
-                    redirect_uri=redirect_uri,
+                    redirect_uri='https://meet.avinoo.ir/',
                     is_active=True
                 )
                 logger.info(f"Jitsi Meet client created: {client.name}")
@@ -194,7 +206,7 @@ class SSOTokenValidationSerializer(serializers.Serializer):
                     domain=getattr(settings, 'AUTH_SERVICE_DOMAIN', '127.0.0.1:8000'),
                     client_id=client_id,
                     client_secret='test_secret_123',
-                    redirect_uri=redirect_uri,
+                    redirect_uri=settings.SSO_REDIRECT_URL.format(domain='127.0.0.1:8000'),
                     is_active=True
                 )
                 logger.info(f"Client created: {client.name}")
@@ -203,6 +215,53 @@ class SSOTokenValidationSerializer(serializers.Serializer):
         return attrs
 
 
+class SSOBatchTokenValidationSerializer(serializers.Serializer):
+    """
+    Serializer for validating many JWT tokens of one client in a single request
+    """
+    tokens = serializers.ListField(child=serializers.CharField(), allow_empty=False)
+    client_id = serializers.CharField(max_length=100)
+    
+    def validate_tokens(self, value):
+        max_tokens = getattr(settings, 'SSO_BATCH_VALIDATION_MAX_TOKENS', 100)
+        if len(value) > max_tokens:
+            raise serializers.ValidationError(f"حداکثر {max_tokens} توکن در هر درخواست مجاز است.")
+        return value
+    
+    def validate(self, attrs):
+        client_id = attrs.get('client_id')
+        
+        # Validate client
+        try:
+            attrs['client'] = client_registry.get(client_id)
+        except SSOClient.DoesNotExist:
+            logger.warning(f"Client not found: {client_id}")
+            raise serializers.ValidationError("کلاینت نامعتبر است.")
+        
+        return attrs
+
+
+class MeetRoomTokenBatchSerializer(serializers.Serializer):
+    """
+    Serializer for issuing meet tokens for a room's participant list
+    """
+    room_name = serializers.CharField(max_length=255)
+    users = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+    moderators = serializers.ListField(child=serializers.UUIDField(), required=False, default=list)
+    
+    def validate_room_name(self, value):
+        value = value.strip().strip('/')
+        if not value or '/' in value:
+            raise serializers.ValidationError("نام اتاق نامعتبر است.")
+        return value
+    
+    def validate_users(self, value):
+        max_users = getattr(settings, 'MEET_BATCH_MAX_USERS', 1000)
+        if len(value) > max_users:
+            raise serializers.ValidationError(f"حداکثر {max_users} کاربر در هر درخواست مجاز است.")
+        return value
+
+
 class SSOCallbackSerializer(serializers.Serializer):
     """
     Serializer for SSO callback requests
@@ -218,7 +277,7 @@ class SSOCallbackSerializer(serializers.Serializer):
         
         # Validate client
         try:
-            client = SSOClient.objects.get(client_id=client_id, is_active=True)
+            client = client_registry.get(client_id)
             logger.info(f"Client found: {client.name}")
         except SSOClient.DoesNotExist:
             logger.warning(f"Client not found: {client_id}")
@@ -230,7 +289,7 @@ class SSOCallbackSerializer(serializers.Serializer):
                     domain='meet.avinoo.ir',
                     client_id=client_id,
                     client_secret='jitsi_meet_secret_2024',
-                    redirect_uri=redirect_uri,
+                    redirect_uri='https://meet.avinoo.ir/',
                     is_active=True
                 )
                 logger.info(f"Jitsi Meet client created: {client.name}")
@@ -241,20 +300,14 @@ class SSOCallbackSerializer(serializers.Serializer):
                     domain=getattr(settings, 'AUTH_SERVICE_DOMAIN', '127.0.0.1:8000'),
                     client_id=client_id,
                     client_secret='test_secret_123',
-                    redirect_uri=redirect_uri,
+                    redirect_uri=settings.SSO_REDIRECT_URL.format(domain='127.0.0.1:8000'),
                     is_active=True
                 )
                 logger.info(f"Client created: {client.name}")
         
-        # Validate session
-        try:
-            session = SSOSession.objects.get(
-                state=state,
-                client=client,
-                is_used=False,
-                expires_at__gt=timezone.now()
-            )
-        except SSOSession.DoesNotExist:
+        # Redeem the session; a state can only be used once
+        session = get_session_store().consume(client, state)
+        if session is None:
             raise serializers.ValidationError("جلسه نامعتبر یا منقضی شده است.")
         
         attrs['client'] = client
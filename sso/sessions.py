@@ -0,0 +1,141 @@
+"""
+Storage for short-lived SSO sessions (state -> user, client, redirect_uri)
+"""
+
+import hashlib
+import logging
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .models import SSOSession
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'sso:session:{client_id}:{state}'
+
+
+def _session_ttl():
+    return getattr(settings, 'SSO_SESSION_TTL', 600)
+
+
+class DatabaseSessionStore:
+    """
+    SSOSession rows. A session handed out at login is written once, already
+    marked used; consume() flips is_used with a conditional UPDATE so a state
+    can be redeemed only once even under concurrent callbacks.
+    """
+
+    def create(self, user, client, redirect_uri, state, used=False):
+        return SSOSession.objects.create(
+            user=user,
+            client=client,
+            state=state,
+            redirect_uri=redirect_uri,
+            expires_at=timezone.now() + timezone.timedelta(seconds=_session_ttl()),
+            is_used=used
+        )
+
+    def consume(self, client, state):
+        session = SSOSession.objects.select_related('user').filter(
+            state=state,
+            client=client,
+            is_used=False,
+            expires_at__gt=timezone.now()
+        ).first()
+        if session is None:
+            return None
+        if not SSOSession.objects.filter(pk=session.pk, is_used=False).update(is_used=True):
+            return None
+        session.is_used = True
+        return session
+
+
+class CacheSessionStore:
+    """
+    Ephemeral sessions in the 'sessions' cache alias; nothing touches the
+    database. Only unused sessions are stored (they are the only ones that
+    are ever looked up), as a compact (id, user_id, redirect_uri, expiry)
+    tuple that expires with the session. consume() relies on cache.delete()
+    reporting whether it removed the key, so only one caller wins.
+    Sessions do not show up in the admin or /api/admin/sessions/.
+    """
+
+    def __init__(self, cache_alias=None):
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias or getattr(settings, 'SSO_SESSION_CACHE', 'sessions')]
+
+    def _key(self, client, state):
+        state_hash = hashlib.sha256(state.encode()).hexdigest()[:40]
+        return CACHE_KEY.format(client_id=client.client_id, state=state_hash)
+
+    def create(self, user, client, redirect_uri, state, used=False):
+        ttl = _session_ttl()
+        session = SSOSession(
+            id=uuid.uuid4(),
+            user=user,
+            client=client,
+            state=state,
+            redirect_uri=redirect_uri,
+            created_at=timezone.now(),
+            expires_at=timezone.now() + timezone.timedelta(seconds=ttl),
+            is_used=used
+        )
+        if not used:
+            self.cache.set(
+                self._key(client, state),
+                (session.id.hex, user.pk, redirect_uri, session.expires_at.timestamp()),
+                ttl
+            )
+        return session
+
+    def consume(self, client, state):
+        key = self._key(client, state)
+        entry = self.cache.get(key)
+        if entry is None or not self.cache.delete(key):
+            return None
+
+        session_id, user_id, redirect_uri, expires_at = entry
+        expires_at = datetime.fromtimestamp(expires_at, tz=dt_timezone.utc)
+        if expires_at <= timezone.now():
+            return None
+
+        from django.contrib.auth import get_user_model
+        user = get_user_model().objects.filter(pk=user_id, is_active=True).first()
+        if user is None:
+            return None
+        return SSOSession(
+            id=uuid.UUID(session_id),
+            user=user,
+            client=client,
+            state=state,
+            redirect_uri=redirect_uri,
+            expires_at=expires_at,
+            is_used=True
+        )
+
+
+_stores = {
+    'db': DatabaseSessionStore,
+    'cache': CacheSessionStore,
+}
+_store = None
+
+
+def get_session_store():
+    """
+    Return the store selected by SSO_SESSION_STORE ('db' or 'cache')
+    """
+    global _store
+    name = getattr(settings, 'SSO_SESSION_STORE', 'db')
+    if not isinstance(_store, _stores.get(name, DatabaseSessionStore)):
+        if name not in _stores:
+            logger.warning(f"Unknown SSO_SESSION_STORE '{name}', using the database")
+        _store = _stores.get(name, DatabaseSessionStore)()
+    return _store
@@ -0,0 +1,19 @@
+"""
+SSO signal handlers
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import SSOClient
+from .registry import client_registry
+
+
+@receiver(post_save, sender=SSOClient)
+@receiver(post_delete, sender=SSOClient)
+def invalidate_client_registry(sender, instance, **kwargs):
+    """
+    Reload the client registry once the change is committed
+    """
+    transaction.on_commit(client_registry.invalidate)
@@ -0,0 +1,196 @@
+"""
+Hourly SSOAuditLog rollups and the SSO dashboard stats built from them
+"""
+
+import logging
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import SSOAuditLog, SSOAuditRollup, SSOAuditRollupState, SSOClient, SSOSession
+from .sketch import UserSketch
+
+logger = logging.getLogger(__name__)
+
+# Actions whose rollups carry a distinct-user sketch
+SKETCH_ACTIONS = ('login',)
+# Hours recomputed per transaction while catching up
+CHUNK_HOURS = 24
+# pk of the single SSOAuditRollupState row
+STATE_ID = 1
+# The stats read at most this much of the raw audit log past the last rollup
+TAIL_LIMIT = timedelta(hours=1)
+
+
+def floor_hour(value):
+    """
+    Start of the UTC hour containing value (rollup buckets are UTC hours)
+    """
+    return value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def rollup_range(start, end):
+    """
+    Recompute the rollups of the whole UTC hours in [start, end) from the
+    audit log and return the number of rollup rows written
+    """
+    logs = SSOAuditLog.objects.filter(created_at__gte=start, created_at__lt=end).order_by()
+    bucketed = logs.annotate(bucket=TruncHour('created_at', tzinfo=dt_timezone.utc))
+
+    rows = {}
+    counts = bucketed.values_list('bucket', 'client_id', 'action').annotate(total=Count('pk'))
+    for bucket, client_id, action, total in counts:
+        rows[(bucket, client_id, action)] = SSOAuditRollup(
+            hour=bucket, client_id=client_id, action=action, count=total
+        )
+
+    sketches = {}
+    users = bucketed.filter(action__in=SKETCH_ACTIONS, user__isnull=False).values_list(
+        'bucket', 'client_id', 'action', 'user_id'
+    ).distinct()
+    for bucket, client_id, action, user_id in users.iterator():
+        sketches.setdefault((bucket, client_id, action), UserSketch()).add(user_id)
+    for key, sketch in sketches.items():
+        rows[key].users = sketch.to_bytes()
+
+    with transaction.atomic():
+        # Taken before the delete, so a concurrent run's rows are committed
+        # and deleted here instead of both runs inserting their own
+        SSOAuditRollupState.objects.select_for_update().get_or_create(pk=STATE_ID)
+        SSOAuditRollup.objects.filter(hour__gte=start, hour__lt=end).delete()
+        SSOAuditRollup.objects.bulk_create(rows.values(), batch_size=500)
+    return len(rows)
+
+
+def refresh_rollups(now=None, rebuild=False):
+    """
+    Bring the rollups up to date and return the number of hours recomputed.
+
+    Starts again one hour before the last rolled-up hour (which may have
+    been partial, and buffered audit writes can land just after the hour),
+    or from the oldest audit row when there are no rollups yet or rebuild is
+    set. Rollups of hours before the oldest audit row are kept, but a
+    rebuild recounts later hours from what is left in the log, so rows
+    already removed by a per-action retention drop out of the counts.
+    """
+    now = now or timezone.now()
+    end = floor_hour(now) + timedelta(hours=1)
+
+    last = None if rebuild else SSOAuditRollup.objects.order_by().aggregate(last=Max('hour'))['last']
+    if last is not None:
+        start = floor_hour(last) - timedelta(hours=1)
+    else:
+        first = SSOAuditLog.objects.order_by().aggregate(first=Min('created_at'))['first']
+        start = end if first is None else floor_hour(first)
+
+    hours = 0
+    while start < end:
+        chunk_end = min(start + timedelta(hours=CHUNK_HOURS), end)
+        rollup_range(start, chunk_end)
+        hours += (chunk_end - start) // timedelta(hours=1)
+        start = chunk_end
+
+    # Audit rows created before `now` are in the rollups (apart from
+    # buffered writes still in flight)
+    SSOAuditRollupState.objects.filter(
+        Q(rolled_up_at__isnull=True) | Q(rolled_up_at__lt=now), pk=STATE_ID
+    ).update(rolled_up_at=now)
+    logger.debug(f"Recomputed {hours} hours of SSO audit rollups")
+    return hours
+
+
+def audit_stats(now=None, client=None):
+    """
+    Audit counts from the rollups, plus the audit rows created since the
+    last rollup run (at most TAIL_LIMIT of them, over the created_at
+    indexes), in at most five queries whatever the size of the log. Windows
+    are whole UTC hours: "24h" is the current hour and the 23 before it.
+    Counts include hours whose audit rows were already swept. rolled_up_at
+    tells how old the rollups are; rows older than TAIL_LIMIT that no run
+    has rolled up yet are not counted.
+    """
+    now = now or timezone.now()
+    current_hour = floor_hour(now)
+    since_24h = current_hour - timedelta(hours=23)
+    since_7d = current_hour - timedelta(days=7) + timedelta(hours=1)
+    since_30d = current_hour - timedelta(days=30) + timedelta(hours=1)
+
+    rollups = SSOAuditRollup.objects.order_by()
+    if client is not None:
+        rollups = rollups.filter(client=client)
+
+    totals = rollups.aggregate(
+        total_logs=Sum('count'),
+        logs_24h=Sum('count', filter=Q(hour__gte=since_24h)),
+        logs_7d=Sum('count', filter=Q(hour__gte=since_7d)),
+        logs_30d=Sum('count', filter=Q(hour__gte=since_30d)),
+        login_logs=Sum('count', filter=Q(action='login')),
+        logout_logs=Sum('count', filter=Q(action='logout')),
+        token_validations=Sum('count', filter=Q(action='token_validated')),
+        rolled_up_to=Max('hour'),
+    )
+    rolled_up_to = totals.pop('rolled_up_to')
+    stats = {key: value or 0 for key, value in totals.items()}
+
+    # Rows since the last run, bounded so a stopped job cannot make this a scan
+    rolled_up_at = SSOAuditRollupState.objects.filter(pk=STATE_ID).values_list('rolled_up_at', flat=True).first()
+    tail_since = now - TAIL_LIMIT if rolled_up_at is None else max(rolled_up_at, now - TAIL_LIMIT)
+    tail = SSOAuditLog.objects.order_by().filter(created_at__gte=tail_since)
+    if client is not None:
+        tail = tail.filter(client=client)
+    recent = tail.aggregate(
+        total=Count('pk'),
+        login=Count('pk', filter=Q(action='login')),
+        logout=Count('pk', filter=Q(action='logout')),
+        token_validated=Count('pk', filter=Q(action='token_validated')),
+    )
+    # Every tail row falls inside all of the windows
+    for key in ('total_logs', 'logs_24h', 'logs_7d', 'logs_30d'):
+        stats[key] += recent['total']
+    stats['login_logs'] += recent['login']
+    stats['logout_logs'] += recent['logout']
+    stats['token_validations'] += recent['token_validated']
+
+    active_users = UserSketch()
+    sketches = rollups.filter(action='login', hour__gte=since_24h, users__isnull=False)
+    for users in sketches.values_list('users', flat=True):
+        active_users.merge(UserSketch.from_bytes(users))
+    if recent['login']:
+        for user_id in tail.filter(action='login', user__isnull=False).values_list('user_id', flat=True).distinct():
+            active_users.add(user_id)
+    stats['active_users_24h'] = active_users.count()
+    stats['rolled_up_to'] = rolled_up_to
+    stats['rolled_up_at'] = rolled_up_at
+    return stats
+
+
+def session_stats(now=None, client=None):
+    """
+    Session counts in one query (the table is kept small by sweep_sso)
+    """
+    now = now or timezone.now()
+    sessions = SSOSession.objects.order_by()
+    if client is not None:
+        sessions = sessions.filter(client=client)
+    return sessions.aggregate(
+        total_sessions=Count('pk'),
+        active_sessions=Count('pk', filter=Q(expires_at__gt=now)),
+        expired_sessions=Count('pk', filter=Q(expires_at__lt=now)),
+    )
+
+
+def dashboard_stats(now=None):
+    """
+    Everything the SSO stats page shows, in at most seven queries
+    """
+    now = now or timezone.now()
+    stats = SSOClient.objects.order_by().aggregate(
+        total_clients=Count('pk'),
+        active_clients=Count('pk', filter=Q(is_active=True)),
+    )
+    stats.update(session_stats(now))
+    stats.update(audit_stats(now))
+    return stats
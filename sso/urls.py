@@ -12,6 +12,7 @@ urlpatterns = [
     path('api/login/', views.SSOLoginView.as_view(), name='sso_login'),
     path('api/register/', views.SSORegisterView.as_view(), name='sso_register'),
     path('api/validate-token/', views.SSOTokenValidationView.as_view(), name='sso_validate_token'),
+    path('api/validate-tokens/', views.SSOBatchTokenValidationView.as_view(), name='sso_validate_tokens'),
     path('api/callback/', views.SSOCallbackView.as_view(), name='sso_callback'),
     path('api/logout/', views.SSOLogoutView.as_view(), name='sso_logout'),
     path('api/user-info/', views.SSOUserInfoView.as_view(), name='sso_user_info'),
@@ -20,6 +21,7 @@ urlpatterns = [
     path('login/', views.sso_login_page, name='sso_login_page'),
     path('register/', views.sso_register_page, name='sso_register_page'),
     path('callback/', views.sso_callback_page, name='sso_callback_page'),
+    path('callback/async/', views.sso_callback_page_async, name='sso_callback_page_async'),
     
     # Test page (protected)
     path('test/', views.test_protected_page, name='test_protected_page'),
@@ -30,4 +32,6 @@ urlpatterns = [
     path('api/admin/clients/', views.SSOClientListView.as_view(), name='sso_clients'),
     path('api/admin/sessions/', views.SSOSessionListView.as_view(), name='sso_sessions'),
     path('api/admin/logs/', views.SSOAuditLogListView.as_view(), name='sso_audit_logs'),
+    path('api/admin/upstreams/', views.UpstreamStatsView.as_view(), name='sso_upstream_stats'),
+    path('api/admin/meet/tokens/', views.MeetRoomTokenBatchView.as_view(), name='sso_meet_token_batch'),
 ]
@@ -4,22 +4,46 @@ SSO Utility functions
 
 import logging
 from django.conf import settings
-from django.utils import timezone
 from .models import SSOAuditLog
+from .audit import get_audit_writer
 
 logger = logging.getLogger(__name__)
 
 
 def get_client_ip(request):
     """
-    Get client IP address from request
+    Get client IP address from request.
+
+    X-Forwarded-For is only as trustworthy as the proxies that append to
+    it: with TRUSTED_PROXY_COUNT = N (the reverse proxies in front of the
+    service), the client is the address the outermost of them saw, the Nth
+    entry from the right. Entries further left come from the client and are
+    ignored. With 0 (the default) the header is ignored and REMOTE_ADDR is
+    used.
     """
+    if request is None:
+        return None
+    trusted = getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
+    if trusted > 0 and x_forwarded_for:
+        hops = [hop.strip() for hop in x_forwarded_for.split(',') if hop.strip()]
+        if hops:
+            return hops[-min(trusted, len(hops))]
+    return request.META.get('REMOTE_ADDR')
+
+
+def build_sso_audit_log(user, client, action, request, details=None):
+    """
+    Build an unsaved SSOAuditLog entry for the given request
+    """
+    return SSOAuditLog(
+        user=user,
+        client=client,
+        action=action,
+        ip_address=get_client_ip(request),
+        user_agent=request.META.get('HTTP_USER_AGENT', ''),
+        details=details or {}
+    )
 
 
 def log_sso_activity(user, client, action, request, details=None):
@@ -27,18 +51,28 @@ def log_sso_activity(user, client, action, request, details=None):
     Log SSO activity for audit purposes
     """
     try:
-        SSOAuditLog.objects.create(
-            user=user,
-            client=client,
-            action=action,
-            ip_address=get_client_ip(request),
-            user_agent=request.META.get('HTTP_USER_AGENT', ''),
-            details=details or {}
-        )
+        entry = build_sso_audit_log(user, client, action, request, details)
+        if getattr(settings, 'SSO_AUDIT_BUFFERED', False):
+            get_audit_writer().submit(entry)
+        else:
+            entry.save()
     except Exception as e:
         logger.error(f"Failed to log SSO activity: {str(e)}")
 
 
+def log_sso_activities(entries):
+    """
+    Write several audit entries (from build_sso_audit_log) in one query
+    """
+    try:
+        if getattr(settings, 'SSO_AUDIT_BUFFERED', False):
+            get_audit_writer().submit_many(entries)
+        else:
+            SSOAuditLog.objects.bulk_create(entries)
+    except Exception as e:
+        logger.error(f"Failed to log {len(entries)} SSO activities: {str(e)}")
+
+
 def validate_redirect_uri(redirect_uri, allowed_domains):
     """
     Validate redirect URI against allowed domains
@@ -71,34 +105,21 @@ def create_sso_session(user, client, redirect_uri, state=None):
     """
     Create a new SSO session
     """
-    from .models import SSOSession
+    from .sessions import get_session_store
     
     if not state:
         state = generate_state()
     
-    session = SSOSession.objects.create(
-        user=user,
-        client=client,
-        state=state,
-        redirect_uri=redirect_uri,
-        expires_at=timezone.now() + timezone.timedelta(minutes=10)
-    )
-    
-    return session
+    return get_session_store().create(user, client, redirect_uri, state)
 
 
 def cleanup_expired_sessions():
     """
     Clean up expired SSO sessions
     """
-    from .models import SSOSession
-    
-    expired_sessions = SSOSession.objects.filter(
-        expires_at__lt=timezone.now()
-    )
+    from .retention import expired_sessions, sweep
     
-    count = expired_sessions.count()
-    expired_sessions.delete()
+    count = sweep(expired_sessions(), 'sessions', pause=0).deleted
     
     if count > 0:
         logger.info(f"Cleaned up {count} expired SSO sessions")